@@ -1,5 +1,3 @@
-from .builder_agent_1 import BuilderAgent1
-from .builder_agent_2 import BuilderAgent2
-from .builder_agent_3 import BuilderAgent3
+from .persona_builder import PersonaBuilder, load_personas
 
-__all__ = ["BuilderAgent1", "BuilderAgent2", "BuilderAgent3"]
+__all__ = ["PersonaBuilder", "load_personas"]
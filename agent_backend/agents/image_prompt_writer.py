@@ -0,0 +1,129 @@
+"""
+ImagePromptWriter: writes the image-generation prompts for every persona at
+once, so builders can go straight to images.generate.
+
+- "batched" mode makes one structured chat call that returns a JSON object
+  with a prompt per persona (instead of one chat call per builder).
+- "template" mode renders each persona's image_prompt_template locally with
+  no chat call at all.
+Personas missing from a batched response fall back to their template.
+Templates are checked when the writer is constructed, so a typo in a
+placeholder fails at startup rather than on a request.
+"""
+
+import json
+import re
+import string
+
+from models.persona import Persona
+from query_analyzer import StructuredQuery
+from services.cache import ResponseCache, cache_key
+from services.gateway import ModelGateway
+from services.scheduler import Priority
+
+IMAGE_PROMPT_MODES = ("per_persona", "batched", "template")
+
+# Placeholders an image_prompt_template may use
+TEMPLATE_FIELDS = ("intent", "task_type", "requirements", "constraints", "raw_query")
+
+
+def render_template(persona: Persona, structured_query: StructuredQuery) -> str:
+    """Fill a persona's image prompt template from the structured query."""
+    if not persona.image_prompt_template:
+        return f"{persona.persona} design for: {structured_query.raw_query}"
+    return persona.image_prompt_template.format_map(
+        {
+            "intent": structured_query.intent,
+            "task_type": structured_query.task_type,
+            "requirements": "; ".join(structured_query.requirements) or "none specified",
+            "constraints": "; ".join(structured_query.constraints) or "none specified",
+            "raw_query": structured_query.raw_query,
+        }
+    )
+
+
+def validate_template(persona: Persona) -> None:
+    """Raise ValueError if the persona's image_prompt_template cannot be rendered."""
+    try:
+        fields = [
+            name for _, name, _, _ in string.Formatter().parse(persona.image_prompt_template) if name is not None
+        ]
+    except ValueError as e:
+        raise ValueError(f"{persona.agent_name}: malformed image_prompt_template: {e}") from e
+    unknown = sorted({re.split(r"[.\[]", name, maxsplit=1)[0] for name in fields} - set(TEMPLATE_FIELDS))
+    if unknown:
+        raise ValueError(
+            f"{persona.agent_name}: image_prompt_template uses unknown placeholders "
+            f"{', '.join('{' + name + '}' for name in unknown)}; allowed: {', '.join(TEMPLATE_FIELDS)}"
+        )
+
+
+class ImagePromptWriter:
+    """Produces {agent_name: image_prompt} for a set of personas."""
+
+    SYSTEM_PROMPT = """You write image generation prompts for several designers at once.
+For each designer below, write a detailed image generation prompt (1-2 sentences) for DALL-E
+that captures that designer's approach, following their brief exactly.
+
+Output valid JSON only, with this exact shape:
+{"prompts": {"<agent_name>": "prompt", ...}}
+Include every agent_name listed, and nothing else."""
+
+    def __init__(
+        self,
+        gateway: ModelGateway,
+        mode: str,
+        cache: ResponseCache | None = None,
+        personas: list[Persona] | None = None,
+    ):
+        if mode not in IMAGE_PROMPT_MODES:
+            raise ValueError(f"IMAGE_PROMPT_MODE must be one of {IMAGE_PROMPT_MODES}, got {mode!r}")
+        # Both modes render templates (batched as its fallback)
+        for persona in personas or []:
+            validate_template(persona)
+        self.gateway = gateway
+        self.mode = mode
+        self.cache = cache
+
+    async def write(
+        self, personas: list[Persona], structured_query: StructuredQuery
+    ) -> dict[str, str]:
+        """Image prompts keyed by agent_name."""
+        if self.mode == "template":
+            return {p.agent_name: render_template(p, structured_query) for p in personas}
+
+        briefs = "\n\n".join(
+            f"agent_name: {p.agent_name}\nBrief:\n{p.system_prompt_image}" for p in personas
+        )
+        user_content = f"{briefs}\n\nRequest:\n{structured_query.to_agent_prompt()}"
+        key = cache_key(model="gpt-4o-mini", system_prompt=self.SYSTEM_PROMPT, user_content=user_content)
+        cached = await self.cache.get(key, namespace="image_prompts") if self.cache is not None else None
+        if cached is not None:
+            return json.loads(cached)
+
+        response = await self.gateway.chat(
+            priority=Priority.BUILDER,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": user_content},
+            ],
+            response_format={"type": "json_object"},
+        )
+        try:
+            written = json.loads(response.choices[0].message.content or "{}").get("prompts", {})
+        except (json.JSONDecodeError, AttributeError):
+            written = {}
+        if not isinstance(written, dict):
+            written = {}
+
+        prompts = {}
+        for p in personas:
+            prompt = written.get(p.agent_name)
+            prompts[p.agent_name] = (
+                prompt.strip() if isinstance(prompt, str) and prompt.strip()
+                else render_template(p, structured_query)
+            )
+        if self.cache is not None and all(isinstance(written.get(p.agent_name), str) for p in personas):
+            await self.cache.set(key, json.dumps(prompts))
+        return prompts
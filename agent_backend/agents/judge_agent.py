@@ -1,10 +1,15 @@
 """
-JudgeAgent: evaluates the work of the 3 builder agents using a 5-point criteria.
+JudgeAgent: evaluates the work of the builder agents using a 5-point criteria.
 """
 
+import asyncio
+import base64
+import hashlib
 import json
-from openai import OpenAI
 
+from pydantic import ValidationError
+
+from constants import JUDGE_DUPLICATE_DISTANCE, JUDGE_MODE, JUDGE_TOP_K
 from models.agent_output import AgentOutput
 from models.judgment import (
     AgentJudgment,
@@ -12,11 +17,21 @@ from models.judgment import (
     JudgeOutput,
     JUDGE_CRITERIA,
 )
+from services.artifacts import ArtifactStore, content_type_for, to_data_uri
+from services.cache import ResponseCache, cache_key
+from services.code_checks import check_html, strip_code_fence
+from services.gateway import ModelGateway
+from services.prescreen import prescreen
+from services.scheduler import Priority
+from services.telemetry import metrics
+from services.thumbnails import JudgeImagePreparer
+
+JUDGE_MODES = ("pipelined", "batch", "tiered", "top_k")
 
 
 class JudgeAgent:
     """
-    Judges the work of the 3 builder agents.
+    Judges the work of the builder agents.
     Applies a 5-point rating on: relevance, creativity, persona_consistency,
     aesthetic_quality, technical_execution.
     """
@@ -47,15 +62,175 @@ Output valid JSON only, with this exact shape:
   "summary": "string"
 }"""
 
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    CODE_SYSTEM_PROMPT = """You are an expert front-end reviewer. Evaluate a builder agent's single-file web app (HTML with inline CSS and JS) against these 5 criteria (score 1-5 each):
+1. relevance - Does the app do what the prompt/requirements ask for?
+2. creativity - Originality of the concept, interactions and presentation
+3. persona_consistency - Does the code and design align with the agent's stated style/persona?
+4. aesthetic_quality - Visual design implied by the markup and CSS: layout, colour, typography
+5. technical_execution - Correctness, code quality, accessibility, and whether it would run as-is
+
+You are also given the results of local static checks (parse errors, inline script/style stats,
+accessibility issues). Take them into account, especially for technical_execution.
+
+Score each criterion 1-5 (1=poor, 5=excellent). Provide a brief rationale for each.
+Compute overall_score as the average of the 5 criterion scores (round to 1 decimal).
+Write a short summary (1-2 sentences) of your overall assessment.
+
+Output valid JSON only, with this exact shape:
+{
+  "agent_name": "string",
+  "persona": "string",
+  "criteria_ratings": [
+    {"criterion": "relevance", "score": 1-5, "rationale": "..."},
+    {"criterion": "creativity", "score": 1-5, "rationale": "..."},
+    {"criterion": "persona_consistency", "score": 1-5, "rationale": "..."},
+    {"criterion": "aesthetic_quality", "score": 1-5, "rationale": "..."},
+    {"criterion": "technical_execution", "score": 1-5, "rationale": "..."}
+  ],
+  "overall_score": 1.0-5.0,
+  "summary": "string"
+}"""
+
+    # Longer code is truncated before it is sent to the judge
+    MAX_JUDGED_CODE_CHARS = 60_000
+
+    BATCH_SYSTEM_PROMPT = """You are an expert design critic. You will see several builder agents' image outputs for the same job.
+Evaluate each output against these 5 criteria (score 1-5 each), comparing the outputs with one another:
+1. relevance - How well does the image match the prompt/requirements?
+2. creativity - Originality and imagination
+3. persona_consistency - Does it align with the agent's stated style/persona?
+4. aesthetic_quality - Visual appeal, composition, balance
+5. technical_execution - Clarity, coherence, polish
+
+Score each criterion 1-5 (1=poor, 5=excellent). Provide a brief rationale for each.
+Compute overall_score as the average of the 5 criterion scores (round to 1 decimal).
+Write a short summary (1-2 sentences) of your overall assessment of each output.
+
+Output valid JSON only, with this exact shape, one entry per output in the order given:
+{
+  "judgments": [
+    {
+      "agent_name": "string",
+      "persona": "string",
+      "criteria_ratings": [
+        {"criterion": "relevance", "score": 1-5, "rationale": "..."},
+        {"criterion": "creativity", "score": 1-5, "rationale": "..."},
+        {"criterion": "persona_consistency", "score": 1-5, "rationale": "..."},
+        {"criterion": "aesthetic_quality", "score": 1-5, "rationale": "..."},
+        {"criterion": "technical_execution", "score": 1-5, "rationale": "..."}
+      ],
+      "overall_score": 1.0-5.0,
+      "summary": "string"
+    }
+  ]
+}"""
+
+    QUICK_SYSTEM_PROMPT = """You are screening several candidate outputs (images or single-file web apps) made by builder agents for the same job.
+Score every candidate 1-5 (1=poor, 5=excellent) on each of: relevance, creativity, persona_consistency,
+aesthetic_quality, technical_execution. Compare the candidates with one another. Do not explain the scores.
+
+Output valid JSON only, with this exact shape, one entry per candidate:
+{
+  "scores": [
+    {"index": 1, "relevance": 1-5, "creativity": 1-5, "persona_consistency": 1-5, "aesthetic_quality": 1-5, "technical_execution": 1-5}
+  ]
+}"""
 
-    def _judge_one(self, output: AgentOutput, prompt_or_job: str) -> AgentJudgment:
-        """Judge a single builder agent's output."""
-        # Build message with image - use the image URL from AgentOutput
-        image_url = output.image if output.image.startswith("data:") else f"data:image/png;base64,{output.image}"
+    # Code shown to the quick screening pass is cut to this many characters
+    MAX_SCREENED_CODE_CHARS = 4_000
 
-        response = self.client.chat.completions.create(
+    def __init__(
+        self,
+        gateway: ModelGateway,
+        cache: ResponseCache | None = None,
+        artifacts: ArtifactStore | None = None,
+        mode: str = JUDGE_MODE,
+        thumbnails: JudgeImagePreparer | None = None,
+        top_k: int = JUDGE_TOP_K,
+        duplicate_distance: int = JUDGE_DUPLICATE_DISTANCE,
+    ):
+        if mode not in JUDGE_MODES:
+            raise ValueError(f"JUDGE_MODE must be one of {', '.join(JUDGE_MODES)}, got {mode!r}")
+        self.gateway = gateway
+        self.cache = cache
+        self.artifacts = artifacts
+        # "pipelined": one request per output, started as each builder finishes
+        # "batch": one request for all outputs of an orchestration
+        # "tiered": local checks first, then one request per remaining output
+        # "top_k": local checks, a quick scores-only pass, full judgments for the top k
+        self.mode = mode
+        # Downscales images before they are sent to the vision model
+        self.thumbnails = thumbnails
+        self.top_k = max(1, top_k)
+        # Max dHash distance (of 64 bits) at which two images count as duplicates
+        self.duplicate_distance = duplicate_distance
+
+    @property
+    def judges_together(self) -> bool:
+        """Whether this mode needs all outputs of an orchestration at once (see judge_all)."""
+        return self.mode != "pipelined"
+
+    def _load_image(self, output: AgentOutput) -> bytes:
+        """Raw image bytes, read from the artifact store or decoded from base64."""
+        if output.artifact_id and self.artifacts is not None:
+            return self.artifacts.get(output.artifact_id)
+        b64 = output.image.split(",", 1)[1] if output.image.startswith("data:") else output.image
+        return base64.b64decode(b64)
+
+    async def _image_part(self, output: AgentOutput) -> dict:
+        """
+        image_url content part for the vision model. The upstream API cannot
+        fetch our /artifacts URLs, so images go as data URIs: a downscaled,
+        cached derivative when a JudgeImagePreparer is configured, otherwise
+        the original image.
+        """
+        if self.thumbnails is not None:
+            source_key = output.artifact_id or hashlib.sha256(output.image.encode("utf-8")).hexdigest()
+            url = await self.thumbnails.prepare(source_key, lambda: self._load_image(output))
+            return {"type": "image_url", "image_url": {"url": url, "detail": self.thumbnails.detail}}
+        if output.artifact_id and self.artifacts is not None:
+            data = await asyncio.to_thread(self.artifacts.get, output.artifact_id)
+            url = to_data_uri(data, content_type_for(output.artifact_id))
+        elif output.image.startswith("data:"):
+            url = output.image
+        else:
+            url = f"data:image/png;base64,{output.image}"
+        return {"type": "image_url", "image_url": {"url": url}}
+
+    def _image_params(self) -> dict[str, object]:
+        """Judge-image settings that belong in judge cache keys."""
+        return self.thumbnails.params() if self.thumbnails is not None else {}
+
+    async def judge_one(self, output: AgentOutput, prompt_or_job: str) -> AgentJudgment:
+        """
+        Judge one builder output on its own (code or image), so the
+        orchestrator can start judging each output as soon as its builder
+        finishes.
+        """
+        if "code" in output.extra:
+            return await self._judge_code(output, prompt_or_job)
+        text = f"""Evaluate this image from {output.agent_name} (persona: {output.persona}).
+Style notes: {output.style_notes or 'N/A'}
+Original prompt/job: {prompt_or_job}
+
+Provide your judgment as JSON."""
+
+        key = cache_key(
+            model="gpt-4o-mini",
+            system_prompt=self.SYSTEM_PROMPT,
+            user_content=text,
+            image_sha256=hashlib.sha256(output.image.encode("utf-8")).hexdigest(),
+            judge_image=self._image_params(),
+        )
+        if self.cache is not None:
+            cached = await self.cache.get(key, namespace="judge")
+            if cached is not None:
+                return AgentJudgment.model_validate_json(cached)
+
+        image_part = await self._image_part(output)
+
+        response = await self.gateway.chat(
+            priority=Priority.JUDGE,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": self.SYSTEM_PROMPT},
@@ -64,16 +239,9 @@ Output valid JSON only, with this exact shape:
                     "content": [
                         {
                             "type": "text",
-                            "text": f"""Evaluate this image from {output.agent_name} (persona: {output.persona}).
-Style notes: {output.style_notes or 'N/A'}
-Original prompt/job: {prompt_or_job}
-
-Provide your judgment as JSON.""",
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": image_url},
+                            "text": text,
                         },
+                        image_part,
                     ],
                 },
             ],
@@ -82,6 +250,87 @@ Provide your judgment as JSON.""",
         content = response.choices[0].message.content
         data = json.loads(content)
 
+        judgment = self._parse_judgment(data, output)
+        if self.cache is not None:
+            await self.cache.set(key, judgment.model_dump_json())
+        return judgment
+
+    async def _judge_code(self, output: AgentOutput, prompt_or_job: str) -> AgentJudgment:
+        """
+        Judge a code output: local static checks first, then one text-only LLM
+        call that sees the code and the check results. The placeholder image is
+        never sent to the vision model.
+        """
+        code = strip_code_fence(str(output.extra.get("code") or ""))
+        report = await asyncio.to_thread(check_html, code)
+        if report.fatal:
+            return self._local_judgment(output, report.fatal_reason or "Broken code output")
+
+        truncated = len(code) > self.MAX_JUDGED_CODE_CHARS
+        text = f"""Evaluate this single-file web app from {output.agent_name} (persona: {output.persona}).
+Original prompt/job: {prompt_or_job}
+
+Static check results:
+{report.model_dump_json(exclude={"fatal", "fatal_reason"})}
+
+Code{" (truncated)" if truncated else ""}:
+{code[: self.MAX_JUDGED_CODE_CHARS]}
+
+Provide your judgment as JSON."""
+
+        key = cache_key(model="gpt-4o-mini", system_prompt=self.CODE_SYSTEM_PROMPT, user_content=text)
+        if self.cache is not None:
+            cached = await self.cache.get(key, namespace="judge")
+            if cached is not None:
+                return AgentJudgment.model_validate_json(cached)
+
+        response = await self.gateway.chat(
+            priority=Priority.JUDGE,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": self.CODE_SYSTEM_PROMPT},
+                {"role": "user", "content": text},
+            ],
+            response_format={"type": "json_object"},
+        )
+        data = json.loads(response.choices[0].message.content)
+        judgment = self._parse_judgment(data, output)
+        if self.cache is not None:
+            await self.cache.set(key, judgment.model_dump_json())
+        return judgment
+
+    @staticmethod
+    def _local_judgment(output: AgentOutput, reason: str) -> AgentJudgment:
+        """Lowest-score judgment for outputs rejected by local checks, without an LLM call."""
+        return AgentJudgment(
+            agent_name=output.agent_name,
+            persona=output.persona,
+            criteria_ratings=[
+                CriterionRating(criterion=c, score=1, rationale=reason) for c in JUDGE_CRITERIA
+            ],
+            overall_score=1.0,
+            summary=f"Rejected by local checks: {reason}.",
+            tier="local",
+        )
+
+    @staticmethod
+    def unjudged(output: AgentOutput, status: str, reason: str) -> AgentJudgment:
+        """Placeholder judgment (lowest scores) for an output the judge did not rate."""
+        return AgentJudgment(
+            agent_name=output.agent_name,
+            persona=output.persona,
+            criteria_ratings=[
+                CriterionRating(criterion=c, score=1, rationale=reason) for c in JUDGE_CRITERIA
+            ],
+            overall_score=1.0,
+            summary=f"Not judged: {reason}.",
+            status=status,
+            tier="local",
+        )
+
+    @staticmethod
+    def _parse_judgment(data: dict, output: AgentOutput) -> AgentJudgment:
+        """Build an AgentJudgment from model JSON, with criteria in JUDGE_CRITERIA order."""
         # Ensure criteria_ratings has exactly 5 items in the right order
         ratings = []
         for c in JUDGE_CRITERIA:
@@ -99,15 +348,246 @@ Provide your judgment as JSON.""",
             summary=data.get("summary", "No summary provided."),
         )
 
-    def judge(self, outputs: list[AgentOutput], prompt_or_job: str) -> JudgeOutput:
+    async def _judge_batch(
+        self, outputs: list[AgentOutput], prompt_or_job: str
+    ) -> list[AgentJudgment]:
         """
-        Judge the work of the 3 builder agents.
-        Returns JudgeOutput with ratings for each based on the 5-point criteria.
+        Judge all outputs in one vision request. Raises ValueError if the reply
+        does not contain exactly one valid judgment per output.
         """
-        if len(outputs) != 3:
-            raise ValueError("JudgeAgent expects exactly 3 builder outputs")
+        content: list[dict] = [
+            {
+                "type": "text",
+                "text": f"""Original prompt/job: {prompt_or_job}
+
+Evaluate the following {len(outputs)} outputs. Provide your judgments as JSON.""",
+            }
+        ]
+        for i, output in enumerate(outputs, start=1):
+            content.append(
+                {
+                    "type": "text",
+                    "text": f"""Output {i} from {output.agent_name} (persona: {output.persona}).
+Style notes: {output.style_notes or 'N/A'}""",
+                }
+            )
+            content.append(await self._image_part(output))
+
+        key = cache_key(
+            model="gpt-4o-mini",
+            system_prompt=self.BATCH_SYSTEM_PROMPT,
+            user_content="\n".join(part["text"] for part in content if part["type"] == "text"),
+            image_sha256=[hashlib.sha256(o.image.encode("utf-8")).hexdigest() for o in outputs],
+            judge_image=self._image_params(),
+        )
+        if self.cache is not None:
+            cached = await self.cache.get(key, namespace="judge_batch")
+            if cached is not None:
+                return [AgentJudgment.model_validate_json(j) for j in json.loads(cached)]
+
+        response = await self.gateway.chat(
+            priority=Priority.JUDGE,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": self.BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            response_format={"type": "json_object"},
+        )
+        data = json.loads(response.choices[0].message.content or "{}")
+        entries = data.get("judgments")
+        if not isinstance(entries, list) or len(entries) != len(outputs):
+            raise ValueError("Batch judgment count does not match the number of outputs")
+
+        # Re-order by agent_name when the model names every output exactly once;
+        # otherwise trust the positional order we asked for.
+        by_name = {e.get("agent_name"): e for e in entries if isinstance(e, dict)}
+        if all(o.agent_name in by_name for o in outputs) and len(by_name) == len(outputs):
+            entries = [by_name[o.agent_name] for o in outputs]
         judgments = [
-            self._judge_one(output, prompt_or_job)
-            for output in outputs
+            self._parse_judgment({**entry, "agent_name": output.agent_name, "persona": output.persona}, output)
+            for entry, output in zip(entries, outputs)
         ]
-        return JudgeOutput(judgments=judgments)
+        if self.cache is not None:
+            await self.cache.set(key, json.dumps([j.model_dump_json() for j in judgments]))
+        return judgments
+
+    async def judge_batch(
+        self, outputs: list[AgentOutput], prompt_or_job: str
+    ) -> list[AgentJudgment]:
+        """
+        Judge every output of an orchestration in a single request, falling back
+        to per-output judging if the batched reply fails validation. Code outputs
+        always take the per-output code-judging path.
+        """
+        if len(outputs) > 1 and not any("code" in output.extra for output in outputs):
+            try:
+                return await self._judge_batch(outputs, prompt_or_job)
+            except (ValueError, TypeError, AttributeError, ValidationError):
+                # json.JSONDecodeError is a ValueError; malformed entries raise the rest
+                pass
+        judgments = await asyncio.gather(
+            *(self.judge_one(output, prompt_or_job) for output in outputs)
+        )
+        return list(judgments)
+
+    @staticmethod
+    def _duplicate_judgment(
+        output: AgentOutput, original: AgentOutput, judgment: AgentJudgment
+    ) -> AgentJudgment:
+        """The original output's judgment, with creativity at the minimum for the copy."""
+        reason = f"Near-duplicate of {original.agent_name}'s output"
+        ratings = [
+            CriterionRating(criterion=r.criterion, score=1, rationale=reason)
+            if r.criterion == "creativity"
+            else r
+            for r in judgment.criteria_ratings
+        ]
+        return AgentJudgment(
+            agent_name=output.agent_name,
+            persona=output.persona,
+            criteria_ratings=ratings,
+            overall_score=round(sum(r.score for r in ratings) / len(ratings), 1),
+            summary=f"{reason}; scored from its judgment without another review.",
+            status=judgment.status,
+            tier="local",
+        )
+
+    async def _quick_scores(
+        self, outputs: list[AgentOutput], prompt_or_job: str
+    ) -> list[AgentJudgment]:
+        """
+        Scores-only screening of several outputs in one request (no rationales).
+        Raises ValueError if the reply does not score every output.
+        """
+        content: list[dict] = [
+            {
+                "type": "text",
+                "text": f"""Original prompt/job: {prompt_or_job}
+
+Score the following {len(outputs)} candidates. Provide the scores as JSON.""",
+            }
+        ]
+        for i, output in enumerate(outputs, start=1):
+            header = f"Candidate {i} from {output.agent_name} (persona: {output.persona})."
+            if "code" in output.extra:
+                code = strip_code_fence(str(output.extra.get("code") or ""))
+                content.append({"type": "text", "text": f"{header}\nCode:\n{code[: self.MAX_SCREENED_CODE_CHARS]}"})
+            else:
+                content.append({"type": "text", "text": f"{header}\nStyle notes: {output.style_notes or 'N/A'}"})
+                content.append(await self._image_part(output))
+
+        key = cache_key(
+            model="gpt-4o-mini",
+            system_prompt=self.QUICK_SYSTEM_PROMPT,
+            user_content="\n".join(part["text"] for part in content if part["type"] == "text"),
+            image_sha256=[hashlib.sha256(o.image.encode("utf-8")).hexdigest() for o in outputs],
+            judge_image=self._image_params(),
+        )
+        cached = await self.cache.get(key, namespace="judge_quick") if self.cache is not None else None
+        if cached is not None:
+            entries = json.loads(cached)
+        else:
+            response = await self.gateway.chat(
+                priority=Priority.JUDGE,
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": self.QUICK_SYSTEM_PROMPT},
+                    {"role": "user", "content": content},
+                ],
+                response_format={"type": "json_object"},
+                max_tokens=60 * len(outputs) + 50,
+            )
+            data = json.loads(response.choices[0].message.content or "{}")
+            entries = data.get("scores")
+            if not isinstance(entries, list):
+                raise ValueError("Quick scores reply has no scores list")
+
+        by_index = {e.get("index"): e for e in entries if isinstance(e, dict)}
+        if set(by_index) != set(range(1, len(outputs) + 1)):
+            raise ValueError("Quick scores do not cover every candidate")
+        judgments = []
+        for i, output in enumerate(outputs, start=1):
+            ratings = [
+                CriterionRating(criterion=c, score=int(by_index[i].get(c, 3)), rationale="Quick screening score.")
+                for c in JUDGE_CRITERIA
+            ]
+            judgments.append(
+                AgentJudgment(
+                    agent_name=output.agent_name,
+                    persona=output.persona,
+                    criteria_ratings=ratings,
+                    overall_score=round(sum(r.score for r in ratings) / len(ratings), 1),
+                    summary="Screened in the quick pass; not a finalist, so no detailed review.",
+                    tier="quick",
+                )
+            )
+        # Only replies that scored every candidate are cached
+        if cached is None and self.cache is not None:
+            await self.cache.set(key, json.dumps(entries))
+        return judgments
+
+    async def _judge_tiered(
+        self, outputs: list[AgentOutput], prompt_or_job: str
+    ) -> list[AgentJudgment]:
+        """
+        Tier 0: local checks reject broken outputs and copy judgments onto
+        duplicates (services/prescreen.py). Tier 1: the model judges what is
+        left; in top_k mode a scores-only pass ranks the candidates first and
+        only the top k get full five-criterion judgments.
+        """
+        verdicts = await asyncio.to_thread(prescreen, outputs, self._load_image, self.duplicate_distance)
+        judgments: list[AgentJudgment | None] = [None] * len(outputs)
+        candidates: list[int] = []
+        for i, (output, verdict) in enumerate(zip(outputs, verdicts)):
+            if verdict.action == "reject":
+                judgments[i] = self._local_judgment(output, verdict.reason)
+            elif verdict.action == "judge":
+                candidates.append(i)
+
+        finalists = candidates
+        if self.mode == "top_k" and len(candidates) > self.top_k:
+            try:
+                quick = await self._quick_scores([outputs[i] for i in candidates], prompt_or_job)
+            except (ValueError, TypeError, AttributeError, ValidationError):
+                pass  # judge every candidate in full instead
+            else:
+                ranked = sorted(zip(candidates, quick), key=lambda pair: -pair[1].overall_score)
+                finalists = [i for i, _ in ranked[: self.top_k]]
+                for i, judgment in ranked[self.top_k :]:
+                    judgments[i] = judgment
+
+        full = await asyncio.gather(*(self.judge_one(outputs[i], prompt_or_job) for i in finalists))
+        for i, judgment in zip(finalists, full):
+            judgments[i] = judgment
+        for i, verdict in enumerate(verdicts):
+            if verdict.action == "duplicate":
+                original = verdict.duplicate_of
+                judgments[i] = self._duplicate_judgment(outputs[i], outputs[original], judgments[original])
+
+        for judgment in judgments:
+            metrics.judge_outputs.inc(mode=self.mode, tier=judgment.tier)
+        return judgments
+
+    async def judge_all(
+        self, outputs: list[AgentOutput], prompt_or_job: str
+    ) -> list[AgentJudgment]:
+        """Judge every output of an orchestration together, as the configured mode does it."""
+        if self.mode == "batch":
+            return await self.judge_batch(outputs, prompt_or_job)
+        if self.mode in ("tiered", "top_k"):
+            return await self._judge_tiered(outputs, prompt_or_job)
+        judgments = await asyncio.gather(
+            *(self.judge_one(output, prompt_or_job) for output in outputs)
+        )
+        return list(judgments)
+
+    async def judge(self, outputs: list[AgentOutput], prompt_or_job: str) -> JudgeOutput:
+        """
+        Judge the work of the builder agents.
+        Returns JudgeOutput with ratings for each based on the 5-point criteria.
+        How the outputs are judged depends on the mode (see judge_all).
+        """
+        if not outputs:
+            raise ValueError("JudgeAgent expects at least one builder output")
+        return JudgeOutput(judgments=await self.judge_all(outputs, prompt_or_job))
@@ -1,15 +1,48 @@
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Protocol
+import asyncio
+import contextlib
+import hashlib
+from typing import AsyncIterator, Callable, List, Protocol
 
+from agents.image_prompt_writer import ImagePromptWriter
 from agents.judge_agent import JudgeAgent
+from agents.persona_builder import PLACEHOLDER_IMAGE, PersonaBuilder, load_personas
+from constants import (
+    ANALYZE_DEADLINE_SECONDS,
+    BUILD_DEADLINE_SECONDS,
+    IMAGE_PROMPT_MODE,
+    JUDGE_DEADLINE_SECONDS,
+    PARTIAL_RESULTS,
+    SPECULATIVE_BUILDS,
+)
 from models.agent_output import AgentOutput, OrchestratorOutput
-from query_analyzer import QueryAnalyzer, StructuredQuery
+from models.events import OrchestratorEvent
+from models.judgment import AgentJudgment
+from models.persona import Persona
+from query_analyzer import QueryAnalyzer, StructuredQuery, TaskTypeClassifier
+from services.artifacts import ArtifactStore
+from services.cache import ResponseCache, normalize_text
+from services.gateway import ModelGateway
+from services.persona_stats import PersonaSelector
+from services.scheduler import SchedulerOverloaded
+from services.semantic_cache import SemanticCache
+from services.singleflight import SingleFlight
+from services.telemetry import metrics, span
+from services.thumbnails import JudgeImagePreparer
 
 
 class BuilderAgent(Protocol):
     """Protocol for builder agents that accept StructuredQuery and return AgentOutput."""
 
-    def run(self, structured_query: StructuredQuery) -> AgentOutput: ...
+    name: str
+    persona: str
+    spec: Persona
+
+    async def run(
+        self,
+        structured_query: StructuredQuery,
+        image_prompt: str | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> AgentOutput: ...
 
 
 class OrchestratorAgent:
@@ -24,27 +57,499 @@ class OrchestratorAgent:
         builder_agents: List[BuilderAgent],
         query_analyzer: QueryAnalyzer,
         judge_agent: JudgeAgent,
+        prompt_writer: ImagePromptWriter | None = None,
+        partial_results: bool = PARTIAL_RESULTS,
+        output_cache: SemanticCache | None = None,
+        speculative: bool = SPECULATIVE_BUILDS,
+        persona_selector: PersonaSelector | None = None,
+        deadlines: bool = True,
     ):
-        if len(builder_agents) != 3:
-            raise ValueError("OrchestratorAgent requires exactly 3 builder agents (1, 2, 3)")
+        if not builder_agents:
+            raise ValueError("OrchestratorAgent requires at least one builder agent")
         self.builder_agents = builder_agents
         self.query_analyzer = query_analyzer
         self.judge_agent = judge_agent
+        # When set, image prompts for all personas are written up front
+        # (batched or templated) instead of one chat call per builder
+        self.prompt_writer = prompt_writer
+        # Stage deadlines; with partial_results a builder/judge that misses its
+        # deadline or fails is reported with a status instead of failing the run.
+        # Without deadlines (bulk runs, whose batches take hours) stages wait
+        # as long as their calls take.
+        self.partial_results = partial_results
+        self.analyze_deadline = ANALYZE_DEADLINE_SECONDS if deadlines else None
+        self.build_deadline = BUILD_DEADLINE_SECONDS if deadlines else None
+        self.judge_deadline = JUDGE_DEADLINE_SECONDS if deadlines else None
+        # When set, complete results of run() are reused for paraphrased queries
+        # with the same builder set
+        self.output_cache = output_cache
+        # Speculative mode: builders start on a locally classified provisional
+        # query while the analyzer runs, and are restarted if it disagrees
+        self.speculative = speculative
+        self.classifier = TaskTypeClassifier()
+        self._speculation = {"hits": 0, "misses": 0}
+        # Adaptive mode: run only the personas that tend to win for the intent
+        # and task type (when the caller did not ask for a pool size)
+        self.persona_selector = persona_selector
+        # Single-flight groups: identical concurrent work is computed once and shared
+        self._run_flight: SingleFlight[OrchestratorOutput] = SingleFlight("orchestrate")
+        self._analyze_flight: SingleFlight[StructuredQuery] = SingleFlight("analyzer")
+        self._build_flight: SingleFlight[AgentOutput] = SingleFlight("builder")
+        self._judge_flight: SingleFlight[AgentJudgment] = SingleFlight("judge")
 
-    def run(self, query: str) -> OrchestratorOutput:
+    def select_builders(self, pool_size: int | None = None) -> list[BuilderAgent]:
+        """The first `pool_size` builders in registry order (all when None)."""
+        if pool_size is None:
+            return self.builder_agents
+        if not 1 <= pool_size <= len(self.builder_agents):
+            raise ValueError(
+                f"pool_size must be between 1 and {len(self.builder_agents)}, got {pool_size}"
+            )
+        return self.builder_agents[:pool_size]
+
+    async def run(self, query: str, pool_size: int | None = None) -> OrchestratorOutput:
         """
         Parse the query, feed to builder agents, then judge the outputs.
-        Returns OrchestratorOutput with the 3 AgentOutput items and their judgments.
+        Returns OrchestratorOutput with one AgentOutput per builder and their judgments.
+        pool_size limits how many builders compete (default: all of them).
+        Each output is judged as soon as its builder finishes, so latency is
+        max(build_i + judge_i) rather than max(build) + judge.
+        Concurrent calls with the same normalized query share one run.
+        In speculative mode builders start before the analysis finishes.
+        """
+        builders = self.select_builders(pool_size)
+        adaptive = pool_size is None
+        key = f"{len(builders)}:{adaptive}:{normalize_text(query)}"
+        with span("orchestrate", builders=len(builders)):
+            return await self._run_flight.do(key, lambda: self._run(query, builders, adaptive))
+
+    async def _run(
+        self, query: str, builders: list[BuilderAgent], adaptive: bool = False
+    ) -> OrchestratorOutput:
+        # Paraphrases only share results for the same (predicted) task type and builder set
+        scope = f"{self.classifier.predict(query)}:{','.join(b.name for b in builders)}"
+        if self.output_cache is not None:
+            cached = await self.output_cache.get(query, scope)
+            if cached is not None:
+                return OrchestratorOutput.model_validate_json(cached)
+        parsed, builders, prebuilt = await self._analyze_speculatively(query, builders, adaptive)
+        result = await self._tournament(parsed, builders, prebuilt=prebuilt)
+        if self.output_cache is not None and result.status == "complete":
+            await self.output_cache.set(query, result.model_dump_json(), scope)
+        return result
+
+    async def stream(
+        self, query: str, pool_size: int | None = None, chunks: bool = False
+    ) -> AsyncIterator[OrchestratorEvent]:
+        """
+        Same pipeline as run(), but yields events as work completes: the parsed
+        query, each builder output as soon as that builder finishes, each judgment
+        as it arrives, and finally a summary event carrying the OrchestratorOutput.
+        With `chunks`, code builders stream their completions and each piece of
+        code is yielded as a chunk event while it is generated (builds are then
+        not speculative).
+        """
+        builders = self.select_builders(pool_size)
+        parsed, builders, prebuilt = await self._analyze_speculatively(
+            query, builders, pool_size is None, speculate=not chunks
+        )
+        try:
+            yield OrchestratorEvent(event="query", data=parsed, builders=[b.name for b in builders])
+        except BaseException:
+            for task in (prebuilt or {}).values():
+                task.cancel()
+            raise
+
+        events: asyncio.Queue[OrchestratorEvent | None] = asyncio.Queue()
+        tournament = asyncio.create_task(
+            self._tournament(parsed, builders, events.put_nowait, prebuilt=prebuilt, stream_chunks=chunks)
+        )
+        tournament.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            yield OrchestratorEvent(event="summary", data=tournament.result())
+        finally:
+            tournament.cancel()
+
+    async def run_batch(
+        self, queries: list[str], pool_size: int | None = None, max_concurrency: int = 16
+    ) -> AsyncIterator[OrchestratorEvent]:
+        """
+        Orchestrate many queries at once. All queries are analyzed together
+        (QueryAnalyzer.analyze_many), then every query's tournament runs
+        concurrently with at most `max_concurrency` builder/judge tasks in flight
+        across the whole batch. Yields the same events as stream(), tagged with
+        query_index, interleaved as work completes. A failing query ends with an
+        error event for that query; the others carry on.
+        """
+        builders = self.select_builders(pool_size)
+        limit = asyncio.Semaphore(max_concurrency)
+        events: asyncio.Queue[OrchestratorEvent] = asyncio.Queue()
+        analyses = await self.query_analyzer.analyze_many(queries)
+
+        async def run_one(query_index: int, parsed: StructuredQuery | BaseException) -> None:
+            def tag(event: OrchestratorEvent) -> None:
+                event.query_index = query_index
+                events.put_nowait(event)
+
+            if isinstance(parsed, BaseException):
+                tag(OrchestratorEvent(event="error", detail=str(parsed) or type(parsed).__name__))
+                return
+            chosen = await self._choose(builders, parsed) if pool_size is None else builders
+            tag(OrchestratorEvent(event="query", data=parsed, builders=[b.name for b in chosen]))
+            try:
+                result = await self._tournament(parsed, chosen, tag, limit)
+            except Exception as e:
+                tag(OrchestratorEvent(event="error", detail=str(e) or type(e).__name__))
+            else:
+                tag(OrchestratorEvent(event="summary", data=result))
+
+        tasks = [asyncio.create_task(run_one(i, parsed)) for i, parsed in enumerate(analyses)]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                event = await events.get()
+                if event.event in ("summary", "error"):
+                    remaining -= 1
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _tournament(
+        self,
+        parsed: StructuredQuery,
+        builders: list[BuilderAgent],
+        on_event: Callable[[OrchestratorEvent], None] | None = None,
+        limit: asyncio.Semaphore | None = None,
+        prebuilt: dict[str, asyncio.Task[AgentOutput]] | None = None,
+        stream_chunks: bool = False,
+    ) -> OrchestratorOutput:
+        """
+        Run every builder and pipe each output straight into its own judging
+        task. Judge calls for different builders overlap with each other and
+        with builders that are still running. In the batch, tiered and top_k
+        judge modes, all outputs are judged together once the last builder
+        finishes.
+        Results keep builder order. `limit`, when given, bounds the builder and
+        judge tasks in flight (shared across a batch of tournaments). `prebuilt`
+        holds builds already running per builder name (speculative mode).
+        With `stream_chunks`, code builders emit chunk events as they generate.
         """
-        parsed = self.query_analyzer.analyze(query)
-        with ThreadPoolExecutor(max_workers=len(self.builder_agents)) as executor:
-            futures = [executor.submit(agent.run, parsed) for agent in self.builder_agents]
-            outputs = [f.result() for f in futures]
         prompt_or_job = parsed.to_agent_prompt()
-        judge_output = self.judge_agent.judge(outputs, prompt_or_job)
-        # Attach judge's score to each AgentOutput
-        outputs_with_score = [
-            output.model_copy(update={"score": j.overall_score})
-            for output, j in zip(outputs, judge_output.judgments)
+        image_prompts = await self._image_prompts(parsed, builders) if prebuilt is None else {}
+
+        def emit(event: OrchestratorEvent) -> None:
+            if on_event is not None:
+                on_event(event)
+
+        def slot() -> contextlib.AbstractAsyncContextManager:
+            return limit if limit is not None else contextlib.nullcontext()
+
+        failures: dict[int, Exception] = {}
+
+        async def build(index: int, agent: BuilderAgent) -> AgentOutput:
+            def on_chunk(delta: str) -> None:
+                emit(OrchestratorEvent(event="chunk", index=index, delta=delta))
+
+            try:
+                async with slot():
+                    building = (
+                        prebuilt[agent.name]
+                        if prebuilt is not None
+                        else self._build(
+                            agent, parsed, image_prompts.get(agent.name), on_chunk if stream_chunks else None
+                        )
+                    )
+                    output = await asyncio.wait_for(building, self.build_deadline)
+            except Exception as e:
+                if not self.partial_results or isinstance(e, SchedulerOverloaded):
+                    raise
+                failures[index] = e
+                output = self._failed_output(agent, parsed, e)
+            if on_event is not None:
+                # A snapshot: the event may be serialized after _assemble sets the score
+                emit(OrchestratorEvent(event="output", index=index, data=output.model_copy()))
+            return output
+
+        async def judge(index: int, output: AgentOutput) -> AgentJudgment:
+            if output.status != "ok":
+                return self.judge_agent.unjudged(output, "skipped", f"builder status {output.status}")
+            try:
+                async with slot():
+                    return await asyncio.wait_for(self._judge(output, prompt_or_job), self.judge_deadline)
+            except Exception as e:
+                if not self.partial_results or isinstance(e, SchedulerOverloaded):
+                    raise
+                return self._failed_judgment(output, e)
+
+        if self.judge_agent.judges_together:
+            outputs = list(await asyncio.gather(*(build(i, agent) for i, agent in enumerate(builders))))
+            self._raise_if_nothing_built(outputs, failures)
+            judgments = await self._judge_together(outputs, prompt_or_job, slot)
+            for i, judgment in enumerate(judgments):
+                emit(OrchestratorEvent(event="judgment", index=i, data=judgment))
+            return await self._finish(parsed, outputs, judgments)
+
+        async def build_and_judge(
+            index: int, agent: BuilderAgent
+        ) -> tuple[AgentOutput, AgentJudgment]:
+            output = await build(index, agent)
+            judgment = await judge(index, output)
+            emit(OrchestratorEvent(event="judgment", index=index, data=judgment))
+            return output, judgment
+
+        results = await asyncio.gather(
+            *(build_and_judge(i, agent) for i, agent in enumerate(builders))
+        )
+        outputs = [output for output, _ in results]
+        judgments = [judgment for _, judgment in results]
+        self._raise_if_nothing_built(outputs, failures)
+        return await self._finish(parsed, outputs, judgments)
+
+    async def _judge_together(
+        self,
+        outputs: list[AgentOutput],
+        prompt_or_job: str,
+        slot: Callable[[], contextlib.AbstractAsyncContextManager],
+    ) -> list[AgentJudgment]:
+        """Judge the outputs that were built in one judge_all call (batch, tiered, top_k modes)."""
+        built = [o for o in outputs if o.status == "ok"]
+        by_name: dict[str, AgentJudgment] = {}
+        try:
+            async with slot():
+                with span(f"judge_{self.judge_agent.mode}", outputs=len(built)):
+                    judged = await asyncio.wait_for(
+                        self.judge_agent.judge_all(built, prompt_or_job), self.judge_deadline
+                    )
+            by_name = {o.agent_name: j for o, j in zip(built, judged)}
+        except Exception as e:
+            if not self.partial_results or isinstance(e, SchedulerOverloaded):
+                raise
+            by_name = {o.agent_name: self._failed_judgment(o, e) for o in built}
+        return [
+            by_name.get(o.agent_name)
+            or self.judge_agent.unjudged(o, "skipped", f"builder status {o.status}")
+            for o in outputs
         ]
-        return OrchestratorOutput(items=outputs_with_score, judgments=judge_output.judgments)
+
+    @staticmethod
+    def _status_of(error: Exception) -> str:
+        # asyncio.TimeoutError is only an alias of TimeoutError from Python 3.11
+        return "timeout" if isinstance(error, (TimeoutError, asyncio.TimeoutError)) else "error"
+
+    @classmethod
+    def _failed_output(cls, agent: BuilderAgent, parsed: StructuredQuery, error: Exception) -> AgentOutput:
+        """Stand-in output for a builder that missed its deadline or failed."""
+        status = cls._status_of(error)
+        return AgentOutput(
+            image=PLACEHOLDER_IMAGE,
+            agent_name=agent.name,
+            persona=agent.persona,
+            prompt_or_job=parsed.raw_query,
+            status=status,
+            error="Builder deadline exceeded" if status == "timeout" else str(error) or type(error).__name__,
+        )
+
+    def _failed_judgment(self, output: AgentOutput, error: Exception) -> AgentJudgment:
+        status = self._status_of(error)
+        reason = "judge deadline exceeded" if status == "timeout" else f"judge failed: {error}"
+        return self.judge_agent.unjudged(output, status, reason)
+
+    @staticmethod
+    def _raise_if_nothing_built(outputs: list[AgentOutput], failures: dict[int, Exception]) -> None:
+        """Partial results need at least one real output; otherwise surface the first failure."""
+        if failures and len(failures) == len(outputs):
+            raise failures[min(failures)]
+
+    async def _analyze(self, query: str) -> StructuredQuery:
+        """Analyzer stage, coalesced on the normalized query."""
+        with span("analyze"):
+            parsed = await asyncio.wait_for(
+                self._analyze_flight.do(normalize_text(query), lambda: self.query_analyzer.analyze(query)),
+                self.analyze_deadline,
+            )
+        if parsed.raw_query == query:
+            return parsed
+        return parsed.model_copy(update={"raw_query": query})
+
+    async def _image_prompts(
+        self, parsed: StructuredQuery, builders: list[BuilderAgent]
+    ) -> dict[str, str]:
+        """Image prompts for all builders up front, when a prompt writer is configured."""
+        if self.prompt_writer is None or parsed.task_type == "code":
+            return {}
+        with span("image_prompts", mode=self.prompt_writer.mode):
+            return await self.prompt_writer.write([b.spec for b in builders], parsed)
+
+    async def _choose(self, builders: list[BuilderAgent], parsed: StructuredQuery) -> list[BuilderAgent]:
+        """The builders the persona selector picks for this intent and task type (all without one)."""
+        if self.persona_selector is None:
+            return builders
+        names = set(
+            await self.persona_selector.select([b.name for b in builders], parsed.intent, parsed.task_type)
+        )
+        return [b for b in builders if b.name in names]
+
+    async def _finish(
+        self, parsed: StructuredQuery, outputs: list[AgentOutput], judgments: list[AgentJudgment]
+    ) -> OrchestratorOutput:
+        """Feed the judge scores to the persona selector's history, then assemble the result."""
+        if self.persona_selector is not None:
+            scores = {
+                output.agent_name: judgment.overall_score
+                for output, judgment in zip(outputs, judgments)
+                if output.status == "ok" and judgment.status == "ok"
+            }
+            await self.persona_selector.record(parsed.intent, parsed.task_type, scores)
+        return self._assemble(outputs, judgments)
+
+    async def _analyze_speculatively(
+        self, query: str, builders: list[BuilderAgent], adaptive: bool = False, speculate: bool = True
+    ) -> tuple[StructuredQuery, list[BuilderAgent], dict[str, asyncio.Task[AgentOutput]] | None]:
+        """
+        Analyze the query and, when `adaptive`, narrow `builders` with the
+        persona selector. In speculative mode, the (narrowed) builders already
+        run on the classifier's provisional query meanwhile. Returns the
+        analysis, the builders and those in-flight builds when the guess took
+        the same builder path (code vs image) and, when `adaptive`, the
+        selector picks the same builders for the real analysis. Otherwise the
+        builds are cancelled and None is returned, so the builders chosen for
+        the real analysis start on it.
+        """
+        if not (self.speculative and speculate):
+            parsed = await self._analyze(query)
+            return parsed, await self._choose(builders, parsed) if adaptive else builders, None
+
+        provisional = self.classifier.provisional(query)
+        speculative_builders = await self._choose(builders, provisional) if adaptive else builders
+        prompts = asyncio.create_task(self._image_prompts(provisional, speculative_builders))
+
+        async def build(agent: BuilderAgent) -> AgentOutput:
+            # Not coalesced: a cancelled speculative build must stop its upstream calls
+            image_prompt = (await prompts).get(agent.name)
+            with span("build", agent=agent.name, task_type=provisional.task_type, speculative=True):
+                return await agent.run(provisional, image_prompt)
+
+        tasks = {agent.name: asyncio.create_task(build(agent)) for agent in speculative_builders}
+        try:
+            parsed = await self._analyze(query)
+        except BaseException:
+            for task in (prompts, *tasks.values()):
+                task.cancel()
+            raise
+        outcome = "hit" if (parsed.task_type == "code") == (provisional.task_type == "code") else "miss"
+        chosen = await self._choose(builders, parsed) if adaptive else builders
+        if outcome == "hit" and [b.name for b in chosen] != [b.name for b in speculative_builders]:
+            # Same builder path, but the real intent picks other personas
+            outcome = "reselected"
+        self._speculation["hits" if outcome == "hit" else "misses"] += 1
+        metrics.speculative_builds.inc(outcome=outcome)
+        if outcome == "hit":
+            return parsed, speculative_builders, tasks
+        for task in (prompts, *tasks.values()):
+            task.cancel()
+        return parsed, chosen, None
+
+    def speculation_stats(self) -> dict[str, float | int | bool]:
+        """How often the classifier's task_type guess let speculative builds stand."""
+        hits, misses = self._speculation["hits"], self._speculation["misses"]
+        total = hits + misses
+        return {
+            "enabled": self.speculative,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+    async def _build(
+        self,
+        agent: BuilderAgent,
+        parsed: StructuredQuery,
+        image_prompt: str | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> AgentOutput:
+        """
+        Builder stage, coalesced on (builder name, StructuredQuery, image prompt).
+        Streamed code builds are not coalesced: their chunks go to this caller.
+        """
+        key = (
+            f"{agent.name}:{parsed.model_dump_json(exclude={'raw_query'})}:"
+            f"{normalize_text(parsed.raw_query)}:{image_prompt}"
+        )
+        with span("build", agent=agent.name, task_type=parsed.task_type):
+            if on_chunk is not None and parsed.task_type == "code":
+                return await agent.run(parsed, image_prompt, on_chunk)
+            # Followers get their own copy: _assemble sets the score in place
+            return await self._build_flight.do(
+                key, lambda: agent.run(parsed, image_prompt), share=lambda o: o.model_copy()
+            )
+
+    async def _judge(self, output: AgentOutput, prompt_or_job: str) -> AgentJudgment:
+        """Judge stage, coalesced on the judged content and the job text."""
+        digest = hashlib.sha256()
+        for part in (output.agent_name, output.image, str(output.extra.get("code", "")), prompt_or_job):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        with span("judge", agent=output.agent_name):
+            return await self._judge_flight.do(
+                digest.hexdigest(), lambda: self.judge_agent.judge_one(output, prompt_or_job)
+            )
+
+    def coalescing_stats(self) -> dict[str, dict]:
+        """Leader/follower counters for each single-flight group."""
+        flights = (self._run_flight, self._analyze_flight, self._build_flight, self._judge_flight)
+        return {flight.name: flight.stats() for flight in flights}
+
+    @staticmethod
+    def _assemble(
+        outputs: list[AgentOutput], judgments: list[AgentJudgment]
+    ) -> OrchestratorOutput:
+        """
+        Attach each judge's score to its AgentOutput and build the response.
+        Scores are set in place: each tournament owns its outputs (see _build),
+        and this skips a model_copy per output (benchmark_encoding.py).
+        """
+        for output, j in zip(outputs, judgments):
+            output.score = j.overall_score if j.status == "ok" else None
+        complete = all(o.status == "ok" for o in outputs) and all(j.status == "ok" for j in judgments)
+        return OrchestratorOutput(
+            items=outputs,
+            judgments=judgments,
+            status="complete" if complete else "partial",
+        )
+
+
+def create_orchestrator(
+    gateway: ModelGateway,
+    cache: ResponseCache | None = None,
+    artifacts: ArtifactStore | None = None,
+    query_cache: SemanticCache | None = None,
+    output_cache: SemanticCache | None = None,
+    persona_selector: PersonaSelector | None = None,
+    deadlines: bool = True,
+) -> OrchestratorAgent:
+    """
+    Wire the persona builders, analyzer, judge and prompt writer around one
+    gateway. deadlines=False turns the per-stage deadlines off, for gateways
+    whose calls legitimately take longer (BatchGateway).
+    """
+    personas = load_personas()
+    builders = [PersonaBuilder(persona, gateway, cache, artifacts) for persona in personas]
+    query_analyzer = QueryAnalyzer(gateway, cache, query_cache)
+    judge_agent = JudgeAgent(gateway, cache, artifacts, thumbnails=JudgeImagePreparer())
+    prompt_writer = (
+        ImagePromptWriter(gateway, IMAGE_PROMPT_MODE, cache, personas)
+        if IMAGE_PROMPT_MODE != "per_persona"
+        else None
+    )
+    return OrchestratorAgent(
+        builders,
+        query_analyzer,
+        judge_agent,
+        prompt_writer,
+        output_cache=output_cache,
+        persona_selector=persona_selector,
+        deadlines=deadlines,
+    )
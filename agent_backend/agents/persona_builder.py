@@ -0,0 +1,179 @@
+"""
+PersonaBuilder: one builder engine driven by persona definitions.
+Replaces the per-persona BuilderAgent1/2/3 classes; personas live in
+agents/personas.json (override with PERSONAS_PATH).
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+from constants import DALL_E_IMAGE_SIZE, IMAGE_MODEL, IMAGE_MODEL_QUALITY
+from models.agent_output import AgentOutput
+from models.persona import Persona, PersonaRegistry
+from query_analyzer import StructuredQuery
+from services.artifacts import ArtifactStore, put_base64
+from services.cache import ResponseCache, cache_key
+from services.gateway import ModelGateway
+from services.scheduler import Priority
+
+DEFAULT_PERSONAS_PATH = Path(__file__).with_name("personas.json")
+
+# 1x1 transparent PNG for AgentOutput.image (required field) when there is no image
+PLACEHOLDER_IMAGE = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+
+
+def load_personas(path: str | Path | None = None) -> list[Persona]:
+    """Load the persona registry from JSON (PERSONAS_PATH or the bundled file)."""
+    path = Path(path or os.getenv("PERSONAS_PATH") or DEFAULT_PERSONAS_PATH)
+    return PersonaRegistry.model_validate_json(path.read_text(encoding="utf-8")).personas
+
+
+class PersonaBuilder:
+    """
+    Builder agent for a single persona. Produces an image (prompt-writing call
+    followed by image generation) or, for code tasks, a single-file web app.
+    """
+
+    def __init__(
+        self,
+        spec: Persona,
+        gateway: ModelGateway,
+        cache: ResponseCache | None = None,
+        artifacts: ArtifactStore | None = None,
+    ):
+        self.spec = spec
+        self.gateway = gateway
+        self.cache = cache
+        self.artifacts = artifacts
+        self.name = spec.agent_name
+        self.persona = spec.persona
+
+    async def run(
+        self,
+        structured_query: StructuredQuery,
+        image_prompt: str | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> AgentOutput:
+        """
+        Execute the given query and return AgentOutput (image or code based on task_type).
+        For image tasks, a pre-written image_prompt (see ImagePromptWriter) skips
+        this builder's own prompt-writing call. For code tasks, `on_chunk`
+        switches to a streamed completion and receives the code as it is
+        generated (a cached result arrives as one chunk).
+        """
+        query = structured_query.to_agent_prompt()
+        key = self._cache_key(structured_query, query, image_prompt)
+        if self.cache is not None:
+            cached = await self.cache.get(key, namespace="builder")
+            if cached is not None:
+                output = AgentOutput.model_validate_json(cached).model_copy(
+                    update={"prompt_or_job": structured_query.raw_query}
+                )
+                if on_chunk is not None and "code" in output.extra:
+                    on_chunk(str(output.extra["code"]))
+                return output
+        output = await self._generate(structured_query, query, image_prompt, on_chunk)
+        if self.cache is not None:
+            await self.cache.set(key, output.model_dump_json())
+        return output
+
+    def _cache_key(
+        self, structured_query: StructuredQuery, query: str, image_prompt: str | None
+    ) -> str:
+        """Key on the prompt and, for image tasks, the image settings from constants.py."""
+        if structured_query.task_type == "code":
+            return cache_key(model="gpt-4o-mini", system_prompt=self.spec.system_prompt_code, user_content=query)
+        return cache_key(
+            model="gpt-4o-mini",
+            system_prompt=self.spec.system_prompt_image,
+            user_content=query,
+            image_prompt=image_prompt,
+            image_model=IMAGE_MODEL,
+            image_size=DALL_E_IMAGE_SIZE,
+            image_quality=IMAGE_MODEL_QUALITY,
+        )
+
+    def _code_messages(self, query: str) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": self.spec.system_prompt_code},
+            {"role": "user", "content": query},
+        ]
+
+    async def stream_code(self, structured_query: StructuredQuery) -> AsyncIterator[str]:
+        """The single-file web app for a code task, as chunks while the model writes it."""
+        async for chunk in self.gateway.chat_stream(
+            priority=Priority.BUILDER,
+            model="gpt-4o-mini",
+            messages=self._code_messages(structured_query.to_agent_prompt()),
+        ):
+            yield chunk
+
+    async def _generate(
+        self,
+        structured_query: StructuredQuery,
+        query: str,
+        image_prompt: str | None,
+        on_chunk: Callable[[str], None] | None = None,
+    ) -> AgentOutput:
+        """Call the upstream models for a cache miss."""
+        if structured_query.task_type == "code":
+            if on_chunk is None:
+                response = await self.gateway.chat(
+                    priority=Priority.BUILDER,
+                    model="gpt-4o-mini",
+                    messages=self._code_messages(query),
+                )
+                content = response.choices[0].message.content
+            else:
+                # Collect the chunks and join once at the end
+                parts: list[str] = []
+                async for chunk in self.stream_code(structured_query):
+                    parts.append(chunk)
+                    on_chunk(chunk)
+                content = "".join(parts)
+            code = content.strip() if content else ""
+            return AgentOutput(
+                image=PLACEHOLDER_IMAGE,
+                agent_name=self.name,
+                persona=self.persona,
+                prompt_or_job=structured_query.raw_query,
+                style_notes="Code output",
+                extra={"code": code},
+            )
+        else:
+            # Use dall-e-3 for image generation (task_type image, design, copy, mixed)
+            if image_prompt is None:
+                prompt_response = await self.gateway.chat(
+                    priority=Priority.BUILDER,
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": self.spec.system_prompt_image},
+                        {"role": "user", "content": query},
+                    ],
+                )
+                image_prompt = (prompt_response.choices[0].message.content or "").strip()
+
+            image_response = await self.gateway.generate_image(
+                priority=Priority.BUILDER,
+                model=IMAGE_MODEL,
+                prompt=image_prompt,
+                size=DALL_E_IMAGE_SIZE,
+                quality=IMAGE_MODEL_QUALITY,
+            )
+            b64_data = image_response.data[0].b64_json
+            if self.artifacts is not None:
+                artifact_id = await asyncio.to_thread(put_base64, self.artifacts, b64_data, "image/png")
+                image_uri = self.artifacts.url(artifact_id)
+            else:
+                artifact_id = None
+                image_uri = f"data:image/png;base64,{b64_data}"
+            return AgentOutput(
+                image=image_uri,
+                artifact_id=artifact_id,
+                agent_name=self.name,
+                persona=self.persona,
+                prompt_or_job=structured_query.raw_query,
+                style_notes=image_prompt,
+            )
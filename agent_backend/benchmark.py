@@ -0,0 +1,206 @@
+"""
+Load benchmark for POST /orchestrate.
+
+    python benchmark.py --concurrency 1,8,32 --requests 64
+    python benchmark.py --url http://localhost:8000 --concurrency 16
+
+By default the app runs in-process (ASGI transport, no sockets) against the
+deterministic FakeOpenAI upstream, with the response cache off and a distinct
+query per request so every request does the full analyze/build/judge work.
+For each concurrency level it reports p50/p95/p99 latency, throughput, errors,
+peak RSS growth per in-flight request and the peak thread count (in-process
+mode only; --trace-memory adds the Python heap peak per in-flight request).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux; 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    requests: int
+    errors: int
+    wall_seconds: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rss_per_request_mb: float | None
+    heap_per_request_mb: float | None
+    peak_threads: int | None
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    total: int,
+    query: str,
+    same_query: bool,
+    in_process: bool,
+    trace_memory: bool,
+) -> LevelResult:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+    peak_rss = baseline_rss = rss_bytes()
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample() -> None:
+        nonlocal peak_rss, peak_threads
+        while not done.is_set():
+            peak_rss = max(peak_rss, rss_bytes())
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            body = {"query": query if same_query else f"{query} (variant {concurrency}-{i})"}
+            start = time.perf_counter()
+            try:
+                response = await client.post("/orchestrate", json=body)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    if trace_memory:
+        tracemalloc.reset_peak()
+        heap_baseline = tracemalloc.get_traced_memory()[0]
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    latencies.sort()
+    mb = 1024 * 1024
+    return LevelResult(
+        concurrency=concurrency,
+        requests=total,
+        errors=errors,
+        wall_seconds=round(wall, 3),
+        throughput_rps=round(len(latencies) / wall, 2) if wall else 0.0,
+        p50_ms=round(percentile(latencies, 50) * 1000, 1),
+        p95_ms=round(percentile(latencies, 95) * 1000, 1),
+        p99_ms=round(percentile(latencies, 99) * 1000, 1),
+        rss_per_request_mb=round((peak_rss - baseline_rss) / concurrency / mb, 2) if in_process else None,
+        heap_per_request_mb=(
+            round((tracemalloc.get_traced_memory()[1] - heap_baseline) / concurrency / mb, 2)
+            if trace_memory
+            else None
+        ),
+        peak_threads=peak_threads if in_process else None,
+    )
+
+
+def print_table(results: list[LevelResult]) -> None:
+    columns = [
+        ("conc", "concurrency"), ("reqs", "requests"), ("err", "errors"), ("rps", "throughput_rps"),
+        ("p50 ms", "p50_ms"), ("p95 ms", "p95_ms"), ("p99 ms", "p99_ms"),
+        ("rss MB/req", "rss_per_request_mb"), ("heap MB/req", "heap_per_request_mb"), ("threads", "peak_threads"),
+    ]
+    print("  ".join(f"{title:>11}" for title, _ in columns))
+    for result in results:
+        values = [getattr(result, name) for _, name in columns]
+        print("  ".join(f"{'-' if v is None else v:>11}" for v in values))
+
+
+async def run(args: argparse.Namespace) -> list[LevelResult]:
+    in_process = args.url is None
+    if in_process:
+        # Configure the app before importing it: fake upstream, no response cache
+        os.environ["FAKE_OPENAI"] = "true"
+        os.environ.setdefault("CACHE_ENABLED", "false")
+        os.environ.setdefault("ARTIFACT_STORE", args.artifact_store)
+        os.environ.setdefault("FAKE_OPENAI_CHAT_SECONDS", str(args.chat_seconds))
+        os.environ.setdefault("FAKE_OPENAI_IMAGE_SECONDS", str(args.image_seconds))
+        os.environ.setdefault("FAKE_OPENAI_ERROR_RATE", str(args.error_rate))
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+    else:
+        transport = None
+        base_url = args.url
+
+    if args.trace_memory:
+        tracemalloc.start()
+    results = []
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=timeout) as client:
+        if args.warmup:
+            await client.post("/orchestrate", json={"query": f"{args.query} (warmup)"})
+        for concurrency in args.concurrency:
+            total = args.requests or concurrency * 4
+            result = await run_level(
+                client, concurrency, total, args.query, args.same_query, in_process, args.trace_memory
+            )
+            results.append(result)
+            print(f"concurrency {concurrency}: done in {result.wall_seconds}s", file=sys.stderr)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load benchmark for POST /orchestrate")
+    parser.add_argument("--url", default=None, help="Benchmark a running server instead of the in-process app")
+    parser.add_argument(
+        "--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32],
+        help="Comma-separated concurrency levels",
+    )
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level (default: 4 x concurrency)")
+    parser.add_argument("--query", default="Create a poster image for a coffee shop opening")
+    parser.add_argument("--same-query", action="store_true", help="Send identical queries (measures coalescing)")
+    parser.add_argument("--chat-seconds", type=float, default=0.2, help="Fake chat latency median")
+    parser.add_argument("--image-seconds", type=float, default=1.0, help="Fake image latency median")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake upstream error rate")
+    parser.add_argument("--artifact-store", default="inline", choices=("inline", "local"))
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--warmup", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--trace-memory", action="store_true", help="Track Python heap peaks (slower)")
+    parser.add_argument("--json", type=Path, default=None, help="Also write results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2))
+    return 1 if any(r.errors for r in results) and not args.error_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
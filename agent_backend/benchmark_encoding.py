@@ -0,0 +1,142 @@
+"""
+Micro-benchmark for the /orchestrate response path.
+
+    python benchmark_encoding.py
+    python benchmark_encoding.py --repeat 50 --json encoding.json
+
+Builds OrchestratorOutputs like the ones FakeOpenAI produces (three image
+outputs with inline base64 PNGs, three with artifact URLs, three code
+outputs) and times, per payload:
+- score attachment: model_copy per output (the previous _assemble) vs
+  setting the score in place (the current one);
+- serialization: pydantic's JSON serializer (FastAPI's response_model path)
+  vs orjson (services/encoding.py), full and with the
+  judgments,items.agent_name,items.score projection;
+- compression with each available encoding, with the resulting size.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+from models.agent_output import AgentOutput, OrchestratorOutput
+from models.judgment import JUDGE_CRITERIA, AgentJudgment, CriterionRating
+from services.encoding import CompressionSettings, dumps, parse_fields
+from services.fake_openai import FakeOpenAI, fake_png_base64
+
+SCORES_ONLY = "judgments,items.agent_name,items.score"
+
+
+@dataclass
+class Row:
+    payload: str
+    step: str
+    ms: float
+    bytes: int | None = None
+
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    """Median of `repeat` runs, in milliseconds (includes allocation and GC costs)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def repeat_call(fn: Callable[[], object], times: int) -> None:
+    for _ in range(times):
+        fn()
+
+
+def payloads(image_size: int) -> dict[str, tuple[list[AgentOutput], list[AgentJudgment]]]:
+    image = "data:image/png;base64," + fake_png_base64(image_size, 0.5, 0)
+    code = FakeOpenAI()._html(random.Random(0))
+    kinds = {
+        "inline images": {"image": image},
+        "image urls": {"image": "/artifacts/" + "0" * 64 + ".png"},
+        "code": {"image": "data:image/png;base64,", "extra": {"code": code}},
+    }
+    result = {}
+    for name, fields in kinds.items():
+        outputs = [
+            AgentOutput(agent_name=f"Builder{i}", persona="persona", prompt_or_job="job", **fields) for i in range(3)
+        ]
+        judgments = [
+            AgentJudgment(
+                agent_name=o.agent_name,
+                persona=o.persona,
+                criteria_ratings=[CriterionRating(criterion=c, score=4, rationale="x" * 120) for c in JUDGE_CRITERIA],
+                overall_score=4.0,
+                summary="y" * 300,
+            )
+            for o in outputs
+        ]
+        result[name] = (outputs, judgments)
+    return result
+
+
+def run(args: argparse.Namespace) -> list[Row]:
+    rows: list[Row] = []
+    include = parse_fields(OrchestratorOutput, SCORES_ONLY)
+    compression = CompressionSettings()
+    for name, (outputs, judgments) in payloads(args.image_size).items():
+
+        # Loop variables are bound as defaults so each closure keeps this payload's values
+        def with_copy(outputs=outputs, judgments=judgments) -> OrchestratorOutput:
+            items = [o.model_copy(update={"score": j.overall_score}) for o, j in zip(outputs, judgments)]
+            return OrchestratorOutput(items=items, judgments=judgments)
+
+        def in_place(outputs=outputs, judgments=judgments) -> OrchestratorOutput:
+            for o, j in zip(outputs, judgments):
+                o.score = j.overall_score
+            return OrchestratorOutput(items=outputs, judgments=judgments)
+
+        # Attachment takes microseconds: time 100 rounds per sample
+        for step, attach in (("attach: model_copy", with_copy), ("attach: in place", in_place)):
+            rows.append(Row(name, step, median_ms(partial(repeat_call, attach, 100), args.repeat) / 100))
+
+        result = in_place()
+        body = result.model_dump_json().encode("utf-8")
+        rows.append(Row(name, "json: pydantic", median_ms(result.model_dump_json, args.repeat), len(body)))
+        rows.append(Row(name, "json: orjson", median_ms(partial(dumps, result), args.repeat), len(dumps(result))))
+        projected_ms = median_ms(partial(dumps, result, include), args.repeat)
+        rows.append(Row(name, "json: orjson, scores only", projected_ms, len(dumps(result, include))))
+        for encoding, compress in compression.compressors().items():
+            rows.append(
+                Row(name, f"compress: {encoding}", median_ms(partial(compress, body), args.repeat), len(compress(body)))
+            )
+    return rows
+
+
+def print_table(rows: list[Row]) -> None:
+    print(f"{'payload':<15}{'step':<28}{'ms':>10}{'bytes':>12}")
+    for row in rows:
+        size = "-" if row.bytes is None else str(row.bytes)
+        print(f"{row.payload:<15}{row.step:<28}{row.ms:>10.3f}{size:>12}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark for /orchestrate response encoding")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per measurement (the median is reported)")
+    parser.add_argument("--image-size", type=int, default=1024, help="Side of the fake PNGs in pixels")
+    parser.add_argument("--json", type=Path, default=None, help="Also write results as JSON")
+    args = parser.parse_args()
+
+    rows = run(args)
+    print_table(rows)
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in rows], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Offline bulk orchestration through batch request files (see services/batch.py).
+
+    python bulk.py queries.txt -o results.jsonl --work-dir batches/nightly
+    python bulk.py queries.jsonl -o results.jsonl --backend local
+    FAKE_OPENAI=true python bulk.py queries.txt -o results.jsonl --backend local
+
+Queries come one per line, or as JSONL objects with a "query" field. Every
+query is orchestrated as usual, but upstream calls are written as Batch API
+request files per stage and run through the chosen backend. Each line of the
+output file is {"query", "result": OrchestratorOutput} or {"query", "error"}.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.orchestrator_agent import create_orchestrator
+from services.artifacts import LocalArtifactStore
+from services.batch import BatchGateway, LocalBatchBackend, OpenAIBatchBackend
+from services.cache import ResponseCache
+from services.fake_openai import FakeOpenAI
+from services.http_client import HTTPClientSettings, create_http_client, create_openai_client
+
+FAKE_OPENAI = os.getenv("FAKE_OPENAI", "false").lower() in ("1", "true", "yes")
+
+
+def read_queries(path: Path) -> list[str]:
+    queries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return queries
+
+
+def write_results(path: Path, queries: list[str], results: list) -> int:
+    """Write one output line per query; returns the number of failed queries."""
+    failed = 0
+    with path.open("w", encoding="utf-8") as f:
+        for query, result in zip(queries, results):
+            if isinstance(result, BaseException):
+                failed += 1
+                record = {"query": query, "error": str(result) or type(result).__name__}
+            else:
+                record = {"query": query, "result": result.model_dump(mode="json")}
+            f.write(json.dumps(record) + "\n")
+    return failed
+
+
+async def run_bulk(args: argparse.Namespace) -> int:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if FAKE_OPENAI and args.backend != "local":
+        # FakeOpenAI only simulates the chat and images endpoints, not files/batches
+        print("FAKE_OPENAI requires --backend local", file=sys.stderr)
+        return 2
+    if not FAKE_OPENAI and not api_key:
+        print("OPENAI_API_KEY environment variable is not set", file=sys.stderr)
+        return 2
+    queries = await asyncio.to_thread(read_queries, args.queries)
+    http_client = create_http_client(HTTPClientSettings.from_env())
+    cache = ResponseCache.from_env()
+    try:
+        # Simulated upstream for local runs (services/fake_openai.py)
+        client = FakeOpenAI() if FAKE_OPENAI else create_openai_client(api_key, http_client)
+        backend = (
+            OpenAIBatchBackend(client, poll_interval=args.poll_interval)
+            if args.backend == "openai"
+            else LocalBatchBackend(client)
+        )
+        gateway = BatchGateway(backend, args.work_dir, settle=args.settle)
+        # A batch can take up to its 24h completion window: no stage deadlines
+        orchestrator = create_orchestrator(gateway, cache, LocalArtifactStore.from_env(), deadlines=False)
+        orchestrator.select_builders(args.builders)
+        results = await gateway.drive(orchestrator.run(q, args.builders) for q in queries)
+    finally:
+        await http_client.aclose()
+        if cache is not None:
+            await cache.close()
+
+    failed = await asyncio.to_thread(write_results, args.output, queries, results)
+    print(
+        f"{len(queries) - failed}/{len(queries)} queries succeeded; "
+        f"{gateway.requests_written} batch requests in {args.work_dir}",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("queries", type=Path, help="Text file (one query per line) or JSONL with a query field")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Where to write result JSONL")
+    parser.add_argument("--work-dir", type=Path, default=Path("batches"), help="Batch request/result files")
+    parser.add_argument("--backend", choices=("openai", "local"), default="openai")
+    parser.add_argument("--builders", type=int, default=None, help="Personas per query (default: all)")
+    parser.add_argument("--settle", type=float, default=0.5, help="Seconds without new calls before a flush")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Batch status poll interval")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    return asyncio.run(run_bulk(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 """
-Shared constants for image generation.
+Shared constants for query analysis, image generation, judging and deadlines.
 IMAGE_MODEL is read from env; change .env to switch models.
 """
 
@@ -15,3 +15,46 @@ DALL_E_IMAGE_SIZE = "1024x1024"
 
 # Quality: "low", "medium", "standard", or "hd" (model-dependent)
 IMAGE_MODEL_QUALITY = "medium"
+
+# POST /orchestrate/batch: uncached queries analyzed per batched analyzer call, and the
+# max builder/judge tasks in flight across the whole batch
+ANALYZER_BATCH_SIZE = int(os.getenv("ANALYZER_BATCH_SIZE", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+# How image prompts are written before images.generate (IMAGE_PROMPT_MODE in env):
+# "per_persona": each builder makes its own prompt-writing chat call (default)
+# "batched":     one structured chat call writes the prompts for every persona
+# "template":    prompts are rendered from persona templates, no chat call
+IMAGE_PROMPT_MODE = os.getenv("IMAGE_PROMPT_MODE", "per_persona")
+
+# How JudgeAgent is called (JUDGE_MODE in env):
+# "pipelined": one request per output, started as soon as its builder finishes (default)
+# "batch":     one request judging all outputs of an orchestration together
+# "tiered":    local checks first (broken outputs, duplicate builders), then one
+#              request per remaining output
+# "top_k":     like tiered, but a scores-only pass ranks the remaining outputs and
+#              only the JUDGE_TOP_K finalists get full judgments with rationales
+JUDGE_MODE = os.getenv("JUDGE_MODE", "pipelined")
+JUDGE_TOP_K = int(os.getenv("JUDGE_TOP_K", "2"))
+# Two images whose 64-bit perceptual hashes differ in at most this many bits are duplicates
+JUDGE_DUPLICATE_DISTANCE = int(os.getenv("JUDGE_DUPLICATE_DISTANCE", "4"))
+
+# Images sent to the vision judge are downscaled and re-encoded first.
+# JUDGE_IMAGE_MAX_SIZE is the longest side in pixels (0 sends the original image).
+# JUDGE_IMAGE_DETAIL is the vision "detail" level: "low", "high" or "auto".
+JUDGE_IMAGE_MAX_SIZE = int(os.getenv("JUDGE_IMAGE_MAX_SIZE", "512"))
+JUDGE_IMAGE_FORMAT = os.getenv("JUDGE_IMAGE_FORMAT", "JPEG")
+JUDGE_IMAGE_QUALITY = int(os.getenv("JUDGE_IMAGE_QUALITY", "80"))
+JUDGE_IMAGE_DETAIL = os.getenv("JUDGE_IMAGE_DETAIL", "low")
+
+# Per-stage deadlines in seconds for one orchestration. With PARTIAL_RESULTS on,
+# a builder or judge that misses its deadline (or fails) is reported with a
+# status on its output/judgment instead of failing the whole request.
+ANALYZE_DEADLINE_SECONDS = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "30"))
+BUILD_DEADLINE_SECONDS = float(os.getenv("BUILD_DEADLINE_SECONDS", "120"))
+JUDGE_DEADLINE_SECONDS = float(os.getenv("JUDGE_DEADLINE_SECONDS", "60"))
+PARTIAL_RESULTS = os.getenv("PARTIAL_RESULTS", "true").lower() not in ("0", "false", "no")
+
+# Start builders on a locally classified task_type while QueryAnalyzer runs;
+# they are cancelled and restarted if the analysis picks the other builder path.
+SPECULATIVE_BUILDS = os.getenv("SPECULATIVE_BUILDS", "false").lower() in ("1", "true", "yes")
@@ -1,52 +1,324 @@
+import asyncio
 import os
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from agents.builder_agent_1 import BuilderAgent1
-from agents.builder_agent_2 import BuilderAgent2
-from agents.builder_agent_3 import BuilderAgent3
-from agents.judge_agent import JudgeAgent
-from agents.orchestrator_agent import OrchestratorAgent
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import BaseModel, Field
+
+from agents.orchestrator_agent import OrchestratorAgent, create_orchestrator
+from constants import BATCH_MAX_CONCURRENCY
 from models.agent_output import AgentOutput, OrchestratorOutput
-from query_analyzer import QueryAnalyzer
+from models.events import OrchestratorEvent
+from models.job import Job
+from services.artifacts import ARTIFACT_ID_PATTERN, LocalArtifactStore, content_type_for
+from services.cache import ResponseCache
+from services.encoding import CompressionSettings, ORJSONResponse, json_response, parse_fields
+from services.fake_openai import FakeOpenAI
+from services.gateway import ModelGateway
+from services.http_client import (
+    HTTPClientSettings,
+    create_http_client,
+    create_openai_client,
+    pool_stats,
+)
+from services.jobs import JobQueue
+from services.resilience import ResilienceSettings
+from services.persona_stats import PersonaSelector
+from services.scheduler import Scheduler, SchedulerOverloaded
+from services.semantic_cache import SemanticCache
+from services.telemetry import metrics
+
+# Pooled HTTP client shared by every upstream call (see services/http_client.py)
+_http_settings = HTTPClientSettings.from_env()
+_http_client = create_http_client(_http_settings)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await _jobs.start()
+    yield
+    await _jobs.stop()
+    await _http_client.aclose()
+    if _cache is not None:
+        await _cache.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+
+# Simulated upstream instead of OpenAI, for benchmarks (see services/fake_openai.py)
+FAKE_OPENAI = os.getenv("FAKE_OPENAI", "false").lower() in ("1", "true", "yes")
 
 # Initialize orchestrator with builder agents (lazy init on first request)
 _orchestrator: OrchestratorAgent | None = None
 
+# Response cache shared by the analyzer, builders and judge (None when disabled)
+_cache: ResponseCache | None = ResponseCache.from_env()
+
+# Semantic caches for paraphrased queries: analyzer results, and (opt-in via
+# SEMANTIC_CACHE_OUTPUTS) whole orchestration results. None when disabled.
+_query_cache: SemanticCache | None = SemanticCache.from_env("analyzer")
+_output_cache: SemanticCache | None = (
+    SemanticCache.from_env("orchestrate")
+    if os.getenv("SEMANTIC_CACHE_OUTPUTS", "false").lower() in ("1", "true", "yes")
+    else None
+)
+
+# Adaptive persona selection from past judge scores (None runs every persona)
+_persona_selector: PersonaSelector | None = PersonaSelector.from_env()
+
+# Content-addressed store for generated images (None means inline data URIs)
+_artifacts: LocalArtifactStore | None = LocalArtifactStore.from_env()
+
+# Negotiated gzip/br/zstd compression of /orchestrate responses
+_compression = CompressionSettings.from_env()
+
+# Admission control for every upstream chat/image call
+_scheduler = Scheduler.from_env()
+metrics.gauge("scheduler_in_flight", "Upstream calls currently running.", lambda: _scheduler.stats()["in_flight"])
+metrics.gauge("scheduler_queued", "Upstream calls waiting for a slot.", lambda: _scheduler.stats()["queued"])
+
+
+@app.exception_handler(SchedulerOverloaded)
+async def scheduler_overloaded_handler(request: Request, exc: SchedulerOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(TimeoutError)
+@app.exception_handler(asyncio.TimeoutError)  # a distinct class before Python 3.11
+async def deadline_exceeded_handler(request: Request, exc: Exception) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": "Orchestration stage deadline exceeded"})
+
 
 def get_orchestrator() -> OrchestratorAgent:
     global _orchestrator
     if _orchestrator is None:
         api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        if FAKE_OPENAI:
+            # Simulated upstream for benchmarks and local runs (services/fake_openai.py)
+            client = FakeOpenAI()
+        elif not api_key:
             raise HTTPException(
                 status_code=500,
                 detail="OPENAI_API_KEY environment variable is not set",
             )
-        builders = [
-            BuilderAgent1(api_key),
-            BuilderAgent2(api_key),
-            BuilderAgent3(api_key),
-        ]
-        query_analyzer = QueryAnalyzer(api_key)
-        judge_agent = JudgeAgent(api_key)
-        _orchestrator = OrchestratorAgent(builders, query_analyzer, judge_agent)
+        else:
+            client = create_openai_client(api_key, _http_client)
+        # One AsyncOpenAI client (and connection pool) shared by every agent,
+        # with every call going through the scheduler, retried and hedged
+        gateway = ModelGateway(client, _scheduler, ResilienceSettings.from_env())
+        _orchestrator = create_orchestrator(
+            gateway, _cache, _artifacts, _query_cache, _output_cache, _persona_selector
+        )
     return _orchestrator
 
 
+# Durable background jobs (SQLite-backed), processed by a pool of workers
+_jobs = JobQueue.from_env(get_orchestrator)
+
+
 class QueryRequest(BaseModel):
     query: str
+    builders: int | None = Field(
+        None,
+        ge=1,
+        description="How many personas compete (registry order); defaults to all of them",
+    )
+
+
+class BatchQueryRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, max_length=100)
+    builders: int | None = Field(
+        None,
+        ge=1,
+        description="How many personas compete for every query; defaults to all of them",
+    )
+
 
+def check_pool_size(
+    orchestrator: OrchestratorAgent, request: QueryRequest | BatchQueryRequest
+) -> None:
+    if request.builders is not None and request.builders > len(orchestrator.builder_agents):
+        raise HTTPException(
+            status_code=422,
+            detail=f"builders must be at most {len(orchestrator.builder_agents)}",
+        )
 
-@app.post("/orchestrate", response_model=OrchestratorOutput)
-def orchestrate(request: QueryRequest) -> OrchestratorOutput:
-    """Feed a query to the orchestrator agent and return outputs + judgments for NestJS."""
+
+@app.post("/orchestrate", response_model=OrchestratorOutput, response_class=ORJSONResponse)
+async def orchestrate(
+    request: QueryRequest,
+    fields: str | None = Query(
+        None,
+        description="Comma-separated fields to return, e.g. judgments,items.agent_name,items.score",
+    ),
+    accept_encoding: str | None = Header(None),
+) -> Response:
+    """
+    Feed a query to the orchestrator agent and return outputs + judgments for NestJS.
+    ?fields= projects the response (clients that only need judgments and
+    scores can skip the image/extra blobs); the body is compressed with the
+    best encoding in Accept-Encoding.
+    """
+    try:
+        include = parse_fields(OrchestratorOutput, fields) if fields is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    orchestrator = get_orchestrator()
+    check_pool_size(orchestrator, request)
+    _scheduler.admit()
+    result = await orchestrator.run(request.query, request.builders)
+    return await json_response(result, accept_encoding, _compression, include)
+
+
+@app.post("/orchestrate/stream")
+async def orchestrate_stream(request: QueryRequest, chunks: bool = False) -> StreamingResponse:
+    """
+    Streaming variant of /orchestrate. Emits NDJSON OrchestratorEvents: the parsed
+    query, each builder output and judgment as it completes, then a summary.
+    With ?chunks=true, code tasks also stream each builder's code as it is
+    generated: chunk events (index = builder, delta = text), interleaved
+    across the personas.
+    """
     orchestrator = get_orchestrator()
-    return orchestrator.run(request.query)
+    check_pool_size(orchestrator, request)
+    _scheduler.admit()
+
+    async def ndjson() -> AsyncIterator[str]:
+        try:
+            async for event in orchestrator.stream(request.query, request.builders, chunks):
+                yield event.model_dump_json() + "\n"
+        except Exception as e:
+            yield OrchestratorEvent(event="error", detail=str(e) or type(e).__name__).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/orchestrate/batch")
+async def orchestrate_batch(request: BatchQueryRequest) -> StreamingResponse:
+    """
+    Orchestrate many queries in one request. Queries are analyzed together in
+    batched analyzer calls and share one bounded pool of builder/judge tasks.
+    Streams NDJSON OrchestratorEvents tagged with query_index; each query ends
+    with its own summary or error event, so one failure does not fail the rest.
+    """
+    orchestrator = get_orchestrator()
+    check_pool_size(orchestrator, request)
+    _scheduler.admit()
+
+    async def ndjson() -> AsyncIterator[str]:
+        try:
+            async for event in orchestrator.run_batch(
+                request.queries, request.builders, BATCH_MAX_CONCURRENCY
+            ):
+                yield event.model_dump_json() + "\n"
+        except Exception as e:
+            yield OrchestratorEvent(event="error", detail=str(e) or type(e).__name__).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: QueryRequest) -> dict:
+    """Queue an orchestration and return its job ID immediately; poll GET /jobs/{id}."""
+    orchestrator = get_orchestrator()
+    check_pool_size(orchestrator, request)
+    job = await _jobs.submit(request.query, request.builders)
+    return {"id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str) -> Job:
+    """Status, progress and (once succeeded) the OrchestratorOutput of a job."""
+    job = await _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/cache/stats")
+def cache_stats() -> dict:
+    """Hit/miss counters for the response cache and the semantic caches."""
+    semantic = {c.name: c.stats() for c in (_query_cache, _output_cache) if c is not None}
+    if _cache is None:
+        return {"enabled": False, "semantic": semantic}
+    return {"enabled": True, **_cache.stats(), "semantic": semantic}
+
+
+@app.get("/coalescing/stats")
+def coalescing_stats() -> dict:
+    """Single-flight counters: leaders ran the work, followers shared it."""
+    if _orchestrator is None:
+        return {}
+    return _orchestrator.coalescing_stats()
+
+
+@app.get("/speculation/stats")
+def speculation_stats() -> dict:
+    """Hit rate of speculative builds (the local task_type guess matched the analysis)."""
+    if _orchestrator is None:
+        return {}
+    return _orchestrator.speculation_stats()
+
+
+@app.get("/personas/stats")
+def persona_stats() -> dict:
+    """Judge score history per (intent, task_type, persona) used for adaptive selection."""
+    if _persona_selector is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "policy": _persona_selector.policy,
+        "top_k": _persona_selector.k,
+        "explore_rate": _persona_selector.explore_rate,
+        "scores": _persona_selector.store.dump(),
+    }
+
+
+@app.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str, request: Request) -> Response:
+    """Serve a stored artifact. IDs are content hashes, so responses are immutable."""
+    if _artifacts is None or not ARTIFACT_ID_PATTERN.match(artifact_id):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    path = _artifacts.path(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    etag = f'"{artifact_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=content_type_for(artifact_id), headers=headers)
+
+
+@app.get("/scheduler/stats")
+def scheduler_stats() -> dict:
+    """In-flight, queued and rejected counts for upstream calls."""
+    return _scheduler.stats()
+
+
+@app.get("/pool/stats")
+def http_pool_stats() -> dict:
+    """Upstream HTTP connection pool usage, for sizing against worker count."""
+    return pool_stats(_http_client, _http_settings)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Stage and upstream latency histograms, token/cost/cache counters (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -4,7 +4,7 @@ All builder agents can use this as their standard output type.
 """
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
@@ -15,7 +15,11 @@ class AgentOutput(BaseModel):
     """Metadata accompanying an agent-generated image."""
 
     image: str = Field(
-        ..., description="Image as base64-encoded string (e.g. data URI or raw base64)"
+        ...,
+        description="Image URL served by /artifacts, or a base64 data URI / raw base64 string",
+    )
+    artifact_id: str | None = Field(
+        None, description="Content-addressed artifact ID when the image is in the artifact store"
     )
     agent_name: str = Field(
         ..., description="Name of the agent that produced the output"
@@ -30,24 +34,30 @@ class AgentOutput(BaseModel):
         default_factory=dict, description="Additional key-value metadata"
     )
     score: float | None = Field(
-        None, description="Judge's overall score (1-5) for this output"
+        None, description="Judge's overall score (1-5) for this output; None when it was not judged"
     )
+    status: Literal["ok", "timeout", "error"] = Field(
+        "ok", description="ok, or why the builder produced no real output (deadline missed / failed)"
+    )
+    error: str | None = Field(None, description="What went wrong when status is not ok")
 
     model_config = {"extra": "allow"}
 
 
 class OrchestratorOutput(BaseModel):
-    """Response model containing the 3 AgentOutput items and their judgments."""
+    """Response model containing one AgentOutput per builder and their judgments."""
 
     items: list[AgentOutput] = Field(
         ...,
-        min_length=3,
-        max_length=3,
-        description="The 3 AgentOutput items from builder agents 1, 2, 3",
+        min_length=1,
+        description="AgentOutput items, in builder (persona registry) order",
     )
     judgments: list[AgentJudgment] = Field(
         ...,
-        min_length=3,
-        max_length=3,
-        description="JudgeAgent ratings for each of the 3 builder outputs",
+        min_length=1,
+        description="JudgeAgent ratings, aligned with items",
+    )
+    status: Literal["complete", "partial"] = Field(
+        "complete",
+        description="partial when some builders or judgments missed their deadline or failed",
     )
@@ -0,0 +1,34 @@
+"""
+Events emitted by the streaming and batch orchestration endpoints.
+Each event is serialized as one NDJSON line.
+"""
+
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from models.agent_output import AgentOutput, OrchestratorOutput
+from models.judgment import AgentJudgment
+from query_analyzer import StructuredQuery
+
+
+class OrchestratorEvent(BaseModel):
+    """A single progress event from a streamed orchestration."""
+
+    event: Literal["query", "chunk", "output", "judgment", "summary", "error"] = Field(
+        ..., description="Event type"
+    )
+    index: int | None = Field(
+        None, description="Builder position (0-based) for chunk, output and judgment events"
+    )
+    query_index: int | None = Field(
+        None, description="Query position (0-based) in a batch request; None for single queries"
+    )
+    data: StructuredQuery | AgentOutput | AgentJudgment | OrchestratorOutput | None = Field(
+        None, description="Event payload"
+    )
+    detail: str | None = Field(None, description="Error message for error events")
+    delta: str | None = Field(None, description="Next piece of generated code (chunk events)")
+    builders: list[str] | None = Field(
+        None, description="Agent names of the builders that will run (query events)"
+    )
@@ -0,0 +1,36 @@
+"""
+Models for queued orchestration jobs (POST /jobs, GET /jobs/{id}).
+"""
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from models.agent_output import OrchestratorOutput
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobProgress(BaseModel):
+    """How far a running orchestration has got."""
+
+    stage: str = Field("queued", description="queued, analyzing, building, judging or done")
+    builders_total: int | None = Field(None, description="Number of competing builders")
+    outputs_done: int = Field(0, description="Builder outputs finished so far")
+    judgments_done: int = Field(0, description="Judgments finished so far")
+
+
+class Job(BaseModel):
+    """A durable orchestration job and, once finished, its result."""
+
+    id: str = Field(..., description="Job ID")
+    status: JobStatus = Field(..., description="queued, running, succeeded or failed")
+    query: str = Field(..., description="User query to orchestrate")
+    builders: int | None = Field(None, description="Requested builder pool size")
+    attempts: int = Field(0, description="How many times a worker has started this job")
+    progress: JobProgress = Field(default_factory=JobProgress)
+    result: OrchestratorOutput | None = Field(None, description="Set when status is succeeded")
+    error: str | None = Field(None, description="Set when status is failed")
+    created_at: datetime
+    updated_at: datetime
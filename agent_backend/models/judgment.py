@@ -2,6 +2,8 @@
 Models for JudgeAgent ratings of builder agent outputs.
 """
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -41,14 +43,42 @@ class AgentJudgment(BaseModel):
         description="Average of criteria scores",
     )
     summary: str = Field(..., description="Brief overall assessment")
+    status: Literal["ok", "timeout", "error", "skipped"] = Field(
+        "ok",
+        description="ok, or why there is no real judgment (judge deadline missed / failed, output skipped)",
+    )
+    tier: Literal["full", "quick", "local"] = Field(
+        "full",
+        description="full: model review with rationales; quick: scores-only screening; local: decided without the model",
+    )
 
 
 class JudgeOutput(BaseModel):
-    """Output from JudgeAgent: judgments for all 3 builder agents."""
+    """Output from JudgeAgent: judgments for all builder agents."""
 
     judgments: list[AgentJudgment] = Field(
         ...,
-        min_length=3,
-        max_length=3,
-        description="Judgment for each of the 3 builder agents",
+        min_length=1,
+        description="Judgment for each builder agent, in builder order",
     )
+
+
+class CodeCheckReport(BaseModel):
+    """Results of the local static checks run on a code output before judging."""
+
+    size_bytes: int = 0
+    line_count: int = 0
+    element_count: int = 0
+    has_doctype: bool = False
+    has_title: bool = False
+    has_lang: bool = False
+    parse_errors: list[str] = Field(default_factory=list, description="Unclosed or mismatched tags")
+    inline_scripts: int = 0
+    inline_script_bytes: int = 0
+    external_scripts: int = 0
+    inline_style_blocks: int = 0
+    inline_style_bytes: int = 0
+    inline_style_attributes: int = 0
+    accessibility_issues: list[str] = Field(default_factory=list)
+    fatal: bool = Field(False, description="Obviously broken; judged locally without an LLM call")
+    fatal_reason: str | None = None
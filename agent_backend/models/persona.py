@@ -0,0 +1,33 @@
+"""
+Persona definitions for the data-driven builder engine.
+Loaded from agents/personas.json (or PERSONAS_PATH).
+"""
+
+from pydantic import BaseModel, Field
+
+
+class Persona(BaseModel):
+    """One competing builder: its identity and the prompts it designs with."""
+
+    agent_name: str = Field(..., description="Stable agent name reported in outputs (e.g. BuilderAgent1)")
+    persona: str = Field(..., description="Human-readable persona label (e.g. The Minimalist)")
+    description: str = Field("", description="Short summary of the persona's design philosophy")
+    system_prompt_image: str = Field(
+        ..., description="System prompt used to write an image-generation prompt"
+    )
+    image_prompt_template: str = Field(
+        "",
+        description=(
+            "Image prompt rendered locally in template mode; may use {intent}, "
+            "{task_type}, {requirements}, {constraints} and {raw_query}"
+        ),
+    )
+    system_prompt_code: str = Field(
+        ..., description="System prompt used to write a single-file web app"
+    )
+
+
+class PersonaRegistry(BaseModel):
+    """Ordered list of personas; order decides which run first for smaller pools."""
+
+    personas: list[Persona] = Field(..., min_length=1)
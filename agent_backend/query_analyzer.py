@@ -3,8 +3,17 @@ Query analysis: parse user query, infer intent, and produce a structured query
 for builder agents.
 """
 
-from openai import OpenAI
-from pydantic import BaseModel, Field
+import asyncio
+import json
+import re
+
+from pydantic import BaseModel, Field, ValidationError
+
+from constants import ANALYZER_BATCH_SIZE
+from services.cache import ResponseCache, cache_key
+from services.gateway import ModelGateway
+from services.scheduler import Priority
+from services.semantic_cache import SemanticCache
 
 
 class StructuredQuery(BaseModel):
@@ -67,21 +76,172 @@ Output valid JSON only, with this exact shape (no extra fields):
 
 Output only the JSON object, no markdown or explanation."""
 
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    BATCH_SYSTEM_PROMPT = """You are a query analyst. You are given several numbered user requests; extract intent and structure each one for design/code agents.
+
+Output valid JSON only, with this exact shape:
+{"queries": [
+  {
+    "index": 0,
+    "intent": "short_snake_case_label",
+    "task_type": "code" | "image" | "other",
+    "requirements": ["requirement 1"],
+    "constraints": ["constraint 1"]
+  }
+]}
+
+Include exactly one entry per request, with "index" set to the request's number. Fill the
+fields per request exactly as you would for a single request:
+- intent: one short label (e.g. design_landing_page, build_react_form, create_hero_image).
+- task_type: code (components/APIs), image (visuals), or other.
+- requirements: list of must-haves from the user (can be empty []).
+- constraints: limits or rules (e.g. "mobile-first", "no external APIs") (can be empty []).
+
+Output only the JSON object, no markdown or explanation."""
 
-    def analyze(self, user_query: str) -> StructuredQuery:
+    def __init__(
+        self,
+        gateway: ModelGateway,
+        cache: ResponseCache | None = None,
+        semantic: SemanticCache | None = None,
+    ):
+        self.gateway = gateway
+        self.cache = cache
+        # Near-duplicate lookup for paraphrased queries, after the exact cache misses.
+        # Entries are scoped by task type (the analyzed one when stored, the
+        # locally predicted one on lookup), so a similar request for the other
+        # kind of output never reuses an analysis.
+        self.semantic = semantic
+        self.classifier = TaskTypeClassifier()
+
+    async def _similar(self, user_query: str) -> StructuredQuery | None:
+        """Analysis of a stored paraphrase of the query, from the semantic cache."""
+        if self.semantic is None:
+            return None
+        cached = await self.semantic.get(user_query, scope=self.classifier.predict(user_query))
+        if cached is None:
+            return None
+        return StructuredQuery.model_validate_json(cached).model_copy(update={"raw_query": user_query})
+
+    async def _remember(self, key: str, parsed: StructuredQuery) -> None:
+        if self.cache is not None:
+            await self.cache.set(key, parsed.model_dump_json())
+        if self.semantic is not None:
+            await self.semantic.set(parsed.raw_query, parsed.model_dump_json(), scope=parsed.task_type)
+
+    async def analyze(self, user_query: str) -> StructuredQuery:
         """
         Parse the user query and return a StructuredQuery with intent and structured fields.
         """
-        response = self.client.chat.completions.create(
+        key = cache_key(model="gpt-4o-mini", system_prompt=self.SYSTEM_PROMPT, user_content=user_query)
+        if self.cache is not None:
+            cached = await self.cache.get(key, namespace="analyzer")
+            if cached is not None:
+                # The key is normalized; keep this caller's exact wording.
+                return StructuredQuery.model_validate_json(cached).model_copy(
+                    update={"raw_query": user_query}
+                )
+        similar = await self._similar(user_query)
+        if similar is not None:
+            return similar
+
+        response = await self.gateway.chat(
+            priority=Priority.ANALYZER,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": self.SYSTEM_PROMPT},
                 {"role": "user", "content": user_query},
             ],
         )
-        content = response.choices[0].message.content
+        parsed = self._parse(response.choices[0].message.content, user_query)
+        await self._remember(key, parsed)
+        return parsed
+
+    async def analyze_many(
+        self, user_queries: list[str], batch_size: int = ANALYZER_BATCH_SIZE
+    ) -> list[StructuredQuery | Exception]:
+        """
+        Analyze many queries with one chat call per `batch_size` uncached queries.
+        Results keep input order. Queries the batched reply leaves out or gets
+        wrong are re-analyzed individually; a query whose analysis still fails
+        gets its exception in its slot instead of failing the whole list.
+        """
+        results: list[StructuredQuery | Exception | None] = [None] * len(user_queries)
+        pending: dict[str, list[int]] = {}
+        for i, query in enumerate(user_queries):
+            key = cache_key(model="gpt-4o-mini", system_prompt=self.SYSTEM_PROMPT, user_content=query)
+            cached = await self.cache.get(key, namespace="analyzer") if self.cache is not None else None
+            if cached is not None:
+                results[i] = StructuredQuery.model_validate_json(cached).model_copy(
+                    update={"raw_query": query}
+                )
+            elif (similar := await self._similar(query)) is not None:
+                results[i] = similar
+            else:
+                # Identical (normalized) queries in one batch are analyzed once
+                pending.setdefault(key, []).append(i)
+
+        groups = list(pending.values())
+        chunks = [groups[i : i + batch_size] for i in range(0, len(groups), batch_size)]
+        batched = await asyncio.gather(
+            *(self._analyze_chunk([user_queries[g[0]] for g in chunk]) for chunk in chunks),
+            return_exceptions=True,
+        )
+        retry: list[list[int]] = []
+        for chunk, parsed in zip(chunks, batched):
+            for j, group in enumerate(chunk):
+                sq = parsed[j] if not isinstance(parsed, BaseException) else None
+                if sq is None:
+                    retry.append(group)
+                    continue
+                for i in group:
+                    results[i] = sq.model_copy(update={"raw_query": user_queries[i]})
+
+        singles = await asyncio.gather(
+            *(self.analyze(user_queries[group[0]]) for group in retry), return_exceptions=True
+        )
+        for group, sq in zip(retry, singles):
+            for i in group:
+                if isinstance(sq, BaseException):
+                    results[i] = sq
+                else:
+                    results[i] = sq.model_copy(update={"raw_query": user_queries[i]})
+        return results
+
+    async def _analyze_chunk(self, user_queries: list[str]) -> list[StructuredQuery | None]:
+        """One batched chat call; None for queries missing or invalid in the reply."""
+        numbered = "\n\n".join(f"Query {i}:\n{q}" for i, q in enumerate(user_queries))
+        response = await self.gateway.chat(
+            priority=Priority.ANALYZER,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": self.BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": numbered},
+            ],
+            response_format={"type": "json_object"},
+        )
+        try:
+            items = json.loads(response.choices[0].message.content or "{}").get("queries", [])
+        except (json.JSONDecodeError, AttributeError):
+            items = []
+        parsed: list[StructuredQuery | None] = [None] * len(user_queries)
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("index"), int):
+                continue
+            i = item.pop("index")
+            if not 0 <= i < len(user_queries):
+                continue
+            try:
+                parsed[i] = StructuredQuery.model_validate({**item, "raw_query": user_queries[i]})
+            except ValidationError:
+                continue
+            key = cache_key(
+                model="gpt-4o-mini", system_prompt=self.SYSTEM_PROMPT, user_content=user_queries[i]
+            )
+            await self._remember(key, parsed[i])
+        return parsed
+
+    @staticmethod
+    def _parse(content: str | None, user_query: str) -> StructuredQuery:
         if not content:
             return StructuredQuery(
                 intent="unknown",
@@ -98,3 +258,37 @@ Output only the JSON object, no markdown or explanation."""
                 lines = lines[:-1]
             text = "\n".join(lines)
         return StructuredQuery.model_validate_json(text)
+
+
+class TaskTypeClassifier:
+    """
+    Instant local guess of StructuredQuery.task_type from keywords, used to
+    start builders before QueryAnalyzer answers (see OrchestratorAgent
+    speculative mode). Predicts "code" or "image", the two builder paths.
+    """
+
+    CODE_PATTERN = re.compile(
+        r"\b(app|application|website|web ?site|web ?page|landing page|page|component|form|button|"
+        r"html|css|javascript|js|react|vue|svelte|dashboard|calculator|game|widget|api|frontend|"
+        r"ui|todo|to-do|tracker|code|script|site)s?\b",
+        re.IGNORECASE,
+    )
+    IMAGE_PATTERN = re.compile(
+        r"\b(image|picture|illustration|poster|logo|photo|photograph|drawing|painting|sketch|icon|"
+        r"banner|artwork|art|portrait|wallpaper|render|mascot|flyer|cover|visual)s?\b",
+        re.IGNORECASE,
+    )
+
+    def predict(self, user_query: str) -> str:
+        code = len(self.CODE_PATTERN.findall(user_query))
+        image = len(self.IMAGE_PATTERN.findall(user_query))
+        return "code" if code > image else "image"
+
+    def provisional(self, user_query: str) -> StructuredQuery:
+        """A StructuredQuery builders can start on while the real analysis runs."""
+        task_type = self.predict(user_query)
+        return StructuredQuery(
+            intent="build_web_app" if task_type == "code" else "create_image",
+            task_type=task_type,
+            raw_query=user_query,
+        )
@@ -0,0 +1,3 @@
+from .cache import ResponseCache
+
+__all__ = ["ResponseCache"]
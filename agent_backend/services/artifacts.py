@@ -0,0 +1,110 @@
+"""
+Content-addressed artifact store for generated images.
+
+Builders decode the base64 image once, store the bytes under their SHA-256
+hash, and put a short URL in AgentOutput.image instead of a multi-megabyte
+data URI. The bytes are served by GET /artifacts/{artifact_id}.
+"""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Protocol
+
+# sha256 hex digest plus a file extension, e.g. "9f86d0...0a08.png"
+ARTIFACT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+class ArtifactStore(Protocol):
+    """Stores immutable blobs by content hash."""
+
+    def put(self, data: bytes, content_type: str) -> str: ...
+
+    def get(self, artifact_id: str) -> bytes: ...
+
+    def path(self, artifact_id: str) -> Path | None: ...
+
+    def url(self, artifact_id: str) -> str: ...
+
+
+def artifact_id_for(data: bytes, content_type: str) -> str:
+    """Content-addressed ID: sha256 of the bytes plus an extension for the type."""
+    extension = mimetypes.guess_extension(content_type) or ".bin"
+    return hashlib.sha256(data).hexdigest() + extension
+
+
+class LocalArtifactStore:
+    """
+    Filesystem backend. Files are fanned out into two-character subdirectories
+    and written atomically, so concurrent writers of the same content are safe.
+    """
+
+    def __init__(self, root: str | Path, base_url: str = ""):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/")
+
+    @classmethod
+    def from_env(cls) -> "LocalArtifactStore | None":
+        """
+        Build the store from ARTIFACT_* environment variables, or return None
+        when ARTIFACT_STORE=inline (builders then return base64 data URIs).
+        Without ARTIFACT_BASE_URL, image URLs are relative /artifacts/{id}
+        paths, which clients resolve against the agent backend's URL.
+        """
+        if os.getenv("ARTIFACT_STORE", "local").lower() == "inline":
+            return None
+        return cls(
+            root=os.getenv("ARTIFACT_DIR", "artifacts"),
+            base_url=os.getenv("ARTIFACT_BASE_URL", ""),
+        )
+
+    def _file(self, artifact_id: str) -> Path:
+        if not ARTIFACT_ID_PATTERN.match(artifact_id):
+            raise ValueError(f"Invalid artifact id: {artifact_id!r}")
+        return self.root / artifact_id[:2] / artifact_id
+
+    def put(self, data: bytes, content_type: str) -> str:
+        artifact_id = artifact_id_for(data, content_type)
+        target = self._file(artifact_id)
+        if target.exists():
+            return artifact_id
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return artifact_id
+
+    def get(self, artifact_id: str) -> bytes:
+        return self._file(artifact_id).read_bytes()
+
+    def path(self, artifact_id: str) -> Path | None:
+        target = self._file(artifact_id)
+        return target if target.exists() else None
+
+    def url(self, artifact_id: str) -> str:
+        return f"{self.base_url}/artifacts/{artifact_id}"
+
+
+def put_base64(store: ArtifactStore, b64_data: str, content_type: str) -> str:
+    """Decode a base64 payload once and store the bytes; returns the artifact ID."""
+    return store.put(base64.b64decode(b64_data), content_type)
+
+
+def content_type_for(artifact_id: str) -> str:
+    """Guess the media type of an artifact from its extension."""
+    return mimetypes.guess_type(artifact_id)[0] or "application/octet-stream"
+
+
+def to_data_uri(data: bytes, content_type: str) -> str:
+    """Encode bytes as a data URI (for upstream APIs that cannot reach our URLs)."""
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
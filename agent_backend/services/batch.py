@@ -0,0 +1,271 @@
+"""
+Offline bulk mode: route upstream calls through batch request files.
+
+BatchGateway is a drop-in ModelGateway for non-interactive runs. Instead of
+calling OpenAI directly, each chat/image call is parked as one line of a JSONL
+request file in the OpenAI Batch API format. Once the running orchestrations
+have all parked their next call (no new call for `settle` seconds), the
+gateway writes one file per stage (analyzer, builder, judge) and endpoint,
+runs them through a BatchBackend, and resumes every waiting call with its
+result. A bulk run therefore proceeds in waves: analyze everything, build
+everything, judge everything, with the agents' own prompts, caching and
+parsing unchanged.
+
+Backends:
+- OpenAIBatchBackend uploads the file to the Batch API (batch pricing, separate
+  rate limits) and polls until the output file is ready.
+- LocalBatchBackend executes the same file line by line against any
+  AsyncOpenAI-compatible client and writes a Batch-API-shaped output file.
+  Use it for testing without an account, or with a fake client.
+
+Request and result files are read and written in worker threads, so a large
+wave does not stall the orchestrations sharing the event loop.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Iterable, Protocol, TypeVar
+
+from openai import AsyncOpenAI
+from openai.types import ImagesResponse
+from openai.types.chat import ChatCompletion
+
+from services.gateway import ModelGateway
+from services.scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+IMAGES_ENDPOINT = "/v1/images/generations"
+RESPONSE_TYPES = {CHAT_ENDPOINT: ChatCompletion, IMAGES_ENDPOINT: ImagesResponse}
+STAGES = {Priority.ANALYZER: "analyzer", Priority.BUILDER: "builder", Priority.JUDGE: "judge"}
+
+
+class BatchRequestError(Exception):
+    """A batch request line came back with an error (or not at all)."""
+
+
+class BatchBackend(Protocol):
+    """Executes one Batch API request file and writes its output file."""
+
+    async def run(self, endpoint: str, requests_path: Path, results_path: Path) -> None: ...
+
+
+def read_jsonl(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_jsonl(path: Path, rows: Iterable[dict[str, Any]]) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+
+class OpenAIBatchBackend:
+    """Submits request files to the OpenAI Batch API and polls for the results."""
+
+    TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+    def __init__(self, client: AsyncOpenAI, poll_interval: float = 30.0):
+        self.client = client
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _load(requests_path: Path) -> tuple[bytes, Path, str | None]:
+        """
+        The request file's bytes, and where its batch ID is kept plus the ID
+        if it was submitted before. The ID file is keyed by the file's content,
+        so re-running an interrupted bulk job picks the submitted batch back up.
+        """
+        data = requests_path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        id_path = requests_path.with_name(f"{requests_path.stem}.{digest}.batch_id")
+        batch_id = id_path.read_text().strip() if id_path.exists() else None
+        return data, id_path, batch_id
+
+    async def run(self, endpoint: str, requests_path: Path, results_path: Path) -> None:
+        data, id_path, batch_id = await asyncio.to_thread(self._load, requests_path)
+        if batch_id is None:
+            upload = await self.client.files.create(file=(requests_path.name, data), purpose="batch")
+            batch = await self.client.batches.create(
+                input_file_id=upload.id, endpoint=endpoint, completion_window="24h"
+            )
+            batch_id = batch.id
+            await asyncio.to_thread(id_path.write_text, batch_id)
+            logger.info("Submitted %s as batch %s", requests_path.name, batch_id)
+
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status in self.TERMINAL:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        lines = b""
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines += (await self.client.files.content(file_id)).content
+        if batch.status != "completed" and not lines:
+            raise BatchRequestError(f"Batch {batch_id} ended with status {batch.status}")
+        await asyncio.to_thread(results_path.write_bytes, lines)
+
+
+class LocalBatchBackend:
+    """Runs a request file directly against a client, writing Batch API output lines."""
+
+    def __init__(self, client: AsyncOpenAI, max_concurrency: int = 8):
+        self.client = client
+        self.max_concurrency = max_concurrency
+
+    async def run(self, endpoint: str, requests_path: Path, results_path: Path) -> None:
+        limit = asyncio.Semaphore(self.max_concurrency)
+        create = {
+            CHAT_ENDPOINT: self.client.chat.completions.create,
+            IMAGES_ENDPOINT: self.client.images.generate,
+        }[endpoint]
+
+        async def execute(index: int, line: dict[str, Any]) -> dict[str, Any]:
+            async with limit:
+                try:
+                    response = await create(**line["body"])
+                except Exception as e:
+                    return {
+                        "id": f"local_req_{index}",
+                        "custom_id": line["custom_id"],
+                        "response": None,
+                        "error": {"code": type(e).__name__, "message": str(e)},
+                    }
+            return {
+                "id": f"local_req_{index}",
+                "custom_id": line["custom_id"],
+                "response": {"status_code": 200, "body": response.model_dump(mode="json")},
+                "error": None,
+            }
+
+        lines = await asyncio.to_thread(read_jsonl, requests_path)
+        results = await asyncio.gather(*(execute(i, line) for i, line in enumerate(lines)))
+        await asyncio.to_thread(write_jsonl, results_path, results)
+
+
+@dataclass
+class _Parked:
+    custom_id: str
+    stage: str
+    endpoint: str
+    body: dict[str, Any]
+    future: asyncio.Future = field(repr=False)
+
+
+class BatchGateway(ModelGateway):
+    """
+    ModelGateway that turns every call into a batch request line. Drive the
+    workload with drive(); calls made outside drive() wait until its next flush.
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        work_dir: str | Path,
+        settle: float = 0.5,
+    ):
+        super().__init__(client=None)
+        self.backend = backend
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.settle = settle
+        self._parked: list[_Parked] = []
+        self._last_parked = 0.0
+        self._ids = itertools.count()
+        self._waves = itertools.count(1)
+        self.requests_written = 0
+
+    async def chat(self, *, priority: Priority, **kwargs: Any) -> Any:
+        return await self._park(priority, CHAT_ENDPOINT, kwargs)
+
+    async def generate_image(self, *, priority: Priority, **kwargs: Any) -> Any:
+        return await self._park(priority, IMAGES_ENDPOINT, kwargs)
+
+    async def _park(self, priority: Priority, endpoint: str, body: dict[str, Any]) -> Any:
+        stage = STAGES[priority]
+        parked = _Parked(
+            custom_id=f"{stage}-{next(self._ids)}",
+            stage=stage,
+            endpoint=endpoint,
+            body=body,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._parked.append(parked)
+        self._last_parked = time.monotonic()
+        return await parked.future
+
+    async def drive(self, aws: Iterable[Awaitable[T]]) -> list[T | BaseException]:
+        """
+        Run the awaitables to completion, flushing parked calls as batches
+        whenever they have all settled. Results keep input order; a failing
+        awaitable gets its exception in its slot.
+        """
+        tasks = [asyncio.ensure_future(aw) for aw in aws]
+        while True:
+            running = [t for t in tasks if not t.done()]
+            if not running:
+                break
+            await asyncio.wait(running, timeout=self.settle)
+            if self._parked and time.monotonic() - self._last_parked >= self.settle:
+                await self.flush()
+        return [t.exception() or t.result() for t in tasks]
+
+    async def flush(self) -> None:
+        """Write parked calls to request files (one per stage and endpoint) and run them."""
+        parked, self._parked = self._parked, []
+        if not parked:
+            return
+        wave = next(self._waves)
+        groups: dict[tuple[str, str], list[_Parked]] = {}
+        for p in parked:
+            groups.setdefault((p.stage, p.endpoint), []).append(p)
+        await asyncio.gather(
+            *(self._run_group(wave, stage, endpoint, group) for (stage, endpoint), group in groups.items())
+        )
+
+    async def _run_group(self, wave: int, stage: str, endpoint: str, group: list[_Parked]) -> None:
+        kind = "images" if endpoint == IMAGES_ENDPOINT else "chat"
+        requests_path = self.work_dir / f"{wave:03d}-{stage}-{kind}.jsonl"
+        results_path = requests_path.with_suffix(".results.jsonl")
+        await asyncio.to_thread(
+            write_jsonl,
+            requests_path,
+            [{"custom_id": p.custom_id, "method": "POST", "url": endpoint, "body": p.body} for p in group],
+        )
+        self.requests_written += len(group)
+        logger.info("Wave %d: %d %s request(s) -> %s", wave, len(group), stage, requests_path.name)
+        try:
+            await self.backend.run(endpoint, requests_path, results_path)
+            rows = await asyncio.to_thread(read_jsonl, results_path)
+            results = {row["custom_id"]: row for row in rows}
+        except Exception as e:
+            for p in group:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+
+        response_type = RESPONSE_TYPES[endpoint]
+        for p in group:
+            if p.future.done():
+                continue  # the caller was cancelled while the batch ran
+            row = results.get(p.custom_id)
+            response = (row or {}).get("response") or {}
+            if row is None:
+                p.future.set_exception(BatchRequestError(f"{p.custom_id}: missing from batch output"))
+            elif row.get("error") or response.get("status_code") != 200:
+                detail = row.get("error") or response.get("body", {}).get("error")
+                p.future.set_exception(BatchRequestError(f"{p.custom_id}: {detail}"))
+            else:
+                p.future.set_result(response_type.model_validate(response["body"]))
@@ -0,0 +1,252 @@
+"""
+Content-addressed response cache for QueryAnalyzer, builder and judge calls.
+
+Keys are derived from (model, system prompt, normalized user content, extra
+params such as the image settings in constants.py). Values are JSON strings.
+An in-memory LRU tier with TTL sits in front of an optional SQLite tier that
+survives restarts. ResponseCache's get/set are coroutines: the memory tier
+is answered inline, the SQLite tier runs in a worker thread, and its writes
+are committed in batches rather than one transaction per set. A failing
+SQLite tier degrades to a cache miss rather than failing the request.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from services.telemetry import current_span, metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so near-identical inputs share a key."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(*, model: str, system_prompt: str, user_content: str, **params: Any) -> str:
+    """Build a stable SHA-256 key for an upstream call."""
+    payload = {
+        "model": model,
+        "system_prompt": system_prompt.strip(),
+        "user_content": normalize_text(user_content),
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """A single cache tier storing JSON strings by key."""
+
+    def get(self, key: str) -> str | None: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with a per-entry TTL and a bound on entry count."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    On-disk cache tier backed by a single SQLite table. Blocking: call it
+    from a worker thread. Writes are committed once `commit_every` of them
+    are pending, or by a timer thread `commit_interval` seconds after the
+    first uncommitted one, whichever comes first; close() commits the rest.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 3600.0,
+        commit_every: int = 64,
+        commit_interval: float = 1.0,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._pending = 0
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._written()
+                return None
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+            self._written()
+
+    def _written(self) -> None:
+        """Count an uncommitted write and commit or schedule the batch. Holds _lock."""
+        self._pending += 1
+        if self._pending >= self.commit_every or self.commit_interval <= 0:
+            self._commit()
+        elif self._timer is None:
+            # Commit even if no further write arrives, so the transaction (and the
+            # write lock other connections wait on) is never held indefinitely
+            self._timer = threading.Timer(self.commit_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _commit(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._conn.commit()
+        self._pending = 0
+
+    def flush(self) -> None:
+        """Commit pending writes."""
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Tiered cache: checks the memory tier first, then the disk tier (if any),
+    promoting disk hits into memory. Tracks hit/miss counters per namespace
+    (e.g. "analyzer", "builder", "judge").
+    """
+
+    def __init__(self, memory: MemoryCache, disk: CacheBackend | None = None):
+        self.memory = memory
+        self.disk = disk
+        self._counters: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache | None":
+        """
+        Build a cache from CACHE_* environment variables, or return None when
+        CACHE_ENABLED is false.
+        """
+        if os.getenv("CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+            return None
+        ttl = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+        memory = MemoryCache(
+            max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=ttl,
+        )
+        sqlite_path = os.getenv("CACHE_SQLITE_PATH")
+        disk = (
+            SQLiteCache(
+                sqlite_path,
+                ttl_seconds=ttl,
+                commit_every=int(os.getenv("CACHE_SQLITE_COMMIT_EVERY", "64")),
+                commit_interval=float(os.getenv("CACHE_SQLITE_COMMIT_INTERVAL", "1.0")),
+            )
+            if sqlite_path
+            else None
+        )
+        return cls(memory, disk)
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    async def get(self, key: str, namespace: str = "default") -> str | None:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                value = await asyncio.to_thread(self.disk.get, key)
+            except Exception:
+                logger.warning("Disk cache read failed; treating it as a miss", exc_info=True)
+            if value is not None:
+                self.memory.set(key, value)
+        self._count(namespace, "misses" if value is None else "hits")
+        metrics.cache_lookups.inc(namespace=namespace, result="miss" if value is None else "hit")
+        active = current_span()
+        if active is not None:
+            active.set("cache_hit", value is not None)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value)
+            except Exception:
+                logger.warning("Disk cache write failed; keeping the entry in memory only", exc_info=True)
+
+    async def close(self) -> None:
+        """Commit the disk tier's pending writes and close it."""
+        if isinstance(self.disk, SQLiteCache):
+            await asyncio.to_thread(self.disk.close)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters per namespace plus tier sizes."""
+        with self._lock:
+            counters = {ns: dict(c) for ns, c in self._counters.items()}
+        return {
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+            "hits": sum(c["hits"] for c in counters.values()),
+            "misses": sum(c["misses"] for c in counters.values()),
+            "namespaces": counters,
+        }
@@ -0,0 +1,154 @@
+"""
+Cheap local static checks for single-file HTML outputs of code tasks.
+
+Runs before the text-only code judge: size, HTML parse validity, inline
+script/style stats and a small accessibility lint. Outputs that are obviously
+broken (empty, tiny, or not HTML at all) are marked fatal so the judge can
+short-circuit without an LLM call.
+"""
+
+from html.parser import HTMLParser
+
+from models.judgment import CodeCheckReport
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+# Elements whose end tag HTML lets authors omit
+OPTIONAL_END = {"p", "li", "dt", "dd", "tr", "td", "th", "thead", "tbody", "tfoot", "option", "html", "head", "body"}
+
+MIN_CODE_BYTES = 50
+
+
+def strip_code_fence(code: str) -> str:
+    """Remove a surrounding markdown code fence, if the model added one."""
+    text = code.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")[1:]
+        if lines and lines[-1].strip() == "```":
+            lines = lines[:-1]
+        text = "\n".join(lines)
+    return text
+
+
+class _Auditor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.report = CodeCheckReport()
+        self.stack: list[str] = []
+        self.labelled_ids: set[str] = set()
+        self.inputs: list[dict[str, str | None]] = []
+        self.label_depth = 0
+        self._script_open = False
+        self._style_open = False
+        self._text_target: dict | None = None
+
+    def handle_decl(self, decl: str) -> None:
+        if decl.lower().startswith("doctype"):
+            self.report.has_doctype = True
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        r = self.report
+        a = dict(attrs)
+        r.element_count += 1
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(tag)
+        if "style" in a:
+            r.inline_style_attributes += 1
+        if tag == "html":
+            r.has_lang = bool(a.get("lang"))
+        elif tag == "title":
+            r.has_title = True
+        elif tag == "script":
+            if a.get("src"):
+                r.external_scripts += 1
+            else:
+                r.inline_scripts += 1
+                self._script_open = True
+        elif tag == "style":
+            r.inline_style_blocks += 1
+            self._style_open = True
+        elif tag == "img" and "alt" not in a:
+            r.accessibility_issues.append("img without alt text")
+        elif tag == "label":
+            self.label_depth += 1
+            if a.get("for"):
+                self.labelled_ids.add(a["for"])
+        elif tag in ("input", "select", "textarea") and a.get("type") not in ("hidden", "submit", "button"):
+            self.inputs.append(
+                {"id": a.get("id"), "aria": a.get("aria-label") or a.get("aria-labelledby"),
+                 "wrapped": "yes" if self.label_depth else None}
+            )
+        elif tag in ("button", "a"):
+            self._text_target = {"tag": tag, "aria": a.get("aria-label"), "text": ""}
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script":
+            self._script_open = False
+        elif tag == "style":
+            self._style_open = False
+        elif tag == "label":
+            self.label_depth = max(0, self.label_depth - 1)
+        if self._text_target and tag == self._text_target["tag"]:
+            if not self._text_target["aria"] and not self._text_target["text"].strip():
+                self.report.accessibility_issues.append(f"{tag} without accessible text")
+            self._text_target = None
+        if tag in VOID_ELEMENTS:
+            return
+        if tag not in self.stack:
+            self.report.parse_errors.append(f"unexpected </{tag}>")
+            return
+        while self.stack:
+            open_tag = self.stack.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in OPTIONAL_END:
+                self.report.parse_errors.append(f"<{open_tag}> not closed before </{tag}>")
+
+    def handle_data(self, data: str) -> None:
+        if self._script_open:
+            self.report.inline_script_bytes += len(data.encode("utf-8"))
+        elif self._style_open:
+            self.report.inline_style_bytes += len(data.encode("utf-8"))
+        if self._text_target is not None:
+            self._text_target["text"] += data
+
+    def finish(self) -> CodeCheckReport:
+        r = self.report
+        for tag in self.stack:
+            if tag not in OPTIONAL_END:
+                r.parse_errors.append(f"<{tag}> never closed")
+        for field in self.inputs:
+            if not (field["aria"] or field["wrapped"] or (field["id"] and field["id"] in self.labelled_ids)):
+                r.accessibility_issues.append("form control without a label")
+        if r.element_count and not r.has_lang:
+            r.accessibility_issues.append("<html> missing lang attribute")
+        if r.element_count and not r.has_title:
+            r.accessibility_issues.append("document missing <title>")
+        return r
+
+
+def check_html(code: str) -> CodeCheckReport:
+    """Run all static checks on a builder's HTML output."""
+    text = strip_code_fence(code)
+    size = len(text.encode("utf-8"))
+    if not text:
+        return CodeCheckReport(size_bytes=0, fatal=True, fatal_reason="Empty code output")
+    if size < MIN_CODE_BYTES:
+        return CodeCheckReport(size_bytes=size, fatal=True, fatal_reason=f"Code output is only {size} bytes")
+
+    auditor = _Auditor()
+    try:
+        auditor.feed(text)
+        auditor.close()
+    except Exception as e:  # HTMLParser is lenient, but never let a lint crash judging
+        auditor.report.parse_errors.append(f"parser error: {e}")
+    report = auditor.finish()
+    report.size_bytes = size
+    report.line_count = text.count("\n") + 1
+    if report.element_count == 0:
+        report.fatal = True
+        report.fatal_reason = "Output contains no HTML elements"
+    return report
@@ -0,0 +1,215 @@
+"""
+Fast, compact JSON encoding for API responses.
+
+ORJSONResponse serializes with orjson from the models' python-mode dump,
+which is several times faster than FastAPI's default response-model path
+on large payloads. Without orjson it falls back to pydantic's JSON
+serializer.
+
+encode_json() adds two things on top:
+- field projection: `include` (from parse_fields("judgments,items.score"))
+  drops what the client does not want, e.g. the multi-megabyte `image` and
+  `extra` blobs of every AgentOutput;
+- negotiated compression: the best encoding the client accepts (zstd, br,
+  gzip) for bodies between `min_bytes` and `max_bytes`. zstd and brotli are
+  used only when the zstandard/brotli packages are installed. Bodies above
+  `max_bytes` are sent as-is: they are inline base64 images, which cost a
+  lot of CPU to compress and shrink by only about a quarter.
+"""
+
+import asyncio
+import gzip
+import os
+import types
+import typing
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_json, to_jsonable_python
+
+from services.telemetry import metrics
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic's serializer is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; "br" is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional; "zstd" is not offered without it
+    zstandard = None
+
+# Projection spec: a set of field paths as understood by BaseModel.model_dump(include=...)
+Include = dict[str, Any]
+
+
+def dumps(content: Any, include: Include | None = None) -> bytes:
+    """JSON bytes for a model (optionally projected) or plain JSON-able data."""
+    if isinstance(content, BaseModel):
+        if orjson is None:
+            return content.model_dump_json(include=include).encode("utf-8")
+        content = content.model_dump(include=include)
+    if orjson is None:
+        return to_json(content)
+    return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered by dumps(); accepts pydantic models directly."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _nested_model(annotation: Any) -> tuple[type[BaseModel] | None, bool]:
+    """(model class, is a list of it) for a field annotation, unwrapping Optional."""
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else (None, False)
+    if origin is list:
+        (item,) = typing.get_args(annotation) or (Any,)
+        model, _ = _nested_model(item)
+        return model, model is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+def parse_fields(model: type[BaseModel], spec: str) -> Include:
+    """
+    Turn "judgments,items.agent_name,items.score" into an include spec for
+    `model`. A dotted path selects a field of a nested model (of every item,
+    for lists). Raises ValueError for unknown fields.
+    """
+    include: Include = {}
+    for path in (p.strip() for p in spec.split(",")):
+        if not path:
+            continue
+        node, cls = include, model
+        parts = path.split(".")
+        for depth, name in enumerate(parts):
+            if cls is None or name not in cls.model_fields:
+                raise ValueError(f"Unknown field {path!r}")
+            if depth == len(parts) - 1:
+                node[name] = True
+                break
+            if node.get(name) is True:
+                break  # the whole field is already selected
+            cls, is_list = _nested_model(cls.model_fields[name].annotation)
+            node = node.setdefault(name, {})
+            if is_list:
+                node = node.setdefault("__all__", {})
+    if not include:
+        raise ValueError("fields must name at least one field")
+    return include
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    """Content codings in an Accept-Encoding header with their q-values."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+@dataclass
+class CompressionSettings:
+    """Response compression knobs (RESPONSE_COMPRESSION_* in env)."""
+
+    # Server preference among the encodings a client accepts equally
+    encodings: tuple[str, ...] = ("zstd", "br", "gzip")
+    min_bytes: int = 1024
+    max_bytes: int = 1024 * 1024
+    gzip_level: int = 6
+    brotli_quality: int = 5
+    zstd_level: int = 3
+
+    @classmethod
+    def from_env(cls) -> "CompressionSettings":
+        encodings = os.getenv("RESPONSE_COMPRESSION", "zstd,br,gzip")
+        return cls(
+            encodings=tuple(e.strip().lower() for e in encodings.split(",") if e.strip()),
+            min_bytes=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024")),
+            max_bytes=int(os.getenv("RESPONSE_COMPRESSION_MAX_BYTES", str(1024 * 1024))),
+            gzip_level=int(os.getenv("RESPONSE_GZIP_LEVEL", "6")),
+            brotli_quality=int(os.getenv("RESPONSE_BROTLI_QUALITY", "5")),
+            zstd_level=int(os.getenv("RESPONSE_ZSTD_LEVEL", "3")),
+        )
+
+    def compressors(self) -> dict[str, Callable[[bytes], bytes]]:
+        """Enabled encodings whose library is available, in preference order."""
+        available: dict[str, Callable[[bytes], bytes]] = {
+            "gzip": lambda body: gzip.compress(body, self.gzip_level, mtime=0),
+        }
+        if brotli is not None:
+            available["br"] = lambda body: brotli.compress(body, quality=self.brotli_quality)
+        if zstandard is not None:
+            available["zstd"] = lambda body: zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        return {e: available[e] for e in self.encodings if e in available}
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        """The encoding to use for this Accept-Encoding header (None: identity)."""
+        if not accept_encoding:
+            return None
+        accepted = _accepted(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.compressors():
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+
+def encode_json(
+    content: Any,
+    accept_encoding: str | None,
+    settings: CompressionSettings,
+    include: Include | None = None,
+) -> tuple[bytes, str | None]:
+    """Serialize (and project) `content`, then compress it if negotiated. Returns (body, encoding)."""
+    body = dumps(content, include)
+    encoding = None
+    if settings.min_bytes <= len(body) <= settings.max_bytes:
+        encoding = settings.negotiate(accept_encoding)
+        if encoding is not None:
+            body = settings.compressors()[encoding](body)
+    metrics.response_bytes.inc(len(body), encoding=encoding or "identity")
+    return body, encoding
+
+
+async def json_response(
+    content: Any,
+    accept_encoding: str | None,
+    settings: CompressionSettings,
+    include: Include | None = None,
+    status_code: int = 200,
+) -> Response:
+    """Response for encode_json(), encoded in a worker thread so large bodies do not block the loop."""
+    body, encoding = await asyncio.to_thread(encode_json, content, accept_encoding, settings, include)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
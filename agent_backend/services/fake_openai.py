@@ -0,0 +1,290 @@
+"""
+Deterministic in-process stand-in for AsyncOpenAI, for benchmarks and local runs.
+
+FakeOpenAI answers chat.completions.create (including stream=True) and images.generate with
+well-formed responses for every agent prompt in this repo (analyzer, batched
+prompts, builders, judges), after a simulated latency drawn from a configurable
+distribution, and fails a configurable fraction of calls with real openai
+429/500 errors. Images are realistic 1024px PNGs (about 2.3 MB of base64 at
+the default noise level), so payload handling costs match production.
+
+Outcomes are seeded by the request content and how many times that exact
+request has been seen, so a run is reproducible regardless of interleaving
+(and a retried request can succeed where its first attempt failed).
+
+Enable it for the API server with FAKE_OPENAI=true; see FakeModelSettings.from_env
+for the knobs.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+import httpx
+import openai
+from openai.types import ImagesResponse
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from models.judgment import JUDGE_CRITERIA
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+@dataclass
+class LatencyModel:
+    """Simulated upstream latency in seconds. `median` is the fixed value for "fixed"."""
+
+    distribution: str = "lognormal"
+    median: float = 0.5
+    spread: float = 0.5  # lognormal sigma, or +/- fraction of median for uniform
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "fixed":
+            return self.median
+        if self.distribution == "uniform":
+            return rng.uniform(self.median * (1 - self.spread), self.median * (1 + self.spread))
+        return rng.lognormvariate(math.log(self.median), self.spread)
+
+
+@dataclass
+class FakeModelSettings:
+    """Behaviour of the fake upstream."""
+
+    chat_latency: LatencyModel
+    image_latency: LatencyModel
+    error_rate: float = 0.0
+    image_size: int = 1024
+    image_noise: float = 0.5  # fraction of incompressible rows; drives PNG size
+    code_bytes: int = 8_000
+    # Completion output rate after the first token, streamed or not (0: no generation time)
+    tokens_per_second: float = 0.0
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeModelSettings":
+        distribution = os.getenv("FAKE_OPENAI_LATENCY", "lognormal")
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"FAKE_OPENAI_LATENCY must be one of {LATENCY_DISTRIBUTIONS}, got {distribution!r}")
+        spread = float(os.getenv("FAKE_OPENAI_LATENCY_SPREAD", "0.5"))
+        return cls(
+            chat_latency=LatencyModel(distribution, float(os.getenv("FAKE_OPENAI_CHAT_SECONDS", "0.5")), spread),
+            image_latency=LatencyModel(distribution, float(os.getenv("FAKE_OPENAI_IMAGE_SECONDS", "5")), spread),
+            error_rate=float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0")),
+            image_size=int(os.getenv("FAKE_OPENAI_IMAGE_SIZE", "1024")),
+            image_noise=float(os.getenv("FAKE_OPENAI_IMAGE_NOISE", "0.5")),
+            code_bytes=int(os.getenv("FAKE_OPENAI_CODE_BYTES", "8000")),
+            tokens_per_second=float(os.getenv("FAKE_OPENAI_TOKENS_PER_SECOND", "0")),
+            seed=int(os.getenv("FAKE_OPENAI_SEED", "0")),
+        )
+
+
+@lru_cache(maxsize=4)
+def fake_png_base64(size: int, noise: float, seed: int) -> str:
+    """A size x size RGB PNG: gradient rows mixed with random rows, base64-encoded."""
+    rng = random.Random(seed)
+    rows = []
+    for y in range(size):
+        if rng.random() < noise:
+            pixels = rng.randbytes(size * 3)
+        else:
+            shade = y * 255 // max(size - 1, 1)
+            pixels = bytes(v for x in range(size) for v in (x * 255 // size, shade, 128))
+        rows.append(b"\x00" + pixels)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+    return base64.b64encode(png).decode("ascii")
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.get("text", "") for part in content or [] if part.get("type") == "text")
+
+
+class FakeOpenAI:
+    """AsyncOpenAI-compatible client exposing chat.completions.create and images.generate."""
+
+    def __init__(self, settings: FakeModelSettings | None = None):
+        self.settings = settings or FakeModelSettings.from_env()
+        self._seen: Counter[str] = Counter()
+        self.calls: Counter[str] = Counter()
+        self.errors = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.images = SimpleNamespace(generate=self._generate)
+
+    def _rng(self, endpoint: str, body: dict[str, Any]) -> random.Random:
+        digest = hashlib.sha256(
+            json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self._seen[digest] += 1
+        return random.Random(f"{self.settings.seed}:{endpoint}:{digest}:{self._seen[digest]}")
+
+    async def _simulate(self, endpoint: str, rng: random.Random, latency: LatencyModel) -> None:
+        self.calls[endpoint] += 1
+        await asyncio.sleep(latency.sample(rng))
+        if rng.random() < self.settings.error_rate:
+            self.errors += 1
+            request = httpx.Request("POST", f"https://api.openai.com{endpoint}")
+            if rng.random() < 0.5:
+                response = httpx.Response(429, request=request, headers={"retry-after": "1"})
+                raise openai.RateLimitError("Fake rate limit", response=response, body=None)
+            response = httpx.Response(500, request=request)
+            raise openai.InternalServerError("Fake server error", response=response, body=None)
+
+    async def _chat(
+        self, *, model: str, messages: list[dict[str, Any]], stream: bool = False, **kwargs: Any
+    ) -> ChatCompletion | AsyncIterator[ChatCompletionChunk]:
+        rng = self._rng("/v1/chat/completions", {"model": model, "messages": messages, **kwargs})
+        # For streams the simulated latency is the time to the first token
+        await self._simulate("/v1/chat/completions", rng, self.settings.chat_latency)
+        system = _text_of(messages[0]["content"]) if messages else ""
+        user = _text_of(messages[-1]["content"]) if messages else ""
+        content = self._reply(system, user, rng)
+        prompt_tokens = (len(system) + len(user)) // 4
+        completion_tokens = len(content) // 4
+        if stream:
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage", False)
+            usage = (prompt_tokens, completion_tokens) if include_usage else None
+            return self._stream(model, content, usage, rng.getrandbits(48))
+        if self.settings.tokens_per_second > 0:
+            await asyncio.sleep(completion_tokens / self.settings.tokens_per_second)
+        return ChatCompletion.model_validate(
+            {
+                "id": f"chatcmpl-fake-{rng.getrandbits(48):x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    async def _stream(
+        self, model: str, content: str, usage: tuple[int, int] | None, request_id: int
+    ) -> AsyncIterator[ChatCompletionChunk]:
+        """Content in ~16-token chunks, paced at tokens_per_second; usage in a final chunk."""
+        base = {
+            "id": f"chatcmpl-fake-{request_id:x}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+        }
+        chunk_chars = 64
+        delay = chunk_chars / 4 / self.settings.tokens_per_second if self.settings.tokens_per_second > 0 else 0.0
+        for start in range(0, len(content), chunk_chars):
+            if start and delay:
+                await asyncio.sleep(delay)
+            delta = {"content": content[start : start + chunk_chars]}
+            if not start:
+                delta["role"] = "assistant"
+            yield ChatCompletionChunk.model_validate(
+                {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            )
+        yield ChatCompletionChunk.model_validate(
+            {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        )
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage
+            yield ChatCompletionChunk.model_validate(
+                {
+                    **base,
+                    "choices": [],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }
+            )
+
+    async def _generate(self, *, model: str, prompt: str, **kwargs: Any) -> ImagesResponse:
+        rng = self._rng("/v1/images/generations", {"model": model, "prompt": prompt, **kwargs})
+        await self._simulate("/v1/images/generations", rng, self.settings.image_latency)
+        s = self.settings
+        return ImagesResponse.model_validate(
+            {"created": int(time.time()), "data": [{"b64_json": fake_png_base64(s.image_size, s.image_noise, s.seed)}]}
+        )
+
+    def _reply(self, system: str, user: str, rng: random.Random) -> str:
+        """Answer in the shape the calling agent's system prompt asks for."""
+        if "numbered user requests" in system:
+            queries = re.findall(r"Query (\d+):\n(.*)", user)
+            return json.dumps(
+                {"queries": [{"index": int(i), **self._analysis(q)} for i, q in queries]}
+            )
+        if "query analyst" in system:
+            return json.dumps({**self._analysis(user), "raw_query": user})
+        if "several designers" in system:
+            names = re.findall(r"agent_name: (\S+)", user)
+            return json.dumps({"prompts": {n: f"{n} rendering of the request, {rng.randint(0, 999)}" for n in names}})
+        if "screening several candidate" in system:
+            indexes = re.findall(r"Candidate (\d+) from", user)
+            return json.dumps(
+                {"scores": [{"index": int(i), **{c: rng.randint(2, 5) for c in JUDGE_CRITERIA}} for i in indexes]}
+            )
+        if "several builder agents" in system:
+            names = re.findall(r"Output \d+ from (\S+) \(", user)
+            return json.dumps({"judgments": [self._judgment(n, rng) for n in names]})
+        if "critic" in system or "reviewer" in system:
+            name = re.search(r" from (\S+) \(persona", user)
+            return json.dumps(self._judgment(name.group(1) if name else "unknown", rng))
+        if "developer" in system:
+            return self._html(rng)
+        return f"A detailed illustration for the request, variation {rng.randint(0, 9999)}."
+
+    @staticmethod
+    def _analysis(query: str) -> dict[str, Any]:
+        code_words = ("app", "component", "page", "form", "website", "html", "code")
+        task_type = "code" if any(w in query.lower() for w in code_words) else "image"
+        return {"intent": "fake_intent", "task_type": task_type, "requirements": [query[:80]], "constraints": []}
+
+    @staticmethod
+    def _judgment(agent_name: str, rng: random.Random) -> dict[str, Any]:
+        ratings = [
+            {"criterion": c, "score": rng.randint(2, 5), "rationale": "Simulated rating."} for c in JUDGE_CRITERIA
+        ]
+        return {
+            "agent_name": agent_name,
+            "persona": "unknown",
+            "criteria_ratings": ratings,
+            "overall_score": round(sum(r["score"] for r in ratings) / len(ratings), 2),
+            "summary": "Simulated judgment.",
+        }
+
+    def _html(self, rng: random.Random) -> str:
+        head = '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>Fake app</title></head><body>\n'
+        tail = '<button type="button">Go</button>\n</body></html>'
+        body = []
+        size = len(head) + len(tail)
+        while size < self.settings.code_bytes:
+            line = f"<p>Section {len(body)}: {rng.getrandbits(64):x}</p>\n"
+            body.append(line)
+            size += len(line)
+        return head + "".join(body) + tail
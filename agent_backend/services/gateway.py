@@ -0,0 +1,224 @@
+"""
+ModelGateway: the single path from agents to the OpenAI client.
+Routes every chat and image call through the Scheduler with a priority lane
+and an estimated token cost, and records queue wait, call duration, token
+usage and images in services/telemetry.py. Transient errors are retried and
+slow calls hedged per services/resilience.py. Streamed chat calls hold their
+scheduler slot until the stream ends; they are retried only before the first
+chunk and never hedged.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from openai import AsyncOpenAI
+
+from services.resilience import ResilienceSettings, is_retryable, retry_after_seconds
+from services.scheduler import Priority, Scheduler
+from services.telemetry import current_span, metrics, span
+
+# Rough token costs used for tokens/min admission before the real usage is known
+CHARS_PER_TOKEN = 4
+IMAGE_INPUT_TOKENS = 765  # a 1024x1024 image at high detail
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+class StreamInterrupted(Exception):
+    """A streamed completion failed after some chunks were delivered; it cannot be retried."""
+
+
+def estimate_tokens(messages: list[dict[str, Any]], max_tokens: int | None = None) -> int:
+    """Estimate prompt + completion tokens for a chat request."""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    chars += len(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    images += 1
+    return chars // CHARS_PER_TOKEN + images * IMAGE_INPUT_TOKENS + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class ModelGateway:
+    """Wraps the shared AsyncOpenAI client; all agents call upstream through it."""
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        scheduler: Scheduler | None = None,
+        resilience: ResilienceSettings | None = None,
+    ):
+        self.client = client
+        self.scheduler = scheduler
+        # Retries and hedging; None sends every call exactly once
+        self.resilience = resilience
+
+    async def chat(self, *, priority: Priority, **kwargs: Any) -> Any:
+        """chat.completions.create(**kwargs) under the scheduler."""
+        model = kwargs["model"]
+        estimated = estimate_tokens(kwargs["messages"], kwargs.get("max_tokens"))
+        response = await self._call(
+            "chat", model, priority, lambda: self.client.chat.completions.create(**kwargs), estimated
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.record_chat_usage(model, usage)
+            if self.scheduler is not None and getattr(usage, "total_tokens", None):
+                self.scheduler.record_usage(model, estimated, usage.total_tokens)
+        return response
+
+    async def chat_stream(self, *, priority: Priority, **kwargs: Any) -> AsyncIterator[str]:
+        """
+        chat.completions.create(stream=True, **kwargs) under the scheduler,
+        yielding content deltas as they arrive. Usage is taken from the final
+        chunk (stream_options.include_usage).
+        """
+        model = kwargs["model"]
+        estimated = estimate_tokens(kwargs["messages"], kwargs.get("max_tokens"))
+        chunks: asyncio.Queue[str | None] = asyncio.Queue()
+
+        async def consume() -> Any:
+            stream = await self.client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+            usage = None
+            delivered = False
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    for choice in chunk.choices:
+                        if choice.delta.content:
+                            delivered = True
+                            chunks.put_nowait(choice.delta.content)
+            except Exception as e:
+                if delivered:
+                    raise StreamInterrupted(f"Stream from {model} failed mid-response: {e}") from e
+                raise
+            return usage
+
+        call = asyncio.create_task(self._call("chat_stream", model, priority, consume, estimated, hedge=False))
+        call.add_done_callback(lambda _: chunks.put_nowait(None))
+        try:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+            usage = call.result()
+        finally:
+            call.cancel()
+        if usage is not None:
+            metrics.record_chat_usage(model, usage)
+            if self.scheduler is not None and getattr(usage, "total_tokens", None):
+                self.scheduler.record_usage(model, estimated, usage.total_tokens)
+
+    async def generate_image(self, *, priority: Priority, **kwargs: Any) -> Any:
+        """images.generate(**kwargs) under the scheduler."""
+        model = kwargs["model"]
+        response = await self._call(
+            "images", model, priority, lambda: self.client.images.generate(**kwargs),
+            size=kwargs.get("size"), quality=kwargs.get("quality"),
+        )
+        metrics.record_image(
+            model, kwargs.get("size", ""), kwargs.get("quality", ""), len(getattr(response, "data", None) or [1])
+        )
+        return response
+
+    async def _call(
+        self,
+        endpoint: str,
+        model: str,
+        priority: Priority,
+        create: Callable[[], Awaitable[Any]],
+        tokens: float = 0,
+        hedge: bool = True,
+        **attributes: Any,
+    ) -> Any:
+        """One logical upstream call: hedged attempts, retried on transient errors."""
+        retries = 0
+        while True:
+            try:
+                if not hedge:
+                    return await self._attempt(endpoint, model, priority, create, tokens, attributes)
+                return await self._hedged(endpoint, model, priority, create, tokens, attributes)
+            except Exception as e:
+                if (
+                    self.resilience is None
+                    or retries >= self.resilience.max_retries
+                    or not is_retryable(e)
+                ):
+                    raise
+                retries += 1
+                metrics.upstream_retries.inc(endpoint=endpoint, model=model)
+                active = current_span()
+                if active is not None:
+                    active.set("retries", retries)
+                await asyncio.sleep(self.resilience.backoff(retries, retry_after_seconds(e)))
+
+    async def _hedged(
+        self,
+        endpoint: str,
+        model: str,
+        priority: Priority,
+        create: Callable[[], Awaitable[Any]],
+        tokens: float,
+        attributes: dict[str, Any],
+    ) -> Any:
+        """Run an attempt; if it outlives the hedge delay, race a duplicate against it."""
+        delay = self.resilience.hedge_delay(endpoint, model) if self.resilience is not None else None
+        if delay is None:
+            return await self._attempt(endpoint, model, priority, create, tokens, attributes)
+
+        primary = asyncio.create_task(self._attempt(endpoint, model, priority, create, tokens, attributes))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            hedge = asyncio.create_task(
+                self._attempt(endpoint, model, priority, create, tokens, {**attributes, "hedge": True})
+            )
+            tasks.append(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = "hedge" if task is hedge else "primary"
+                        metrics.upstream_hedges.inc(endpoint=endpoint, model=model, winner=winner)
+                        return task.result()
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(
+        self,
+        endpoint: str,
+        model: str,
+        priority: Priority,
+        create: Callable[[], Awaitable[Any]],
+        tokens: float,
+        attributes: dict[str, Any],
+    ) -> Any:
+        """A single request (via the scheduler when there is one) inside a span."""
+        queued_at = time.perf_counter()
+
+        async def call() -> Any:
+            metrics.upstream_queue_seconds.observe(
+                time.perf_counter() - queued_at, model=model, priority=priority.name.lower()
+            )
+            started = time.perf_counter()
+            with span(f"upstream.{endpoint}", metrics.upstream_seconds, endpoint=endpoint, model=model, **attributes):
+                response = await create()
+            if self.resilience is not None:
+                self.resilience.tracker.record(endpoint, model, time.perf_counter() - started)
+            return response
+
+        if self.scheduler is None:
+            return await call()
+        return await self.scheduler.submit(model, call, priority=priority, tokens=tokens)
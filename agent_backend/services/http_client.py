@@ -0,0 +1,102 @@
+"""
+Factory for the process-wide OpenAI client and its pooled httpx transport.
+
+The pool size, timeouts, keep-alive and HTTP/2 are configured from the
+environment (OPENAI_HTTP_* variables) so it can be sized against the number
+of workers and the scheduler's concurrency.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class HTTPClientSettings:
+    """Connection pool and timeout settings for the upstream HTTP client."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientSettings":
+        return cls(
+            max_connections=int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", "30")),
+            connect_timeout=float(os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(os.getenv("OPENAI_HTTP_READ_TIMEOUT", "120")),
+            write_timeout=float(os.getenv("OPENAI_HTTP_WRITE_TIMEOUT", "30")),
+            pool_timeout=float(os.getenv("OPENAI_HTTP_POOL_TIMEOUT", "10")),
+            http2=os.getenv("OPENAI_HTTP2", "true").lower() not in ("0", "false", "no"),
+        )
+
+
+def create_http_client(settings: HTTPClientSettings) -> httpx.AsyncClient:
+    """Build the shared pooled httpx client; HTTP/2 is used only when h2 is installed."""
+    return httpx.AsyncClient(
+        http2=settings.http2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout,
+            read=settings.read_timeout,
+            write=settings.write_timeout,
+            pool=settings.pool_timeout,
+        ),
+    )
+
+
+def create_openai_client(api_key: str, http_client: httpx.AsyncClient) -> AsyncOpenAI:
+    """The AsyncOpenAI client every agent shares (through ModelGateway)."""
+    # ModelGateway retries (with jittered backoff and hedging); the SDK must not retry as well
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+
+def pool_stats(http_client: httpx.AsyncClient, settings: HTTPClientSettings) -> dict[str, Any]:
+    """
+    Snapshot of connection pool usage. httpx does not expose this publicly, so
+    this reads the underlying httpcore pool and degrades to limits only.
+    """
+    stats: dict[str, Any] = {
+        "max_connections": settings.max_connections,
+        "max_keepalive_connections": settings.max_keepalive_connections,
+        "http2": settings.http2 and http2_available(),
+    }
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return stats
+    idle = sum(1 for c in connections if c.is_idle())
+    requests = getattr(pool, "_requests", [])
+    queued = sum(1 for r in requests if r.is_queued())
+    stats.update(
+        connections=len(connections),
+        idle_connections=idle,
+        active_connections=len(connections) - idle,
+        http2_connections=sum(1 for c in connections if "HTTP/2" in repr(c)),
+        active_requests=len(requests) - queued,
+        queued_requests=queued,
+    )
+    return stats
@@ -0,0 +1,325 @@
+"""
+Durable job queue for long-running orchestrations.
+
+POST /jobs stores a job in SQLite and returns its ID immediately; a pool of
+asyncio workers claims queued jobs, runs them through OrchestratorAgent.stream
+(recording progress as outputs and judgments arrive) and stores the result.
+
+A claimed job carries a lease: the claiming worker's owner ID and an expiry
+that a heartbeat renews while the job runs. Progress and results are only
+written by the lease owner, and a job whose lease expired (its process
+crashed or hung) can be claimed by any worker, in this or another process.
+A failed job is retried after an exponential backoff (its not_before time).
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from agents.orchestrator_agent import OrchestratorAgent
+from models.agent_output import OrchestratorOutput
+from models.job import Job, JobProgress
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """SQLite-backed job table. All methods are blocking; call via asyncio.to_thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, query TEXT NOT NULL, builders INTEGER, "
+            "attempts INTEGER NOT NULL DEFAULT 0, progress TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at TEXT NOT NULL, updated_at TEXT NOT NULL, "
+            "owner TEXT, lease_expires REAL, not_before REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            status=row["status"],
+            query=row["query"],
+            builders=row["builders"],
+            attempts=row["attempts"],
+            progress=JobProgress.model_validate_json(row["progress"]),
+            result=OrchestratorOutput.model_validate_json(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+    def create(self, query: str, builders: int | None = None) -> Job:
+        job_id = uuid.uuid4().hex
+        now = _now()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, query, builders, progress, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, query, builders, JobProgress().model_dump_json(), now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def claim_next(self, owner: str, lease_seconds: float, max_attempts: int | None = None) -> Job | None:
+        """
+        Atomically lease the oldest job that is queued and due, or running
+        under an expired lease, to `owner` and return it. With max_attempts,
+        expired jobs that already used every attempt are failed instead.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if max_attempts is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', owner = NULL, lease_expires = NULL, "
+                        "error = 'Worker lost its lease on the last attempt', updated_at = ? "
+                        "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                        (_now(), now, max_attempts),
+                    )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE (status = 'queued' AND not_before <= ?) "
+                    "OR (status = 'running' AND lease_expires < ?) ORDER BY created_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, "
+                    "lease_expires = ?, updated_at = ? WHERE id = ?",
+                    (owner, now + lease_seconds, _now(), row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def _update_owned(self, job_id: str, owner: str, assignments: str, params: tuple) -> bool:
+        """Apply an UPDATE to a running job only while `owner` holds its lease."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (*params, _now(), job_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease; False when `owner` no longer holds it."""
+        return self._update_owned(job_id, owner, "lease_expires = ?", (time.time() + lease_seconds,))
+
+    def update_progress(self, job_id: str, owner: str, progress: JobProgress) -> bool:
+        return self._update_owned(job_id, owner, "progress = ?", (progress.model_dump_json(),))
+
+    def succeed(self, job_id: str, owner: str, result: OrchestratorOutput, progress: JobProgress) -> bool:
+        return self._update_owned(
+            job_id,
+            owner,
+            "status = 'succeeded', result = ?, progress = ?, error = NULL, owner = NULL, lease_expires = NULL",
+            (result.model_dump_json(), progress.model_dump_json()),
+        )
+
+    def fail(self, job_id: str, owner: str, error: str, retry_after: float | None) -> bool:
+        """Record a failure; with retry_after (seconds) the job is queued again once that has passed."""
+        if retry_after is None:
+            return self._update_owned(
+                job_id, owner, "status = 'failed', error = ?, owner = NULL, lease_expires = NULL", (error,)
+            )
+        return self._update_owned(
+            job_id,
+            owner,
+            "status = 'queued', error = ?, not_before = ?, owner = NULL, lease_expires = NULL",
+            (error, time.time() + retry_after),
+        )
+
+    def release(self, owner: str) -> int:
+        """Queue `owner`'s running jobs again without charging the interrupted attempt (on shutdown)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), owner = NULL, "
+                "lease_expires = NULL, not_before = 0, updated_at = ? WHERE owner = ? AND status = 'running'",
+                (_now(), owner),
+            )
+        return cursor.rowcount
+
+
+class LeaseLost(Exception):
+    """Another worker took over a job whose lease this worker failed to renew."""
+
+
+class JobQueue:
+    """Pool of asyncio workers processing jobs from a JobStore."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        get_orchestrator: Callable[[], OrchestratorAgent],
+        workers: int = 4,
+        max_attempts: int = 3,
+        poll_interval: float = 2.0,
+        lease_seconds: float = 60.0,
+        retry_backoff: float = 5.0,
+        retry_backoff_max: float = 300.0,
+    ):
+        self.store = store
+        self.get_orchestrator = get_orchestrator
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        # Identifies this process's leases; unique per queue so a restart never resumes old leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    @classmethod
+    def from_env(cls, get_orchestrator: Callable[[], OrchestratorAgent]) -> "JobQueue":
+        return cls(
+            JobStore(os.getenv("JOBS_DB_PATH", "jobs.sqlite3")),
+            get_orchestrator,
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+            retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5")),
+            retry_backoff_max=float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "300")),
+        )
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = await asyncio.to_thread(self.store.release, self.owner)
+        if released:
+            logger.info("Released %d interrupted job(s) back to the queue", released)
+
+    async def submit(self, query: str, builders: int | None = None) -> Job:
+        job = await asyncio.to_thread(self.store.create, query, builders)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt of a job that failed `attempts` times."""
+        return min(self.retry_backoff * 2 ** (attempts - 1), self.retry_backoff_max)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(
+                    self.store.claim_next, self.owner, self.lease_seconds, self.max_attempts
+                )
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._process(job)
+            except Exception:
+                # E.g. "database is locked" with several processes on one file: keep the worker alive
+                logger.exception("Job worker error; retrying in %.1fs", self.poll_interval)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _renew(self, job: Job) -> bool:
+        """Extend the job's lease; a store error is logged and retried at the next heartbeat."""
+        try:
+            return await asyncio.to_thread(self.store.renew, job.id, self.owner, self.lease_seconds)
+        except Exception:
+            logger.exception("Job %s: could not renew its lease", job.id)
+            return True
+
+    async def _process(self, job: Job) -> None:
+        """Run a claimed job while renewing its lease every third of the lease time."""
+        run = asyncio.create_task(self._run(job))
+        try:
+            while not run.done():
+                await asyncio.wait({run}, timeout=self.lease_seconds / 3)
+                if not run.done() and not await self._renew(job):
+                    raise LeaseLost(job.id)
+            run.result()
+        except LeaseLost:
+            logger.warning("Job %s: lease lost to another worker; abandoning it", job.id)
+        except asyncio.CancelledError:
+            # Shutting down: stop() puts the job back in the queue
+            raise
+        except Exception as e:
+            retry = job.attempts < self.max_attempts
+            logger.warning("Job %s failed (attempt %d): %s", job.id, job.attempts, e)
+            retry_after = self.retry_delay(job.attempts) if retry else None
+            try:
+                await asyncio.to_thread(
+                    self.store.fail, job.id, self.owner, str(e) or type(e).__name__, retry_after
+                )
+            except Exception:
+                # The lease expires and another claim retries the job
+                logger.exception("Job %s: could not record the failure", job.id)
+        finally:
+            if not run.done():
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+
+    async def _run(self, job: Job) -> None:
+        progress = JobProgress(stage="analyzing")
+        orchestrator = self.get_orchestrator()
+        progress.builders_total = len(orchestrator.select_builders(job.builders))
+        await self._save_progress(job, progress)
+        async for event in orchestrator.stream(job.query, job.builders):
+            if event.event == "query":
+                progress.stage = "building"
+                if event.builders is not None:
+                    progress.builders_total = len(event.builders)
+            elif event.event == "output":
+                progress.outputs_done += 1
+                if progress.outputs_done == progress.builders_total:
+                    progress.stage = "judging"
+            elif event.event == "judgment":
+                progress.judgments_done += 1
+            elif event.event == "summary":
+                progress.stage = "done"
+                if not await asyncio.to_thread(self.store.succeed, job.id, self.owner, event.data, progress):
+                    raise LeaseLost(job.id)
+                return
+            else:
+                continue
+            await self._save_progress(job, progress)
+        raise RuntimeError("Orchestration ended without a summary")
+
+    async def _save_progress(self, job: Job, progress: JobProgress) -> None:
+        if not await asyncio.to_thread(self.store.update_progress, job.id, self.owner, progress):
+            raise LeaseLost(job.id)
@@ -0,0 +1,194 @@
+"""
+Adaptive persona selection from historical judge scores.
+
+PersonaScoreStore keeps running count / sum / sum of squares of
+AgentJudgment.overall_score per (intent, task_type, persona) in SQLite,
+updated incrementally after every tournament. Each score is also recorded
+under intent "*" so a rare intent can fall back to its task type's history.
+
+PersonaSelector picks which personas run for a request: with probability
+`explore_rate` every persona runs (a full tournament that keeps the history
+honest for all of them); otherwise the top `k` personas by Thompson sampling
+or UCB1 over that history. UCB tries personas with no history first;
+Thompson sampling draws them from a wide prior, so new personas get tried.
+Personas are keyed by agent_name, which stays stable across persona edits.
+The store is blocking SQLite; the selector's select() and record() run it in
+a worker thread.
+"""
+
+import asyncio
+import math
+import os
+import random
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Mapping, Sequence
+
+from services.telemetry import metrics
+
+ANY_INTENT = "*"
+
+# Prior for personas with little history: the middle of the 1-5 scale, wide
+PRIOR_MEAN = 3.0
+PRIOR_VARIANCE = 1.0
+
+
+def normalize_intent(intent: str) -> str:
+    return "_".join(intent.casefold().split()) or "unknown"
+
+
+@dataclass
+class ScoreStats:
+    """Running statistics of one persona's judge scores."""
+
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else PRIOR_MEAN
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return PRIOR_VARIANCE
+        return max(self.total_sq / self.count - self.mean**2, 0.01)
+
+
+class PersonaScoreStore:
+    """Judge score history per (intent, task_type, persona), persisted in SQLite."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS persona_scores ("
+            "intent TEXT NOT NULL, task_type TEXT NOT NULL, persona TEXT NOT NULL, "
+            "count INTEGER NOT NULL, total REAL NOT NULL, total_sq REAL NOT NULL, "
+            "PRIMARY KEY (intent, task_type, persona))"
+        )
+        self._conn.commit()
+
+    def record(self, intent: str, task_type: str, persona: str, score: float) -> None:
+        self.record_many(intent, task_type, {persona: score})
+
+    def record_many(self, intent: str, task_type: str, scores: Mapping[str, float]) -> None:
+        """Add one tournament's scores (persona -> score) in a single transaction."""
+        rows = [
+            (key_intent, task_type, persona, score, score * score)
+            for key_intent in (normalize_intent(intent), ANY_INTENT)
+            for persona, score in scores.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO persona_scores (intent, task_type, persona, count, total, total_sq) "
+                "VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (intent, task_type, persona) DO UPDATE SET "
+                "count = count + 1, total = total + excluded.total, total_sq = total_sq + excluded.total_sq",
+                rows,
+            )
+            self._conn.commit()
+
+    def stats(self, intent: str, task_type: str) -> dict[str, ScoreStats]:
+        """History for one (intent, task_type); intent "*" is the task type as a whole."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT persona, count, total, total_sq FROM persona_scores WHERE intent = ? AND task_type = ?",
+                (intent, task_type),
+            ).fetchall()
+        return {persona: ScoreStats(count, total, total_sq) for persona, count, total, total_sq in rows}
+
+    def dump(self) -> list[dict[str, object]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT intent, task_type, persona, count, total FROM persona_scores "
+                "ORDER BY task_type, intent, persona"
+            ).fetchall()
+        return [
+            {"intent": i, "task_type": t, "persona": p, "count": n, "mean_score": round(total / n, 3)}
+            for i, t, p, n, total in rows
+        ]
+
+
+class PersonaSelector:
+    """Chooses the personas to run for a request (policy "all", "thompson" or "ucb")."""
+
+    POLICIES = ("all", "thompson", "ucb")
+
+    def __init__(
+        self,
+        store: PersonaScoreStore,
+        policy: str = "thompson",
+        k: int = 2,
+        explore_rate: float = 0.1,
+        min_observations: int = 20,
+        ucb_c: float = 1.0,
+        rng: random.Random | None = None,
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(f"PERSONA_SELECTION must be one of {', '.join(self.POLICIES)}, got {policy!r}")
+        self.store = store
+        self.policy = policy
+        self.k = max(1, k)
+        self.explore_rate = explore_rate
+        # Below this many scores for an intent, use its task type's history instead
+        self.min_observations = min_observations
+        self.ucb_c = ucb_c
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls) -> "PersonaSelector | None":
+        """Selector from PERSONA_* environment variables, or None for the full tournament."""
+        policy = os.getenv("PERSONA_SELECTION", "all")
+        if policy == "all":
+            return None
+        return cls(
+            PersonaScoreStore(os.getenv("PERSONA_STATS_PATH", "persona_stats.sqlite3")),
+            policy=policy,
+            k=int(os.getenv("PERSONA_TOP_K", "2")),
+            explore_rate=float(os.getenv("PERSONA_EXPLORE_RATE", "0.1")),
+            min_observations=int(os.getenv("PERSONA_MIN_OBSERVATIONS", "20")),
+        )
+
+    def _history(self, intent: str, task_type: str) -> dict[str, ScoreStats]:
+        history = self.store.stats(normalize_intent(intent), task_type)
+        if sum(s.count for s in history.values()) >= self.min_observations:
+            return history
+        return self.store.stats(ANY_INTENT, task_type)
+
+    def _sample(self, stats: ScoreStats) -> float:
+        # Normal posterior on the mean score: prior N(PRIOR_MEAN, PRIOR_VARIANCE), known variance
+        precision = 1 / PRIOR_VARIANCE + stats.count / stats.variance
+        mean = (PRIOR_MEAN / PRIOR_VARIANCE + stats.total / stats.variance) / precision
+        return self.rng.gauss(mean, math.sqrt(1 / precision))
+
+    def _ucb(self, stats: ScoreStats, total: int) -> float:
+        if stats.count == 0:
+            return math.inf
+        return stats.mean + self.ucb_c * math.sqrt(2 * math.log(max(total, 1)) / stats.count)
+
+    async def select(self, personas: Sequence[str], intent: str, task_type: str) -> list[str]:
+        """The personas to run, in the given (registry) order."""
+        if self.policy == "all" or len(personas) <= self.k or self.rng.random() < self.explore_rate:
+            reason = "full" if len(personas) <= self.k or self.policy == "all" else "explore"
+            for persona in personas:
+                metrics.persona_selected.inc(persona=persona, reason=reason)
+            return list(personas)
+        history = await asyncio.to_thread(self._history, intent, task_type)
+        empty = ScoreStats()
+        if self.policy == "ucb":
+            total = sum(s.count for s in history.values())
+            values = {p: self._ucb(history.get(p, empty), total) for p in personas}
+        else:
+            values = {p: self._sample(history.get(p, empty)) for p in personas}
+        chosen = set(sorted(personas, key=lambda p: -values[p])[: self.k])
+        for persona in chosen:
+            metrics.persona_selected.inc(persona=persona, reason=self.policy)
+        return [p for p in personas if p in chosen]
+
+    async def record(self, intent: str, task_type: str, scores: Mapping[str, float]) -> None:
+        """Add one tournament's judge scores (persona -> score) to the history."""
+        if scores:
+            await asyncio.to_thread(self.store.record_many, intent, task_type, scores)
@@ -0,0 +1,117 @@
+"""
+Tier 0 of judging: local checks that settle obvious outcomes without an LLM.
+
+prescreen() looks at all builder outputs of one orchestration and marks each
+as "judge" (needs the model), "reject" (empty or undecodable image, broken or
+tiny code) or "duplicate" (near-identical to an earlier builder's output).
+Image duplicates are found with a 64-bit difference hash (dHash) compared by
+Hamming distance; code duplicates by a hash of the whitespace-normalised
+source. Requires Pillow for image checks; without it images always go to the
+model.
+"""
+
+import hashlib
+import io
+import re
+from dataclasses import dataclass
+from typing import Callable, Literal
+
+from models.agent_output import AgentOutput
+from services.code_checks import check_html, strip_code_fence
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; images skip the local checks
+    Image = None
+
+# Images smaller than this (e.g. the 1x1 placeholder) count as missing
+MIN_IMAGE_SIDE = 16
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Verdict:
+    """Tier 0 outcome for one output."""
+
+    action: Literal["judge", "reject", "duplicate"]
+    reason: str = ""
+    # Index of the earlier output this one duplicates
+    duplicate_of: int | None = None
+
+
+def dhash(data: bytes, size: int = 8) -> int:
+    """64-bit difference hash of an encoded image. Raises OSError/ValueError if undecodable."""
+    with Image.open(io.BytesIO(data)) as img:
+        if min(img.size) < MIN_IMAGE_SIDE:
+            raise ValueError(f"image is only {img.size[0]}x{img.size[1]} pixels")
+        small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+        pixels = small.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def code_fingerprint(code: str) -> str:
+    return hashlib.sha256(_WHITESPACE.sub(" ", code).strip().encode("utf-8")).hexdigest()
+
+
+def prescreen(
+    outputs: list[AgentOutput],
+    load_image: Callable[[AgentOutput], bytes],
+    max_distance: int,
+) -> list[Verdict]:
+    """
+    Tier 0 verdicts, in output order. Outputs whose builder failed are
+    rejected; an image within `max_distance` bits (dHash) of an earlier
+    accepted image, or code identical to earlier code up to whitespace, is a
+    duplicate of it. Blocking (decodes images); run it in a thread.
+    """
+    verdicts: list[Verdict] = []
+    image_hashes: list[tuple[int, int]] = []
+    code_hashes: dict[str, int] = {}
+    for index, output in enumerate(outputs):
+        if output.status != "ok":
+            verdicts.append(Verdict("reject", f"builder status {output.status}"))
+            continue
+
+        if "code" in output.extra:
+            code = strip_code_fence(str(output.extra.get("code") or ""))
+            report = check_html(code)
+            if report.fatal:
+                verdicts.append(Verdict("reject", report.fatal_reason or "Broken code output"))
+                continue
+            fingerprint = code_fingerprint(code)
+            if fingerprint in code_hashes:
+                verdicts.append(Verdict("duplicate", "identical code", code_hashes[fingerprint]))
+                continue
+            code_hashes[fingerprint] = index
+            verdicts.append(Verdict("judge"))
+            continue
+
+        if Image is None:
+            verdicts.append(Verdict("judge"))
+            continue
+        try:
+            data = load_image(output)
+            if not data:
+                raise ValueError("empty image")
+            fingerprint = dhash(data)
+        except OSError:
+            verdicts.append(Verdict("reject", "Image could not be decoded"))
+            continue
+        except ValueError as e:
+            verdicts.append(Verdict("reject", f"Unusable image: {e}"))
+            continue
+        match = next(
+            (i for i, h in image_hashes if bin(h ^ fingerprint).count("1") <= max_distance), None
+        )
+        if match is not None:
+            verdicts.append(Verdict("duplicate", "near-identical image", match))
+            continue
+        image_hashes.append((index, fingerprint))
+        verdicts.append(Verdict("judge"))
+    return verdicts
@@ -0,0 +1,102 @@
+"""
+Retry and hedging policy for upstream model calls (used by ModelGateway).
+
+- Retries: retryable errors (429, 5xx, connection errors and timeouts) are
+  retried up to UPSTREAM_MAX_RETRIES times with full-jitter exponential
+  backoff, honouring Retry-After when the API sends one.
+- Hedging: once an endpoint/model has enough latency samples, a call still
+  running after the HEDGE_QUANTILE (p95 by default) of recent latencies gets a
+  duplicate request; the first successful response wins and the other is
+  cancelled. Hedges cost extra requests, so HEDGE_ENDPOINTS picks which
+  endpoints may be hedged.
+"""
+
+import os
+import random
+from collections import deque
+from dataclasses import dataclass, field
+
+import openai
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient upstream failures worth another attempt."""
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """The Retry-After header of an API error, in seconds, if present and numeric."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations per (endpoint, model)."""
+
+    def __init__(self, window: int = 256):
+        self.window = window
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+
+    def record(self, endpoint: str, model: str, seconds: float) -> None:
+        samples = self._samples.get((endpoint, model))
+        if samples is None:
+            samples = self._samples[(endpoint, model)] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def quantile(self, endpoint: str, model: str, q: float, min_samples: int) -> float | None:
+        samples = self._samples.get((endpoint, model))
+        if samples is None or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class ResilienceSettings:
+    """Retry/backoff and hedging knobs for ModelGateway."""
+
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge_endpoints: frozenset[str] = frozenset({"chat", "images"})
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.2
+    tracker: LatencyTracker = field(default_factory=LatencyTracker)
+
+    @classmethod
+    def from_env(cls) -> "ResilienceSettings":
+        endpoints = os.getenv("HEDGE_ENDPOINTS", "chat,images")
+        return cls(
+            max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5")),
+            backoff_max=float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "8")),
+            hedge_endpoints=frozenset(e.strip() for e in endpoints.split(",") if e.strip()),
+            hedge_quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+            hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+            hedge_min_delay=float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.2")),
+        )
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def hedge_delay(self, endpoint: str, model: str) -> float | None:
+        """Seconds after which to fire a hedge, or None to not hedge this call."""
+        if endpoint not in self.hedge_endpoints:
+            return None
+        p = self.tracker.quantile(endpoint, model, self.hedge_quantile, self.hedge_min_samples)
+        return None if p is None else max(p, self.hedge_min_delay)
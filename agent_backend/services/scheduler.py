@@ -0,0 +1,288 @@
+"""
+Admission control for upstream model calls.
+
+Every chat and image call goes through Scheduler.submit(), which enforces:
+- a global cap on in-flight upstream calls,
+- per-model token buckets for requests/min and tokens/min,
+- a bounded wait queue that rejects fast with SchedulerOverloaded (mapped to
+  503 + Retry-After by main.py),
+- priority lanes, so judge calls for nearly finished orchestrations are served
+  before builder calls, which are served before new analyzer calls.
+
+A single pump grants slots: each time a slot frees up (or a call arrives) it
+picks, among the per-model queues whose rate budget allows a call now, the
+head waiter with the lowest (priority, arrival order), so priorities hold
+across models and not only within one.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    JUDGE = 0
+    BUILDER = 1
+    ANALYZER = 2
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when the wait queue is full; retry_after is a hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Upstream scheduler is overloaded; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class ModelLimits:
+    """Rate limits for one model. None means unlimited."""
+
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate_per_minute."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 when available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, delta: float) -> None:
+        """Correct a previous estimate once the real cost is known (may go negative)."""
+        self.tokens -= delta
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class _ModelLane:
+    """Priority queue and rate buckets for a single model."""
+
+    def __init__(self, limits: ModelLimits):
+        self.requests = TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self.tokens = TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.heap: list[_Waiter] = []
+
+    def head(self) -> _Waiter | None:
+        """First waiter still waiting, dropping cancelled ones."""
+        while self.heap and self.heap[0].future.cancelled():
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def wait_time(self, tokens: float) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def take(self, tokens: float) -> None:
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+
+    def requests_per_second(self) -> float | None:
+        return self.requests.rate if self.requests is not None else None
+
+
+class Scheduler:
+    """Central gate for upstream calls; see module docstring."""
+
+    def __init__(
+        self,
+        limits: dict[str, ModelLimits] | None = None,
+        max_concurrency: int = 64,
+        max_queue: int = 1000,
+    ):
+        self.limits = limits or {}
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._lanes: dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._queued = 0
+        self._pump_task: asyncio.Task | None = None
+        # Set whenever a slot frees up or a waiter arrives
+        self._changed = asyncio.Event()
+        self.rejected = 0
+        self.completed = 0
+
+    @classmethod
+    def from_env(cls) -> "Scheduler":
+        """
+        Build a scheduler from SCHEDULER_MAX_CONCURRENCY, SCHEDULER_MAX_QUEUE and
+        MODEL_RATE_LIMITS, a JSON object such as
+        {"gpt-4o-mini": {"rpm": 500, "tpm": 200000}, "gpt-image-1": {"rpm": 50}}.
+        """
+        raw = json.loads(os.getenv("MODEL_RATE_LIMITS", "{}"))
+        limits = {
+            model: ModelLimits(
+                requests_per_minute=spec.get("rpm"),
+                tokens_per_minute=spec.get("tpm"),
+            )
+            for model, spec in raw.items()
+        }
+        return cls(
+            limits=limits,
+            max_concurrency=int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "64")),
+            max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "1000")),
+        )
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _ModelLane(self.limits.get(model, ModelLimits()))
+        return lane
+
+    def _retry_after(self, lane: _ModelLane | None = None) -> int:
+        rps = lane.requests_per_second() if lane is not None else None
+        if not rps:
+            return 1
+        return max(1, math.ceil(len(lane.heap) / rps))
+
+    def admit(self) -> None:
+        """Fail fast before starting new work when the queue is already full."""
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            busiest = max(self._lanes.values(), key=lambda l: len(l.heap), default=None)
+            raise SchedulerOverloaded(self._retry_after(busiest))
+
+    async def submit(
+        self,
+        model: str,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        priority: Priority,
+        tokens: float = 0,
+    ) -> T:
+        """
+        Wait for a concurrency slot and rate-limit budget for `model`, then run
+        fn(). `tokens` is the estimated token cost used for the tokens/min bucket.
+        """
+        lane = self._lane(model)
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerOverloaded(self._retry_after(lane))
+
+        waiter = _Waiter(priority, next(self._seq), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(lane.heap, waiter)
+        self._queued += 1
+        self._changed.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just as we were cancelled; give it back.
+                self._release()
+            raise
+        finally:
+            self._queued -= 1
+
+        try:
+            return await fn()
+        finally:
+            self.completed += 1
+            self._release()
+
+    def record_usage(self, model: str, estimated: float, actual: float) -> None:
+        """Reconcile the tokens/min bucket with the real usage of a finished call."""
+        lane = self._lanes.get(model)
+        if lane is not None and lane.tokens is not None:
+            lane.tokens.adjust(actual - estimated)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._changed.set()
+
+    def _next(self) -> tuple[_ModelLane | None, float | None]:
+        """
+        The lane whose head should be granted now, by (priority, seq) across
+        lanes with budget, or (None, seconds until some head has budget).
+        None for both when nothing waits.
+        """
+        best: tuple[_Waiter, _ModelLane] | None = None
+        soonest: float | None = None
+        for lane in self._lanes.values():
+            waiter = lane.head()
+            if waiter is None:
+                continue
+            wait = lane.wait_time(waiter.tokens)
+            if wait > 0:
+                soonest = wait if soonest is None else min(soonest, wait)
+            elif best is None or waiter < best[0]:
+                best = (waiter, lane)
+        if best is not None:
+            return best[1], None
+        return None, soonest
+
+    async def _pump(self) -> None:
+        """Grant queued waiters of every lane in priority order as slots and budget allow."""
+        while True:
+            self._changed.clear()
+            timeout = None
+            if self._in_flight < self.max_concurrency:
+                lane, timeout = self._next()
+                if lane is not None:
+                    waiter = heapq.heappop(lane.heap)
+                    lane.take(waiter.tokens)
+                    self._in_flight += 1
+                    waiter.future.set_result(None)
+                    continue
+                if timeout is None:
+                    return  # nothing waits; submit() starts a new pump
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queued_by_model": {model: len(lane.heap) for model, lane in self._lanes.items()},
+        }
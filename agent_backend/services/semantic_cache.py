@@ -0,0 +1,274 @@
+"""
+Semantic (near-duplicate) cache for paraphrased requests.
+
+The exact-match ResponseCache misses "landing page for a coffee shop" vs
+"coffee shop landing page". SemanticCache embeds the request text, keeps the
+vectors in a NumPy matrix and answers a lookup with the stored value of the
+most similar earlier request when the cosine similarity reaches the
+threshold. Search is one matrix-vector product over the live rows.
+
+Embedders are pluggable (anything with `dim` and `embed(texts)` returning
+L2-normalised float32 rows). HashingEmbedder is local and deterministic: it
+hashes words and character trigrams into a fixed-size vector, so it catches
+reordered and lightly reworded requests that share vocabulary. With
+sentence-transformers installed, SEMANTIC_CACHE_EMBEDDER can name a model
+for real paraphrase matching.
+
+Entries are bounded by `capacity`; when full, the least recently used entry
+is evicted. With a directory configured, vectors live in a memory-mapped
+.npy file and values/metadata in SQLite next to it, so the cache survives
+restarts; otherwise both are in memory.
+
+get() and set() are coroutines: embedding, the similarity scan, SQLite and
+flushing the memory-mapped vectors all run in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Protocol
+
+import numpy as np
+
+from services.telemetry import current_span, metrics
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional; the hashing embedder needs no extra packages
+    SentenceTransformer = None
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for matching requests ("no"/"not" are kept)
+STOPWORDS = frozenset(
+    "a an and are as at be by can could create for from generate i in into is it make me my need of on or please "
+    "some that the this to want with would you".split()
+)
+
+
+class Embedder(Protocol):
+    """Maps texts to L2-normalised float32 vectors of length `dim`."""
+
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """
+    Bag of words plus character trigrams, feature-hashed into `dim` buckets
+    with a hash-derived sign. Local, deterministic and order-insensitive.
+    """
+
+    def __init__(self, dim: int = 512, trigram_weight: float = 0.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        words = [w for w in _TOKEN.findall(text.casefold()) if w not in STOPWORDS]
+        features = [(w, 1.0) for w in words]
+        for w in words:
+            padded = f"<{w}>"
+            features += [(padded[i : i + 3], self.trigram_weight) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+                out[row, h % self.dim] += weight if h >> 63 else -weight
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    """Embeddings from a local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        if SentenceTransformer is None:
+            raise RuntimeError("sentence-transformers is not installed")
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def create_embedder(spec: str, dim: int = 512) -> Embedder:
+    """"hashing" or "sentence-transformers:<model name>"."""
+    if spec == "hashing":
+        return HashingEmbedder(dim)
+    if spec.startswith("sentence-transformers:"):
+        return SentenceTransformerEmbedder(spec.split(":", 1)[1])
+    raise ValueError(f"Unknown SEMANTIC_CACHE_EMBEDDER {spec!r}")
+
+
+def _scope_id(scope: str) -> int:
+    return int.from_bytes(hashlib.blake2b(scope.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of JSON values keyed by request text. `scope`
+    partitions entries (e.g. by task type and builder set): a lookup only
+    matches entries stored with the same scope, however similar the text.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        embedder: Embedder,
+        threshold: float = 0.92,
+        capacity: int = 10_000,
+        directory: str | None = None,
+    ):
+        self.name = name
+        self.embedder = embedder
+        self.threshold = threshold
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        shape = (capacity, embedder.dim)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            vectors_path = os.path.join(directory, f"{name}.npy")
+            self._vectors, fresh = self._open_vectors(vectors_path, shape)
+            self._conn = sqlite3.connect(os.path.join(directory, f"{name}.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            self._vectors, fresh = np.zeros(shape, dtype=np.float32), True
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, text TEXT NOT NULL, "
+            "value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        if fresh:
+            # New vector file (first run, or embedder/capacity changed): old entries are unusable
+            self._conn.execute("DELETE FROM entries")
+        self._conn.commit()
+
+        # Per-slot metadata mirrored in memory for vectorised search/eviction
+        self._used = np.zeros(capacity, dtype=bool)
+        self._scopes = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        for slot, scope, last_used in self._conn.execute("SELECT slot, scope, last_used FROM entries"):
+            if slot < capacity:
+                self._used[slot] = True
+                self._scopes[slot] = _scope_id(scope)
+                self._last_used[slot] = last_used
+        self._conn.execute("DELETE FROM entries WHERE slot >= ?", (capacity,))
+        self._conn.commit()
+        used = np.flatnonzero(self._used)
+        self._size = int(used[-1]) + 1 if used.size else 0
+
+    @staticmethod
+    def _open_vectors(path: str, shape: tuple[int, int]) -> tuple[np.ndarray, bool]:
+        """Memory-map the vector file, recreating it if missing or of another shape. Returns (vectors, created)."""
+        if os.path.exists(path):
+            try:
+                vectors = np.load(path, mmap_mode="r+")
+                if vectors.shape == shape and vectors.dtype == np.float32:
+                    return vectors, False
+            except ValueError:
+                pass
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape), True
+
+    @classmethod
+    def from_env(cls, name: str) -> "SemanticCache | None":
+        """
+        Build a cache from SEMANTIC_CACHE_* environment variables, or return
+        None when SEMANTIC_CACHE_ENABLED is false (the default).
+        """
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        embedder = create_embedder(
+            os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing"), int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+        )
+        return cls(
+            name,
+            embedder,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", "10000")),
+            directory=os.getenv("SEMANTIC_CACHE_DIR") or None,
+        )
+
+    async def get(self, text: str, scope: str = "") -> str | None:
+        """Value of the most similar stored request in `scope`, if similar enough."""
+        value = await asyncio.to_thread(self._get, text, scope)
+        metrics.cache_lookups.inc(namespace=f"semantic_{self.name}", result="miss" if value is None else "hit")
+        active = current_span()
+        if active is not None:
+            active.set("semantic_cache_hit", value is not None)
+        return value
+
+    def _get(self, text: str, scope: str) -> str | None:
+        query = self.embedder.embed([text])[0]
+        with self._lock:
+            slot = self._nearest(query, _scope_id(scope))
+            value = None
+            if slot is not None:
+                now = time.time()
+                self._last_used[slot] = now
+                row = self._conn.execute("SELECT value FROM entries WHERE slot = ?", (slot,)).fetchone()
+                self._conn.execute("UPDATE entries SET last_used = ? WHERE slot = ?", (now, slot))
+                self._conn.commit()
+                value = row[0] if row else None
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def _nearest(self, query: np.ndarray, scope: int) -> int | None:
+        # Slots fill lowest-first, so only the prefix up to the highest used slot is scanned
+        size = self._size
+        if size == 0:
+            return None
+        similarities = self._vectors[:size] @ query
+        similarities[~(self._used[:size] & (self._scopes[:size] == scope))] = -np.inf
+        best = int(np.argmax(similarities))
+        return best if similarities[best] >= self.threshold else None
+
+    async def set(self, text: str, value: str, scope: str = "") -> None:
+        """Store `value` for `text`, replacing a near-identical entry or evicting the LRU one when full."""
+        await asyncio.to_thread(self._set, text, value, scope)
+
+    def _set(self, text: str, value: str, scope: str) -> None:
+        vector = self.embedder.embed([text])[0]
+        scope_id = _scope_id(scope)
+        with self._lock:
+            slot = self._nearest(vector, scope_id)
+            if slot is None:
+                free = np.flatnonzero(~self._used)
+                slot = int(free[0]) if free.size else int(np.argmin(self._last_used))
+            now = time.time()
+            self._vectors[slot] = vector
+            self._used[slot] = True
+            self._scopes[slot] = scope_id
+            self._last_used[slot] = now
+            self._size = max(self._size, slot + 1)
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (slot, scope, text, value, last_used) VALUES (?, ?, ?, ?, ?)",
+                (slot, scope, text, value, now),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": int(self._used.sum()),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
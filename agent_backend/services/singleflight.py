@@ -0,0 +1,75 @@
+"""
+Single-flight request coalescing: concurrent callers asking for the same key
+share one in-flight computation and all receive its result (or exception).
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    task: asyncio.Task[T]
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Deduplicates concurrent async calls by key. The first caller (the leader)
+    starts the computation; callers arriving while it is in flight wait on the
+    same task. Once it finishes the key is forgotten, so later calls run afresh.
+    A caller being cancelled does not cancel the shared computation while
+    others still wait on it; when the last waiter leaves, it is cancelled.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: dict[str, _Flight[T]] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[T]], share: Callable[[T], T] | None = None
+    ) -> T:
+        """
+        Result of fn() for `key`. With `share`, followers get share(result)
+        (e.g. a copy) instead of the leader's object, so callers that mutate
+        their result do not see each other's changes.
+        """
+        flight = self._inflight.get(key)
+        leader = flight is None
+        if flight is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = _Flight(task)
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.followers += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the result any more
+                self._forget(key, flight.task)
+                flight.task.cancel()
+        return share(result) if share is not None and not leader else result
+
+    def _forget(self, key: str, task: asyncio.Task[T]) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved if every waiter went away.
+        if task.done() and not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,272 @@
+"""
+Lightweight tracing and metrics for the orchestration path.
+
+`span(name, **attributes)` times a stage (orchestrate, analyze, build, judge,
+upstream calls) and records its duration into a histogram labelled by stage
+and outcome. Code running inside a span can annotate it via current_span()
+(e.g. cache hits). Counters track upstream tokens, images, estimated cost,
+retries and cache lookups. Everything is kept in-process as plain
+cumulative-bucket histograms and counters and rendered in the Prometheus text
+format by GET /metrics; recording is a dict lookup and a bisect, cheap enough
+to leave on.
+
+When OTEL_ENABLED is true and opentelemetry-api is installed, each span is
+also started as an OpenTelemetry span (exported by whatever SDK/exporter the
+process is configured with, e.g. via opentelemetry-instrument).
+"""
+
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional
+    otel_trace = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+# USD per 1M tokens (chat) or per image; override/extend with MODEL_PRICES
+DEFAULT_PRICES: dict[str, dict[str, float]] = {
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {value:g}" for key, value in items]
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # per label set: [count per bucket (+Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound:g}"' if bound != "+Inf" else 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read():g}"]
+
+
+class Metrics:
+    """Process-wide metric registry."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+        self.prices = {**DEFAULT_PRICES, **json.loads(os.getenv("MODEL_PRICES", "{}"))}
+        self.stage_seconds = self.add(
+            Histogram("orchestrator_stage_seconds", "Duration of orchestration stages.", ("stage", "agent", "outcome"))
+        )
+        self.upstream_seconds = self.add(
+            Histogram("upstream_request_seconds", "Duration of upstream model calls.", ("endpoint", "model", "outcome"))
+        )
+        self.upstream_queue_seconds = self.add(
+            Histogram("upstream_queue_seconds", "Time upstream calls waited in the scheduler.", ("model", "priority"))
+        )
+        self.upstream_tokens = self.add(
+            Counter("upstream_tokens_total", "Tokens reported in response.usage.", ("model", "kind"))
+        )
+        self.upstream_request_tokens = self.add(
+            Histogram("upstream_request_tokens", "Total tokens per chat call.", ("model",), TOKEN_BUCKETS)
+        )
+        self.upstream_images = self.add(
+            Counter("upstream_images_total", "Images generated.", ("model", "size", "quality"))
+        )
+        self.upstream_cost = self.add(
+            Counter("upstream_cost_usd_total", "Estimated upstream spend from MODEL_PRICES.", ("model",))
+        )
+        self.upstream_retries = self.add(
+            Counter("upstream_retries_total", "Upstream calls retried after an error.", ("endpoint", "model"))
+        )
+        self.upstream_hedges = self.add(
+            Counter("upstream_hedges_total", "Hedged upstream calls, by which request won.", ("endpoint", "model", "winner"))
+        )
+        self.judge_outputs = self.add(
+            Counter("judge_outputs_total", "Outputs judged in tiered modes, by the tier that decided them.", ("mode", "tier"))
+        )
+        self.speculative_builds = self.add(
+            Counter("speculative_builds_total", "Speculative build rounds, by whether the analysis confirmed them.", ("outcome",))
+        )
+        self.persona_selected = self.add(
+            Counter("persona_selected_total", "Personas chosen to run, by selection reason.", ("persona", "reason"))
+        )
+        self.response_bytes = self.add(
+            Counter("response_bytes_total", "Encoded JSON response body bytes, by content encoding.", ("encoding",))
+        )
+        self.cache_lookups = self.add(
+            Counter("cache_lookups_total", "Response cache lookups.", ("namespace", "result"))
+        )
+
+    def add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> None:
+        self.add(Gauge(name, help, read))
+
+    def record_chat_usage(self, model: str, usage: Any) -> None:
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        self.upstream_tokens.inc(prompt, model=model, kind="prompt")
+        self.upstream_tokens.inc(completion, model=model, kind="completion")
+        self.upstream_request_tokens.observe(prompt + completion, model=model)
+        price = self.prices.get(model)
+        if price:
+            cost = (prompt * price.get("input", 0) + completion * price.get("output", 0)) / 1_000_000
+            self.upstream_cost.inc(cost, model=model)
+
+    def record_image(self, model: str, size: str, quality: str, count: int = 1) -> None:
+        self.upstream_images.inc(count, model=model, size=size, quality=quality)
+        price = self.prices.get(model, {}).get("image")
+        if price:
+            self.upstream_cost.inc(price * count, model=model)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+OTEL_ENABLED = otel_trace is not None and os.getenv("OTEL_ENABLED", "false").lower() in ("1", "true", "yes")
+_tracer = otel_trace.get_tracer("task-forge.agent_backend") if OTEL_ENABLED else None
+
+
+class Span:
+    """A timed stage. Attributes end up on the OpenTelemetry span when enabled."""
+
+    __slots__ = ("name", "attributes", "_otel")
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self._otel = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(
+    name: str, histogram: Histogram | None = None, **attributes: Any
+) -> Iterator[Span]:
+    """
+    Time a block. The duration goes to `histogram` (default: stage durations,
+    labelled with the span name as stage) with outcome ok, error or
+    cancelled. Cancellation (a deadline, a client disconnect, a losing hedge)
+    is not an error: the OpenTelemetry span is ended normally.
+    """
+    s = Span(name, {k: v for k, v in attributes.items() if v is not None})
+    token = _current.set(s)
+    otel_cm = _tracer.start_as_current_span(name, attributes=s.attributes) if _tracer is not None else None
+    if otel_cm is not None:
+        s._otel = otel_cm.__enter__()
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        yield s
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except BaseException as e:
+        outcome = "error"
+        if otel_cm is not None:
+            otel_cm.__exit__(type(e), e, e.__traceback__)
+            otel_cm = None
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current.reset(token)
+        if otel_cm is not None:
+            otel_cm.__exit__(None, None, None)
+        if histogram is None:
+            metrics.stage_seconds.observe(elapsed, stage=name, agent=s.attributes.get("agent", ""), outcome=outcome)
+        else:
+            histogram.observe(elapsed, outcome=outcome, **s.attributes)
@@ -0,0 +1,94 @@
+"""
+Downscaled judge images.
+
+The vision judge does not need the full 1024x1024 PNG. JudgeImagePreparer
+decodes a builder image once, downscales it (e.g. to 512px) and re-encodes it
+as JPEG/WebP, then caches the resulting data URI by source image so repeated
+and batched judgments reuse it. Requires Pillow; without it the original
+image is passed through unchanged.
+"""
+
+import asyncio
+import io
+from typing import Callable
+
+from constants import (
+    JUDGE_IMAGE_DETAIL,
+    JUDGE_IMAGE_FORMAT,
+    JUDGE_IMAGE_MAX_SIZE,
+    JUDGE_IMAGE_QUALITY,
+)
+from services.artifacts import to_data_uri
+from services.cache import MemoryCache
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; fall back to the original image
+    Image = None
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def make_thumbnail(data: bytes, max_size: int, fmt: str, quality: int) -> bytes:
+    """Downscale an encoded image so its longest side is at most max_size, then re-encode."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format=fmt, quality=quality, optimize=True)
+        return out.getvalue()
+
+
+class JudgeImagePreparer:
+    """Turns builder images into compact data URIs for the vision judge."""
+
+    def __init__(
+        self,
+        max_size: int = JUDGE_IMAGE_MAX_SIZE,
+        fmt: str = JUDGE_IMAGE_FORMAT,
+        quality: int = JUDGE_IMAGE_QUALITY,
+        detail: str = JUDGE_IMAGE_DETAIL,
+        cache_entries: int = 256,
+    ):
+        self.max_size = max_size
+        self.fmt = fmt.upper()
+        if self.fmt not in CONTENT_TYPES:
+            raise ValueError(f"JUDGE_IMAGE_FORMAT must be one of {sorted(CONTENT_TYPES)}, got {fmt!r}")
+        self.quality = quality
+        self.detail = detail
+        self._derivatives = MemoryCache(max_entries=cache_entries, ttl_seconds=24 * 3600)
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None and self.max_size > 0
+
+    def params(self) -> dict[str, object]:
+        """Settings that change what the judge sees (part of judge cache keys)."""
+        return {"max_size": self.max_size, "format": self.fmt, "quality": self.quality, "detail": self.detail}
+
+    async def prepare(
+        self, source_key: str, load: Callable[[], bytes], content_type: str = "image/png"
+    ) -> str:
+        """
+        Data URI for the judge. `source_key` identifies the source image (e.g. its
+        artifact ID); `load` returns its bytes and is only called on a cache miss.
+        """
+        key = f"{source_key}:{self.max_size}:{self.fmt}:{self.quality}"
+        cached = self._derivatives.get(key)
+        if cached is not None:
+            return cached
+        data_uri = await asyncio.to_thread(self._render, load, content_type)
+        self._derivatives.set(key, data_uri)
+        return data_uri
+
+    def _render(self, load: Callable[[], bytes], content_type: str) -> str:
+        data = load()
+        if not self.enabled:
+            return to_data_uri(data, content_type)
+        try:
+            thumb = make_thumbnail(data, self.max_size, self.fmt, self.quality)
+        except (OSError, ValueError):
+            # Undecodable image: let the judge see the original bytes
+            return to_data_uri(data, content_type)
+        return to_data_uri(thumb, CONTENT_TYPES[self.fmt])
@@ -0,0 +1,76 @@
+"""
+Shared fixtures. Every test runs against the in-process FakeOpenAI upstream
+with near-zero latency and small images; tests drive coroutines with
+asyncio.run (or the `api` fixture's loop), so no async pytest plugin is needed.
+"""
+
+import os
+import tempfile
+
+# main.py and constants.py read the environment at import time
+_STATE_DIR = tempfile.mkdtemp(prefix="agent-backend-tests-")
+os.environ.update(
+    {
+        "FAKE_OPENAI": "true",
+        "FAKE_OPENAI_LATENCY": "fixed",
+        "FAKE_OPENAI_CHAT_SECONDS": "0.01",
+        "FAKE_OPENAI_IMAGE_SECONDS": "0.01",
+        "FAKE_OPENAI_IMAGE_SIZE": "64",
+        "FAKE_OPENAI_CODE_BYTES": "2000",
+        "CACHE_ENABLED": "false",
+        "ARTIFACT_STORE": "inline",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "PERSONA_SELECTION": "all",
+        "SPECULATIVE_BUILDS": "false",
+        "JOB_WORKERS": "2",
+        "JOBS_DB_PATH": os.path.join(_STATE_DIR, "jobs.sqlite3"),
+    }
+)
+
+from typing import Any, Callable  # noqa: E402
+
+import pytest  # noqa: E402
+
+from agents.orchestrator_agent import OrchestratorAgent, create_orchestrator  # noqa: E402
+from services.fake_openai import FakeModelSettings, FakeOpenAI, LatencyModel  # noqa: E402
+from services.gateway import ModelGateway  # noqa: E402
+from services.scheduler import Scheduler  # noqa: E402
+
+
+def fast_settings(chat_seconds: float = 0.0, image_seconds: float = 0.0, **overrides: Any) -> FakeModelSettings:
+    """FakeOpenAI settings with fixed latencies and 64px images."""
+    return FakeModelSettings(
+        chat_latency=LatencyModel("fixed", chat_seconds),
+        image_latency=LatencyModel("fixed", image_seconds),
+        **{"image_size": 64, "code_bytes": 2000, **overrides},
+    )
+
+
+class StubOpenAI(FakeOpenAI):
+    """FakeOpenAI with a canned reply for every system prompt that contains one of `replies`' markers."""
+
+    def __init__(self, replies: dict[str, str], settings: FakeModelSettings | None = None):
+        super().__init__(settings or fast_settings())
+        self.replies = replies
+
+    def _reply(self, system: str, user: str, rng: Any) -> str:
+        for marker, reply in self.replies.items():
+            if marker in system:
+                return reply
+        return super()._reply(system, user, rng)
+
+
+@pytest.fixture
+def fake_client() -> FakeOpenAI:
+    return FakeOpenAI(fast_settings())
+
+
+@pytest.fixture
+def make_orchestrator() -> Callable[..., OrchestratorAgent]:
+    """Factory for an orchestrator whose gateway talks to `client` (a fresh fast FakeOpenAI by default)."""
+
+    def make(client: FakeOpenAI | None = None, **kwargs: Any) -> OrchestratorAgent:
+        gateway = ModelGateway(client or FakeOpenAI(fast_settings()), Scheduler())
+        return create_orchestrator(gateway, **kwargs)
+
+    return make
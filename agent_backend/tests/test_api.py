@@ -0,0 +1,166 @@
+"""End-to-end checks of the HTTP routes against the FakeOpenAI upstream (see conftest.py)."""
+
+import asyncio
+import contextlib
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import main
+from main import app
+
+
+@pytest.fixture(scope="module")
+def api():
+    """One event loop and lifespan (job workers) shared by the module's tests."""
+    loop = asyncio.new_event_loop()
+    stack = contextlib.AsyncExitStack()
+
+    async def start() -> httpx.AsyncClient:
+        await stack.enter_async_context(app.router.lifespan_context(app))
+        transport = httpx.ASGITransport(app=app)
+        return await stack.enter_async_context(
+            httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30)
+        )
+
+    client = loop.run_until_complete(start())
+    yield SimpleNamespace(client=client, run=loop.run_until_complete)
+    loop.run_until_complete(stack.aclose())
+    loop.close()
+
+
+def ndjson(response: httpx.Response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_orchestrate_returns_scored_outputs(api):
+    response = api.run(api.client.post("/orchestrate", json={"query": "Build a landing page for a bakery"}))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "complete"
+    assert len(body["items"]) == len(body["judgments"]) == 3
+    for item, judgment in zip(body["items"], body["judgments"]):
+        assert item["status"] == "ok"
+        assert "code" in item["extra"]
+        assert item["score"] == judgment["overall_score"]
+
+
+def test_orchestrate_pool_size_and_validation(api):
+    response = api.run(api.client.post("/orchestrate", json={"query": "A poster for a jazz night", "builders": 2}))
+    assert response.status_code == 200
+    assert [i["agent_name"] for i in response.json()["items"]] == ["BuilderAgent1", "BuilderAgent2"]
+    response = api.run(api.client.post("/orchestrate", json={"query": "x", "builders": 99}))
+    assert response.status_code == 422
+
+
+def test_orchestrate_field_projection_and_compression(api):
+    response = api.run(
+        api.client.post(
+            "/orchestrate?fields=judgments,items.agent_name,items.score",
+            json={"query": "Build a landing page for a bakery"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+    )
+    assert response.status_code == 200
+    assert response.headers["vary"] == "Accept-Encoding"
+    body = response.json()
+    assert set(body) == {"items", "judgments"}
+    assert all(set(item) == {"agent_name", "score"} for item in body["items"])
+
+    full = api.run(
+        api.client.post(
+            "/orchestrate", json={"query": "Build a landing page for a bakery"}, headers={"Accept-Encoding": "gzip"}
+        )
+    )
+    assert full.headers["content-encoding"] == "gzip"
+    assert full.json()["status"] == "complete"
+
+    response = api.run(api.client.post("/orchestrate?fields=items.nope", json={"query": "x"}))
+    assert response.status_code == 422
+
+
+def test_stream_emits_every_stage(api):
+    response = api.run(api.client.post("/orchestrate/stream", json={"query": "A poster for a jazz night"}))
+    events = ndjson(response)
+    kinds = [e["event"] for e in events]
+    assert kinds[0] == "query"
+    assert kinds[-1] == "summary"
+    assert kinds.count("output") == kinds.count("judgment") == 3
+    assert len(events[-1]["data"]["items"]) == 3
+
+
+def test_stream_chunks_rebuild_the_code(api):
+    response = api.run(
+        api.client.post("/orchestrate/stream?chunks=true", json={"query": "Build a todo app", "builders": 1})
+    )
+    events = ndjson(response)
+    chunks = "".join(e["delta"] for e in events if e["event"] == "chunk")
+    code = events[-1]["data"]["items"][0]["extra"]["code"]
+    assert chunks and chunks == code
+
+
+def test_batch_ends_each_query_with_a_summary(api):
+    queries = ["Build a todo app", "A poster for a jazz night", "Build a calculator app"]
+    response = api.run(api.client.post("/orchestrate/batch", json={"queries": queries, "builders": 2}))
+    events = ndjson(response)
+    summaries = {e["query_index"]: e for e in events if e["event"] == "summary"}
+    assert sorted(summaries) == [0, 1, 2]
+    assert all(len(s["data"]["items"]) == 2 for s in summaries.values())
+
+
+@pytest.mark.parametrize("path, method", [("/orchestrate/stream", "stream"), ("/orchestrate/batch", "run_batch")])
+def test_streams_name_errors_without_a_message(api, monkeypatch, path, method):
+    async def stage_deadline(*args, **kwargs):
+        raise asyncio.TimeoutError()
+        yield
+
+    monkeypatch.setattr(main.get_orchestrator(), method, stage_deadline)
+    body = {"query": "A poster"} if method == "stream" else {"queries": ["A poster"]}
+    events = ndjson(api.run(api.client.post(path, json=body)))
+    assert events == [{**events[0], "event": "error", "detail": "TimeoutError"}]
+
+
+def test_jobs_run_to_completion(api):
+    async def submit_and_poll() -> dict:
+        created = await api.client.post("/jobs", json={"query": "Build a todo app", "builders": 2})
+        assert created.status_code == 202
+        job_id = created.json()["id"]
+        for _ in range(200):
+            job = (await api.client.get(f"/jobs/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            await asyncio.sleep(0.05)
+        raise AssertionError("job did not finish")
+
+    job = api.run(submit_and_poll())
+    assert job["status"] == "succeeded"
+    assert job["progress"]["stage"] == "done"
+    assert job["progress"]["judgments_done"] == 2
+    assert len(job["result"]["items"]) == 2
+    assert api.run(api.client.get("/jobs/unknown")).status_code == 404
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/cache/stats",
+        "/coalescing/stats",
+        "/speculation/stats",
+        "/personas/stats",
+        "/scheduler/stats",
+        "/pool/stats",
+    ],
+)
+def test_stats_routes(api, path):
+    response = api.run(api.client.get(path))
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
+
+
+def test_metrics_exposes_stage_histograms(api):
+    api.run(api.client.post("/orchestrate", json={"query": "Build a todo app", "builders": 1}))
+    text = api.run(api.client.get("/metrics")).text
+    assert "orchestrator_stage_seconds_bucket" in text
+    assert "upstream_request_seconds_count" in text
@@ -0,0 +1,27 @@
+from services.artifacts import LocalArtifactStore, artifact_id_for
+
+
+def test_from_env_defaults_to_a_local_store_with_relative_urls(monkeypatch, tmp_path):
+    monkeypatch.delenv("ARTIFACT_STORE", raising=False)
+    monkeypatch.delenv("ARTIFACT_BASE_URL", raising=False)
+    monkeypatch.setenv("ARTIFACT_DIR", str(tmp_path))
+    store = LocalArtifactStore.from_env()
+    artifact_id = store.put(b"\x89PNG", "image/png")
+    assert store.url(artifact_id) == f"/artifacts/{artifact_id}"
+
+
+def test_from_env_serves_absolute_urls_with_a_base_url(monkeypatch, tmp_path):
+    monkeypatch.delenv("ARTIFACT_STORE", raising=False)
+    monkeypatch.setenv("ARTIFACT_BASE_URL", "http://agents:8001/")
+    monkeypatch.setenv("ARTIFACT_DIR", str(tmp_path))
+    store = LocalArtifactStore.from_env()
+    artifact_id = store.put(b"\x89PNG", "image/png")
+    assert artifact_id == artifact_id_for(b"\x89PNG", "image/png")
+    assert store.url(artifact_id) == f"http://agents:8001/artifacts/{artifact_id}"
+    assert store.get(artifact_id) == b"\x89PNG"
+
+
+def test_inline_wins_over_a_base_url(monkeypatch):
+    monkeypatch.setenv("ARTIFACT_STORE", "inline")
+    monkeypatch.setenv("ARTIFACT_BASE_URL", "http://agents:8001")
+    assert LocalArtifactStore.from_env() is None
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import json
+
+from agents.orchestrator_agent import create_orchestrator
+from bulk import run_bulk
+from services.batch import BatchGateway, BatchRequestError, LocalBatchBackend, read_jsonl
+from services.fake_openai import FakeOpenAI
+from services.scheduler import Priority
+
+from conftest import fast_settings
+
+
+def test_bulk_orchestration_runs_in_waves_per_stage_and_endpoint(tmp_path):
+    client = FakeOpenAI(fast_settings())
+    gateway = BatchGateway(LocalBatchBackend(client), tmp_path, settle=0.05)
+    orchestrator = create_orchestrator(gateway)
+    queries = ["Build a todo app", "A poster for a jazz night", "Build a calculator app"]
+
+    results = asyncio.run(gateway.drive(orchestrator.run(q, 2) for q in queries))
+
+    assert all(r.status == "complete" and len(r.items) == 2 for r in results)
+    files = sorted(p.name for p in tmp_path.glob("*.jsonl") if not p.name.endswith(".results.jsonl"))
+    stages = [name.split("-", 1)[1] for name in files]
+    # Every query is analyzed in the first wave, and each file holds one stage and endpoint
+    assert files[0] == "001-analyzer-chat.jsonl"
+    assert len(read_jsonl(tmp_path / files[0])) == len(queries)
+    assert "builder-images.jsonl" in stages and "builder-chat.jsonl" in stages
+    assert stages[-1] == "judge-chat.jsonl"
+    for name in files:
+        urls = {row["url"] for row in read_jsonl(tmp_path / name)}
+        assert urls == {"/v1/images/generations" if "images" in name else "/v1/chat/completions"}
+    assert gateway.requests_written == sum(len(read_jsonl(tmp_path / n)) for n in files)
+    assert client.calls["/v1/chat/completions"] + client.calls["/v1/images/generations"] == gateway.requests_written
+
+
+def test_failed_lines_fail_only_their_calls(tmp_path):
+    gateway = BatchGateway(LocalBatchBackend(FakeOpenAI(fast_settings(error_rate=1.0))), tmp_path, settle=0.01)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def call():
+        return await gateway.chat(priority=Priority.ANALYZER, model="gpt-4o-mini", messages=messages)
+
+    results = asyncio.run(gateway.drive([call(), call()]))
+    assert all(isinstance(r, BatchRequestError) for r in results)
+    rows = read_jsonl(tmp_path / "001-analyzer-chat.results.jsonl")
+    assert all(row["error"] and row["response"] is None for row in rows)
+
+
+def test_cancelled_callers_are_skipped_when_results_arrive(tmp_path):
+    gateway = BatchGateway(LocalBatchBackend(FakeOpenAI(fast_settings(chat_seconds=0.05))), tmp_path, settle=0.01)
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def scenario():
+        calls = [
+            asyncio.create_task(gateway.chat(priority=Priority.ANALYZER, model="gpt-4o-mini", messages=messages))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        flush = asyncio.create_task(gateway.flush())
+        await asyncio.sleep(0.01)
+        calls[0].cancel()
+        await flush  # must not raise InvalidStateError for the cancelled call
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    cancelled, answered = asyncio.run(scenario())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert answered.choices[0].message.content
+
+
+def test_bulk_orchestrators_have_no_stage_deadlines(tmp_path):
+    gateway = BatchGateway(LocalBatchBackend(FakeOpenAI(fast_settings())), tmp_path)
+    orchestrator = create_orchestrator(gateway, deadlines=False)
+    assert orchestrator.analyze_deadline is orchestrator.build_deadline is orchestrator.judge_deadline is None
+
+
+def test_bulk_runs_against_the_fake_upstream_without_an_api_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    queries = tmp_path / "queries.txt"
+    queries.write_text("Build a todo app\nA poster for a jazz night\n", encoding="utf-8")
+    args = argparse.Namespace(
+        queries=queries,
+        output=tmp_path / "results.jsonl",
+        work_dir=tmp_path / "batches",
+        backend="local",
+        builders=1,
+        settle=0.05,
+        poll_interval=1.0,
+    )
+
+    assert asyncio.run(run_bulk(args)) == 0
+    lines = [json.loads(line) for line in args.output.read_text(encoding="utf-8").splitlines()]
+    assert [line["query"] for line in lines] == ["Build a todo app", "A poster for a jazz night"]
+    assert all(line["result"]["status"] == "complete" for line in lines)
+    # FakeOpenAI has no files/batches endpoints
+    assert asyncio.run(run_bulk(argparse.Namespace(**{**vars(args), "backend": "openai"}))) == 2
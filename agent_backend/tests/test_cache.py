@@ -0,0 +1,115 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from services.cache import MemoryCache, ResponseCache, SQLiteCache, cache_key
+
+
+def committed_rows(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def test_cache_key_ignores_whitespace_and_case():
+    a = cache_key(model="m", system_prompt="s ", user_content="Build  a Todo app")
+    b = cache_key(model="m", system_prompt="s", user_content="build a todo app")
+    assert a == b
+    assert a != cache_key(model="m", system_prompt="s", user_content="build a todo app", size="512")
+
+
+def test_sqlite_writes_are_committed_in_batches(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    disk = SQLiteCache(str(path), commit_every=3, commit_interval=60)
+    disk.set("a", "1")
+    disk.set("b", "2")
+    # Visible on the writer's connection, not yet to other readers
+    assert disk.get("a") == "1"
+    assert committed_rows(path) == 0
+    disk.set("c", "3")
+    assert committed_rows(path) == 3
+    disk.set("d", "4")
+    disk.close()
+    assert committed_rows(path) == 4
+
+
+def test_sqlite_commits_after_the_interval_without_another_write(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    disk = SQLiteCache(str(path), commit_every=1000, commit_interval=0.05)
+    disk.set("a", "1")
+    assert committed_rows(path) == 0
+    for _ in range(100):
+        if committed_rows(path) == 1:
+            break
+        time.sleep(0.01)
+    assert committed_rows(path) == 1
+    # The write lock was released, so a second cache on the same file can write
+    other = SQLiteCache(str(path), commit_every=1, commit_interval=60)
+    other.set("b", "2")
+    assert committed_rows(path) == 2
+    other.close()
+    disk.close()
+
+
+def test_a_failing_disk_tier_is_a_cache_miss():
+    class BrokenDisk:
+        def get(self, key: str) -> str | None:
+            raise sqlite3.OperationalError("database is locked")
+
+        def set(self, key: str, value: str) -> None:
+            raise sqlite3.OperationalError("database is locked")
+
+    cache = ResponseCache(MemoryCache(), BrokenDisk())
+
+    async def scenario() -> list[str | None]:
+        await cache.set("k", "v")
+        found = [await cache.get("k")]
+        cache.memory = MemoryCache()
+        found.append(await cache.get("k"))
+        return found
+
+    assert asyncio.run(scenario()) == ["v", None]
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_sqlite_entries_are_dropped(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=-1)
+    disk.set("a", "1")
+    assert disk.get("a") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", "1")
+    memory.set("b", "2")
+    memory.get("a")
+    memory.set("c", "3")
+    assert memory.get("b") is None
+    assert memory.get("a") == "1"
+
+
+def test_response_cache_reads_disk_off_the_loop_and_promotes_hits(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    threads = []
+    original_get = disk.get
+
+    def get(key: str) -> str | None:
+        threads.append(threading.current_thread())
+        return original_get(key)
+
+    disk.get = get
+    cache = ResponseCache(MemoryCache(), disk)
+
+    async def scenario() -> list[str | None]:
+        await cache.set("k", "v")
+        cache.memory = MemoryCache()  # as after a restart: only the disk tier has it
+        found = [await cache.get("k", namespace="judge"), await cache.get("k", namespace="judge")]
+        found.append(await cache.get("missing", namespace="judge"))
+        await cache.close()
+        return found
+
+    assert asyncio.run(scenario()) == ["v", "v", None]
+    # The second hit came from the promoted memory entry; the miss went to disk again
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+    assert cache.stats()["namespaces"]["judge"] == {"hits": 2, "misses": 1}
@@ -0,0 +1,28 @@
+from services.code_checks import check_html
+
+PAGE = '<!DOCTYPE html>\n<html lang="en"><head><title>Counter</title></head>\n<body>{}</body></html>'
+
+
+def test_empty_and_tiny_outputs_are_fatal():
+    empty = check_html("```html\n```")
+    assert empty.fatal and empty.fatal_reason == "Empty code output"
+    tiny = check_html("<p>hi</p>")
+    assert tiny.fatal and tiny.fatal_reason == "Code output is only 9 bytes"
+    prose = check_html("Sorry, I cannot build that app for you right now, but here is an idea.")
+    assert prose.fatal and prose.fatal_reason == "Output contains no HTML elements"
+
+
+def test_a_clean_page_has_no_findings():
+    report = check_html(PAGE.format('<button type="button">Add</button><script>let n = 0;</script>'))
+    assert not report.fatal
+    assert report.parse_errors == [] and report.accessibility_issues == []
+    assert report.has_doctype and report.inline_scripts == 1
+    assert report.inline_script_bytes == len("let n = 0;")
+    assert report.line_count == 3
+
+
+def test_unclosed_tags_and_scripts_are_reported():
+    report = check_html(PAGE.format("<div><span>0</div><img src='x.png'><button></button><script>let n = 0;"))
+    assert not report.fatal
+    assert report.parse_errors == ["<span> not closed before </div>", "<script> never closed"]
+    assert report.accessibility_issues == ["img without alt text", "button without accessible text"]
@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import json
+
+import openai
+import pytest
+
+from query_analyzer import QueryAnalyzer, StructuredQuery
+from services.fake_openai import FakeOpenAI
+from services.gateway import ModelGateway
+from services.scheduler import Priority
+
+from conftest import fast_settings
+
+ANALYZER = [
+    {"role": "system", "content": QueryAnalyzer.SYSTEM_PROMPT},
+    {"role": "user", "content": "Build a todo app"},
+]
+
+
+def test_analyzer_reply_is_a_structured_query(fake_client):
+    response = asyncio.run(fake_client.chat.completions.create(model="gpt-4o-mini", messages=ANALYZER))
+    parsed = StructuredQuery.model_validate_json(response.choices[0].message.content)
+    assert parsed.task_type == "code"
+    assert parsed.raw_query == "Build a todo app"
+    assert response.usage.total_tokens > 0
+
+
+def test_replies_are_deterministic_per_request_and_repeat():
+    async def two_calls(client: FakeOpenAI) -> list[str]:
+        messages = [{"role": "system", "content": "You are a critic."}, {"role": "user", "content": "rate"}]
+        replies = []
+        for _ in range(2):
+            response = await client.chat.completions.create(model="m", messages=messages)
+            replies.append(response.choices[0].message.content)
+        return replies
+
+    first = asyncio.run(two_calls(FakeOpenAI(fast_settings())))
+    second = asyncio.run(two_calls(FakeOpenAI(fast_settings())))
+    assert first == second
+    # The repeat of a request is a new draw, not a replay
+    assert first[0] != first[1]
+
+
+def test_error_rate_raises_retryable_openai_errors():
+    client = FakeOpenAI(fast_settings(error_rate=1.0))
+    for _ in range(5):
+        with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+            asyncio.run(client.chat.completions.create(model="m", messages=ANALYZER))
+    assert client.errors == 5
+    assert client.calls["/v1/chat/completions"] == 5
+
+
+def test_images_are_png_of_the_configured_size(fake_client):
+    response = asyncio.run(fake_client.images.generate(model="gpt-image-1", prompt="a cat"))
+    png = base64.b64decode(response.data[0].b64_json)
+    assert png.startswith(b"\x89PNG")
+    width, height = int.from_bytes(png[16:20], "big"), int.from_bytes(png[20:24], "big")
+    assert (width, height) == (64, 64)
+
+
+def test_streamed_chat_through_the_gateway_matches_the_whole_reply():
+    messages = [{"role": "system", "content": "You are a senior front-end developer."}, {"role": "user", "content": "x"}]
+
+    async def collect() -> tuple[str, str]:
+        gateway = ModelGateway(FakeOpenAI(fast_settings()))
+        chunks = [c async for c in gateway.chat_stream(priority=Priority.BUILDER, model="m", messages=messages)]
+        # A second client with the same seed draws the same reply for its first call
+        whole = await FakeOpenAI(fast_settings()).chat.completions.create(
+            model="m", messages=messages, stream_options={"include_usage": True}
+        )
+        return "".join(chunks), whole.choices[0].message.content
+
+    streamed, whole = asyncio.run(collect())
+    assert len(streamed) > 64
+    assert streamed == whole
+
+
+def test_batched_analysis_reply_covers_every_query(fake_client):
+    numbered = "Query 0:\nBuild a todo app\n\nQuery 1:\nA poster for a jazz night"
+    messages = [{"role": "system", "content": QueryAnalyzer.BATCH_SYSTEM_PROMPT}, {"role": "user", "content": numbered}]
+    response = asyncio.run(fake_client.chat.completions.create(model="m", messages=messages))
+    queries = json.loads(response.choices[0].message.content)["queries"]
+    assert [(q["index"], q["task_type"]) for q in queries] == [(0, "code"), (1, "image")]
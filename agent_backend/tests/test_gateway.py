@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from services.fake_openai import FakeOpenAI
+from services.gateway import ModelGateway
+from services.resilience import ResilienceSettings
+from services.scheduler import Priority, Scheduler
+
+from conftest import fast_settings
+
+MESSAGES = [{"role": "system", "content": "You are a critic."}, {"role": "user", "content": "rate"}]
+
+
+def settings(**overrides) -> ResilienceSettings:
+    return ResilienceSettings(**{"backoff_base": 0.001, "backoff_max": 0.001, **overrides})
+
+
+def test_retryable_errors_are_retried_until_the_limit():
+    client = FakeOpenAI(fast_settings(error_rate=1.0))
+    gateway = ModelGateway(client, Scheduler(), settings(max_retries=2))
+    with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+        asyncio.run(gateway.chat(priority=Priority.JUDGE, model="gpt-4o-mini", messages=MESSAGES))
+    assert client.calls["/v1/chat/completions"] == 3
+
+
+def test_a_transient_error_is_recovered():
+    client = FakeOpenAI(fast_settings())
+    create = client.chat.completions.create
+    failures = iter([True, True])
+
+    async def flaky(**kwargs):
+        if next(failures, False):
+            return await FakeOpenAI(fast_settings(error_rate=1.0)).chat.completions.create(**kwargs)
+        return await create(**kwargs)
+
+    client.chat.completions.create = flaky
+    gateway = ModelGateway(client, Scheduler(), settings(max_retries=2))
+    response = asyncio.run(gateway.chat(priority=Priority.JUDGE, model="gpt-4o-mini", messages=MESSAGES))
+    assert response.choices[0].message.content
+
+
+def test_other_errors_are_not_retried():
+    calls = []
+
+    async def broken() -> None:
+        calls.append(1)
+        raise ValueError("bad request body")
+
+    gateway = ModelGateway(FakeOpenAI(fast_settings()), Scheduler(), settings(max_retries=3))
+    with pytest.raises(ValueError):
+        asyncio.run(gateway._call("chat", "gpt-4o-mini", Priority.JUDGE, broken))
+    assert len(calls) == 1
+
+
+def test_a_slow_call_is_hedged_and_the_fast_copy_wins():
+    resilience = settings(hedge_min_samples=5, hedge_min_delay=0.01)
+    for _ in range(5):
+        resilience.tracker.record("chat", "gpt-4o-mini", 0.01)
+    started = []
+
+    async def create() -> str:
+        started.append(time.monotonic())
+        if len(started) == 1:
+            await asyncio.sleep(5)  # the primary stalls
+            return "primary"
+        return "hedge"
+
+    gateway = ModelGateway(FakeOpenAI(fast_settings()), Scheduler(), resilience)
+    start = time.monotonic()
+    assert asyncio.run(gateway._call("chat", "gpt-4o-mini", Priority.JUDGE, create)) == "hedge"
+    assert time.monotonic() - start < 1
+    assert len(started) == 2
+
+
+def test_calls_are_not_hedged_without_latency_history_or_when_disabled():
+    resilience = settings(hedge_endpoints=frozenset({"images"}), hedge_min_samples=5)
+    for _ in range(5):
+        resilience.tracker.record("chat", "gpt-4o-mini", 0.01)
+    assert resilience.hedge_delay("chat", "gpt-4o-mini") is None
+    assert resilience.hedge_delay("images", "gpt-image-1") is None
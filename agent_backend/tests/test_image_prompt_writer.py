@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from agents.image_prompt_writer import ImagePromptWriter
+from agents.persona_builder import load_personas
+from models.persona import Persona
+from query_analyzer import StructuredQuery
+from services.cache import MemoryCache, ResponseCache
+from services.fake_openai import FakeOpenAI
+from services.gateway import ModelGateway
+from services.scheduler import Scheduler
+
+from conftest import StubOpenAI, fast_settings
+
+CHAT = "/v1/chat/completions"
+QUERY = StructuredQuery(intent="poster", task_type="image", requirements=["jazz", "night"], raw_query="A jazz poster")
+
+
+def persona(name: str, template: str = "") -> Persona:
+    return Persona(
+        agent_name=name,
+        persona=f"The {name}",
+        system_prompt_image=f"You are {name}.",
+        image_prompt_template=template,
+        system_prompt_code=f"You are {name}.",
+    )
+
+
+def make_writer(client: FakeOpenAI, mode: str, **kwargs) -> ImagePromptWriter:
+    return ImagePromptWriter(ModelGateway(client, Scheduler()), mode, **kwargs)
+
+
+def test_template_mode_renders_locally():
+    client = FakeOpenAI(fast_settings())
+    personas = [persona("a", "{raw_query} with {requirements}; {constraints}"), persona("b")]
+    writer = make_writer(client, "template", personas=personas)
+
+    prompts = asyncio.run(writer.write(personas, QUERY))
+
+    assert prompts == {
+        "a": "A jazz poster with jazz; night; none specified",
+        "b": "The b design for: A jazz poster",
+    }
+    assert client.calls[CHAT] == 0
+
+
+def test_batched_mode_writes_every_prompt_in_one_cached_call():
+    client = FakeOpenAI(fast_settings())
+    personas = [persona("a"), persona("b")]
+    writer = make_writer(client, "batched", cache=ResponseCache(MemoryCache()), personas=personas)
+
+    async def scenario() -> list[dict[str, str]]:
+        return [await writer.write(personas, QUERY), await writer.write(personas, QUERY)]
+
+    first, second = asyncio.run(scenario())
+
+    assert set(first) == {"a", "b"}
+    assert all(prompt.startswith(name) for name, prompt in first.items())
+    assert second == first
+    assert client.calls[CHAT] == 1
+
+
+def test_batched_mode_falls_back_to_templates_for_missing_personas():
+    client = StubOpenAI({"several designers": json.dumps({"prompts": {"a": "  A moody jazz poster  "}})})
+    personas = [persona("a"), persona("b", "Loud {intent} for {raw_query}")]
+    cache = ResponseCache(MemoryCache())
+    writer = make_writer(client, "batched", cache=cache, personas=personas)
+
+    prompts = asyncio.run(writer.write(personas, QUERY))
+
+    assert prompts == {"a": "A moody jazz poster", "b": "Loud poster for A jazz poster"}
+    # An incomplete reply is not cached
+    assert len(cache.memory) == 0
+
+
+@pytest.mark.parametrize(
+    "template, error",
+    [("Design for {raw_qeury}", "{raw_qeury}"), ("Design for {}", "{}"), ("Design for {raw_query", "malformed")],
+)
+def test_bad_templates_fail_when_the_writer_is_built(template, error):
+    with pytest.raises(ValueError, match=error):
+        make_writer(FakeOpenAI(fast_settings()), "template", personas=[persona("a", template)])
+
+
+def test_shipped_persona_templates_are_valid():
+    make_writer(FakeOpenAI(fast_settings()), "template", personas=load_personas())
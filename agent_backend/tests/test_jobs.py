@@ -0,0 +1,192 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from services.jobs import JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_a_leased_job_is_not_claimed_twice(store):
+    job = store.create("Build a todo app")
+    claimed = store.claim_next("worker-a", lease_seconds=60)
+    assert claimed.id == job.id
+    assert claimed.status == "running" and claimed.attempts == 1
+    assert store.claim_next("worker-b", lease_seconds=60) is None
+    assert store.renew(job.id, "worker-a", 60)
+    assert not store.renew(job.id, "worker-b", 60)
+
+
+def test_an_expired_lease_is_taken_over(store):
+    job = store.create("Build a todo app")
+    store.claim_next("crashed", lease_seconds=0.01)
+    time.sleep(0.02)
+    claimed = store.claim_next("worker-b", lease_seconds=60)
+    assert claimed.id == job.id and claimed.attempts == 2
+    # The previous owner can no longer write progress or results
+    assert not store.fail(job.id, "crashed", "late", retry_after=None)
+    assert store.get(job.id).status == "running"
+
+
+def test_an_expired_last_attempt_fails(store):
+    job = store.create("Build a todo app")
+    store.claim_next("crashed", lease_seconds=0.01, max_attempts=1)
+    time.sleep(0.02)
+    assert store.claim_next("worker-b", lease_seconds=60, max_attempts=1) is None
+    assert store.get(job.id).status == "failed"
+
+
+def test_retries_wait_for_their_backoff(store):
+    job = store.create("Build a todo app")
+    store.claim_next("worker-a", lease_seconds=60)
+    assert store.fail(job.id, "worker-a", "boom", retry_after=0.05)
+    failed = store.get(job.id)
+    assert failed.status == "queued" and failed.error == "boom"
+    assert store.claim_next("worker-a", lease_seconds=60) is None
+    time.sleep(0.06)
+    assert store.claim_next("worker-a", lease_seconds=60).attempts == 2
+
+
+def test_release_requeues_without_charging_an_attempt(store):
+    job = store.create("Build a todo app")
+    store.claim_next("worker-a", lease_seconds=60)
+    assert store.release("worker-b") == 0
+    assert store.release("worker-a") == 1
+    released = store.get(job.id)
+    assert released.status == "queued" and released.attempts == 0
+
+
+def test_retry_delay_doubles_up_to_the_cap(store):
+    queue = JobQueue(store, lambda: None, retry_backoff=2, retry_backoff_max=10)
+    assert [queue.retry_delay(n) for n in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+
+class FailingOrchestrator:
+    """Fails every run; select_builders mimics OrchestratorAgent's."""
+
+    def __init__(self):
+        self.runs = 0
+
+    def select_builders(self, count):
+        return [object()] * (count or 3)
+
+    async def stream(self, query, builders):
+        self.runs += 1
+        raise RuntimeError("upstream down")
+        yield  # pragma: no cover
+
+
+def test_queue_retries_with_backoff_then_fails(store):
+    orchestrator = FailingOrchestrator()
+    queue = JobQueue(
+        store, lambda: orchestrator, workers=1, max_attempts=2, poll_interval=0.01, retry_backoff=0.05
+    )
+
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("Build a todo app")
+        for _ in range(200):
+            current = await queue.get(job.id)
+            if current.status == "failed":
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return current
+
+    job = asyncio.run(scenario())
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.error == "upstream down"
+    assert orchestrator.runs == 2
+
+
+def test_heartbeat_keeps_a_long_job_leased(store, make_orchestrator):
+    class Slow:
+        def __init__(self, inner):
+            self.inner = inner
+
+        def select_builders(self, count):
+            return self.inner.select_builders(count)
+
+        async def stream(self, query, builders):
+            await asyncio.sleep(0.3)
+            async for event in self.inner.stream(query, builders):
+                yield event
+
+    orchestrator = Slow(make_orchestrator())
+    queue = JobQueue(store, lambda: orchestrator, workers=1, poll_interval=0.01, lease_seconds=0.1)
+    other = JobStore(store.path)
+
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("Build a todo app", builders=1)
+        stolen = []
+        for _ in range(500):
+            current = await queue.get(job.id)
+            if current.status == "succeeded":
+                break
+            stolen.append(await asyncio.to_thread(other.claim_next, "thief", 60))
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return current, stolen
+
+    job, stolen = asyncio.run(scenario())
+    assert job.status == "succeeded"
+    assert job.attempts == 1
+    assert stolen and not any(stolen)
+
+
+def test_a_store_error_does_not_stop_the_worker(store, make_orchestrator):
+    class FlakyStore(JobStore):
+        failures = 1
+
+        def claim_next(self, *args, **kwargs):
+            if self.failures:
+                self.failures -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return super().claim_next(*args, **kwargs)
+
+    flaky = FlakyStore(store.path)
+    orchestrator = make_orchestrator()
+    queue = JobQueue(flaky, lambda: orchestrator, workers=1, poll_interval=0.01)
+
+    async def scenario():
+        await queue.start()
+        job = await queue.submit("Build a todo app", builders=1)
+        for _ in range(500):
+            current = await queue.get(job.id)
+            if current.status == "succeeded":
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return current
+
+    job = asyncio.run(scenario())
+    assert flaky.failures == 0
+    assert job.status == "succeeded"
+
+
+def test_an_unrecordable_failure_does_not_stop_the_worker(store):
+    class BrokenFail(JobStore):
+        def fail(self, *args, **kwargs):
+            raise sqlite3.OperationalError("database is locked")
+
+    orchestrator = FailingOrchestrator()
+    queue = JobQueue(BrokenFail(store.path), lambda: orchestrator, workers=1, poll_interval=0.01)
+
+    async def scenario():
+        await queue.start()
+        await queue.submit("Build a todo app")
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+        alive = all(not t.done() for t in queue._tasks)
+        await queue.stop()
+        return alive
+
+    assert asyncio.run(scenario())
+    assert orchestrator.runs == 1
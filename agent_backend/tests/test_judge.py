@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from agents import judge_agent
+from agents.judge_agent import JudgeAgent
+from models.agent_output import AgentOutput
+from models.judgment import JUDGE_CRITERIA
+from services.cache import MemoryCache, ResponseCache
+from services.fake_openai import FakeOpenAI, fake_png_base64
+from services.gateway import ModelGateway
+from services.scheduler import Scheduler
+
+from conftest import StubOpenAI, fast_settings
+
+CHAT = "/v1/chat/completions"
+
+
+def image_output(name: str, seed: int, **kwargs) -> AgentOutput:
+    return AgentOutput(image=fake_png_base64(64, 1.0, seed), agent_name=name, persona=f"{name} style", **kwargs)
+
+
+def make_judge(client: FakeOpenAI, **kwargs) -> JudgeAgent:
+    return JudgeAgent(ModelGateway(client, Scheduler()), **kwargs)
+
+
+def quick_reply(scores: dict[int, int]) -> str:
+    return json.dumps({"scores": [{"index": i, **{c: s for c in JUDGE_CRITERIA}} for i, s in scores.items()]})
+
+
+def batch_entry(name: str, score: int) -> dict:
+    ratings = [{"criterion": c, "score": score, "rationale": "Canned."} for c in JUDGE_CRITERIA]
+    return {"agent_name": name, "persona": "p", "criteria_ratings": ratings, "overall_score": score, "summary": "s"}
+
+
+def test_batch_judges_every_output_in_one_request():
+    client = FakeOpenAI(fast_settings())
+    judge = make_judge(client, mode="batch")
+    outputs = [image_output(name, seed) for seed, name in enumerate("abc", start=1)]
+
+    judgments = asyncio.run(judge.judge_all(outputs, "A poster"))
+
+    assert [j.agent_name for j in judgments] == ["a", "b", "c"]
+    assert [j.persona for j in judgments] == ["a style", "b style", "c style"]
+    assert client.calls[CHAT] == 1
+
+
+def test_batch_reorders_judgments_by_agent_name():
+    reply = json.dumps({"judgments": [batch_entry("b", 4), batch_entry("a", 2)]})
+    client = StubOpenAI({"several builder agents": reply})
+    judge = make_judge(client, mode="batch")
+
+    judgments = asyncio.run(judge.judge_all([image_output("a", 1), image_output("b", 2)], "A poster"))
+
+    assert [(j.agent_name, j.overall_score) for j in judgments] == [("a", 2.0), ("b", 4.0)]
+    assert client.calls[CHAT] == 1
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [json.dumps({"judgments": [batch_entry("a", 2)]}), "{not json"],
+    ids=["count-mismatch", "invalid-json"],
+)
+def test_batch_falls_back_to_judging_each_output(reply):
+    client = StubOpenAI({"several builder agents": reply})
+    judge = make_judge(client, mode="batch")
+    outputs = [image_output("a", 1), image_output("b", 2)]
+
+    judgments = asyncio.run(judge.judge_all(outputs, "A poster"))
+
+    assert [j.agent_name for j in judgments] == ["a", "b"]
+    assert all(j.summary == "Simulated judgment." for j in judgments)
+    # The rejected batch request, then one request per output
+    assert client.calls[CHAT] == 3
+
+
+def test_tiered_rejects_and_copies_duplicates_without_model_calls():
+    client = FakeOpenAI(fast_settings())
+    judge = make_judge(client, mode="tiered")
+    outputs = [
+        image_output("a", 1),
+        image_output("b", 2, status="error"),
+        image_output("c", 1),
+        image_output("d", 3),
+    ]
+
+    judgments = asyncio.run(judge.judge_all(outputs, "A poster"))
+
+    assert [j.agent_name for j in judgments] == ["a", "b", "c", "d"]
+    assert [j.tier for j in judgments] == ["full", "local", "local", "full"]
+    assert judgments[1].overall_score == 1.0
+    duplicate = {r.criterion: r.score for r in judgments[2].criteria_ratings}
+    original = {r.criterion: r.score for r in judgments[0].criteria_ratings}
+    assert duplicate == {**original, "creativity": 1}
+    assert "Near-duplicate of a" in judgments[2].summary
+    # Only the two distinct, working outputs reached the model
+    assert client.calls[CHAT] == 2
+
+
+def test_top_k_fully_judges_only_the_best_quick_scores():
+    client = StubOpenAI({"screening several candidate": quick_reply({1: 2, 2: 5, 3: 3, 4: 4})})
+    judge = make_judge(client, mode="top_k", top_k=2)
+    outputs = [image_output(name, seed) for seed, name in enumerate("abcd", start=1)]
+
+    judgments = asyncio.run(judge.judge_all(outputs, "A poster"))
+
+    assert [j.tier for j in judgments] == ["quick", "full", "quick", "full"]
+    assert [judgments[0].overall_score, judgments[2].overall_score] == [2.0, 3.0]
+    # One screening request plus one full judgment per finalist
+    assert client.calls[CHAT] == 3
+
+
+def test_top_k_judges_everything_when_quick_scores_are_incomplete():
+    client = StubOpenAI({"screening several candidate": quick_reply({1: 2, 2: 5, 4: 4})})
+    cache = ResponseCache(MemoryCache())
+    judge = make_judge(client, cache=cache, mode="top_k", top_k=2)
+    outputs = [image_output(name, seed) for seed, name in enumerate("abcd", start=1)]
+
+    judgments = asyncio.run(judge.judge_all(outputs, "A poster"))
+
+    assert [j.tier for j in judgments] == ["full"] * 4
+    assert client.calls[CHAT] == 5
+    # The four full judgments are cached; the reply that missed a candidate is not
+    assert len(cache.memory) == 4
+
+
+def test_code_checks_run_off_the_loop_and_short_circuit_broken_code(monkeypatch):
+    threads = []
+    original = judge_agent.check_html
+
+    def check_html(code: str):
+        threads.append(threading.current_thread())
+        return original(code)
+
+    monkeypatch.setattr(judge_agent, "check_html", check_html)
+    client = FakeOpenAI(fast_settings())
+    judge = make_judge(client)
+    broken = AgentOutput(image="", agent_name="a", persona="a style", extra={"code": "<p>hi</p>"})
+
+    judgment = asyncio.run(judge.judge_one(broken, "Build a todo app"))
+
+    assert judgment.tier == "local" and judgment.overall_score == 1.0
+    assert threads and threads[0] is not threading.main_thread()
+    assert client.calls[CHAT] == 0
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services.fake_openai import FakeOpenAI
+
+from conftest import fast_settings
+
+
+def test_run_judges_every_builder(make_orchestrator):
+    orchestrator = make_orchestrator()
+    result = asyncio.run(orchestrator.run("Build a todo app", 3))
+    assert result.status == "complete"
+    assert [i.agent_name for i in result.items] == [j.agent_name for j in result.judgments]
+    assert all(i.score == j.overall_score for i, j in zip(result.items, result.judgments))
+
+
+def test_builders_past_their_deadline_give_partial_results(make_orchestrator):
+    orchestrator = make_orchestrator(FakeOpenAI(fast_settings(image_seconds=5)))
+    orchestrator.build_deadline = 0.1
+    # Images never arrive in time: with nothing built, the first failure surfaces
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(orchestrator.run("A poster for a jazz night", 2), 10))
+
+
+def test_a_slow_judge_leaves_outputs_unjudged(make_orchestrator):
+    orchestrator = make_orchestrator(FakeOpenAI(fast_settings()))
+    orchestrator.judge_deadline = 0.0
+    result = asyncio.run(orchestrator.run("Build a todo app", 2))
+    assert result.status == "partial"
+    assert all(i.status == "ok" and i.score is None for i in result.items)
+    assert {j.status for j in result.judgments} == {"timeout"}
+
+
+class IntentSelector:
+    """Picks personas by intent: the classifier's provisional intent and the analyzed one differ."""
+
+    def __init__(self, picks: dict[str, list[str]]):
+        self.picks = picks
+
+    async def select(self, personas, intent, task_type):
+        return self.picks[intent]
+
+    async def record(self, intent, task_type, scores):
+        pass
+
+
+@pytest.mark.parametrize(
+    "analyzed_pick, outcome",
+    [
+        (["BuilderAgent1", "BuilderAgent2"], "hits"),
+        (["BuilderAgent2", "BuilderAgent3"], "misses"),
+    ],
+)
+def test_speculative_builds_are_kept_only_for_the_real_selection(make_orchestrator, analyzed_pick, outcome):
+    # FakeOpenAI analyzes every query with intent "fake_intent"
+    selector = IntentSelector({"build_web_app": ["BuilderAgent1", "BuilderAgent2"], "fake_intent": analyzed_pick})
+    orchestrator = make_orchestrator(persona_selector=selector)
+    orchestrator.speculative = True
+    result = asyncio.run(orchestrator.run("Build a todo app"))
+    assert [i.agent_name for i in result.items] == analyzed_pick
+    assert result.status == "complete"
+    assert orchestrator.speculation_stats()[outcome] == 1
@@ -0,0 +1,68 @@
+import asyncio
+import random
+import threading
+
+import pytest
+
+from services.persona_stats import ANY_INTENT, PersonaScoreStore, PersonaSelector
+
+PERSONAS = ["BuilderAgent1", "BuilderAgent2", "BuilderAgent3"]
+
+
+def test_scores_are_recorded_per_intent_and_for_the_task_type():
+    store = PersonaScoreStore()
+    store.record_many("Landing Page", "code", {"BuilderAgent1": 4.0, "BuilderAgent2": 2.0})
+    store.record_many("landing page", "code", {"BuilderAgent1": 5.0})
+    stats = store.stats("landing_page", "code")
+    assert stats["BuilderAgent1"].count == 2
+    assert stats["BuilderAgent1"].mean == pytest.approx(4.5)
+    assert store.stats(ANY_INTENT, "code")["BuilderAgent2"].mean == pytest.approx(2.0)
+    assert store.stats("landing_page", "image") == {}
+
+
+@pytest.mark.parametrize("policy", ["thompson", "ucb"])
+def test_selector_favours_the_best_scoring_personas(policy):
+    store = PersonaScoreStore()
+    for _ in range(30):
+        store.record_many("landing_page", "code", {"BuilderAgent1": 2.0, "BuilderAgent2": 4.8, "BuilderAgent3": 4.5})
+    selector = PersonaSelector(store, policy=policy, k=2, explore_rate=0, rng=random.Random(0))
+    assert asyncio.run(selector.select(PERSONAS, "landing_page", "code")) == ["BuilderAgent2", "BuilderAgent3"]
+
+
+def test_exploration_runs_every_persona():
+    selector = PersonaSelector(PersonaScoreStore(), k=1, explore_rate=1.0)
+    assert asyncio.run(selector.select(PERSONAS, "x", "image")) == PERSONAS
+
+
+def test_history_is_read_and_written_off_the_event_loop():
+    threads = []
+
+    class RecordingStore(PersonaScoreStore):
+        def stats(self, intent, task_type):
+            threads.append(threading.current_thread())
+            return super().stats(intent, task_type)
+
+        def record_many(self, intent, task_type, scores):
+            threads.append(threading.current_thread())
+            super().record_many(intent, task_type, scores)
+
+    selector = PersonaSelector(RecordingStore(), k=1, explore_rate=0, min_observations=0)
+
+    async def scenario() -> None:
+        await selector.select(PERSONAS, "x", "image")
+        await selector.record("x", "image", {"BuilderAgent1": 4.0})
+        await selector.record("x", "image", {})  # nothing judged: no write
+
+    asyncio.run(scenario())
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_orchestrator_records_each_tournament(make_orchestrator):
+    store = PersonaScoreStore()
+    selector = PersonaSelector(store, k=2, explore_rate=0, rng=random.Random(0))
+    orchestrator = make_orchestrator(persona_selector=selector)
+    result = asyncio.run(orchestrator.run("Build a todo app"))
+    assert len(result.items) == 2
+    recorded = store.stats(ANY_INTENT, "code")
+    assert sorted(recorded) == sorted(i.agent_name for i in result.items)
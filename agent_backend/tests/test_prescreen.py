@@ -0,0 +1,51 @@
+import base64
+
+from models.agent_output import AgentOutput
+from services.fake_openai import fake_png_base64
+from services.prescreen import prescreen
+
+HTML = '<!DOCTYPE html><html lang="en"><head><title>App</title></head><body><p>{}</p></body></html>'
+
+
+def image_output(name: str, image: str, **kwargs) -> AgentOutput:
+    return AgentOutput(image=image, agent_name=name, persona=f"{name} style", **kwargs)
+
+
+def code_output(name: str, code: str) -> AgentOutput:
+    return AgentOutput(image="", agent_name=name, persona=f"{name} style", extra={"code": code})
+
+
+def load(output: AgentOutput) -> bytes:
+    return base64.b64decode(output.image)
+
+
+def test_prescreen_rejects_broken_outputs():
+    outputs = [
+        image_output("failed", fake_png_base64(64, 1.0, 1), status="error"),
+        image_output("placeholder", fake_png_base64(1, 0.0, 0)),
+        image_output("garbage", base64.b64encode(b"not a png").decode()),
+        image_output("empty", ""),
+        code_output("tiny", "<p>hi</p>"),
+    ]
+    verdicts = prescreen(outputs, load, max_distance=4)
+    assert [v.action for v in verdicts] == ["reject"] * 5
+    assert verdicts[0].reason == "builder status error"
+    assert "1x1" in verdicts[1].reason
+    assert verdicts[2].reason == "Image could not be decoded"
+    assert verdicts[3].reason == "Unusable image: empty image"
+    assert "bytes" in verdicts[4].reason
+
+
+def test_prescreen_marks_duplicates_of_earlier_outputs():
+    outputs = [
+        image_output("a", fake_png_base64(64, 1.0, 1)),
+        image_output("b", fake_png_base64(64, 1.0, 2)),
+        image_output("c", fake_png_base64(64, 1.0, 1)),
+        code_output("d", HTML.format("Hello")),
+        code_output("e", "```html\n" + HTML.format("Hello").replace(" ", "\n    ") + "\n```"),
+        code_output("f", HTML.format("Goodbye")),
+    ]
+    verdicts = prescreen(outputs, load, max_distance=4)
+    assert [v.action for v in verdicts] == ["judge", "judge", "duplicate", "judge", "duplicate", "judge"]
+    assert verdicts[2].duplicate_of == 0
+    assert verdicts[4].duplicate_of == 3
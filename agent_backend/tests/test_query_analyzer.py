@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from pydantic import ValidationError
+
+from query_analyzer import QueryAnalyzer, StructuredQuery
+from services.gateway import ModelGateway
+from services.scheduler import Scheduler
+
+from conftest import StubOpenAI
+
+# Batched reply for the unique queries [todo app, poster, logo, banner]: the
+# poster entry is mangled and the logo entry is missing
+BATCH_REPLY = json.dumps(
+    {
+        "queries": [
+            {"index": 0, "intent": "build_todo_app", "task_type": "code", "requirements": [], "constraints": []},
+            {"index": 1, "intent": None, "task_type": "image", "requirements": "a poster"},
+            {"index": 3, "intent": "create_banner", "task_type": "image", "requirements": [], "constraints": []},
+        ]
+    }
+)
+
+
+class LogoFails(StubOpenAI):
+    """Canned batch reply; the individual retry for the logo query gets a non-JSON answer."""
+
+    def _reply(self, system: str, user: str, rng) -> str:
+        if system == QueryAnalyzer.SYSTEM_PROMPT and "logo" in user:
+            return "I'd be happy to help with your logo!"
+        return super()._reply(system, user, rng)
+
+
+def test_analyze_many_retries_bad_entries_and_fails_only_their_slots():
+    client = LogoFails({"numbered user requests": BATCH_REPLY})
+    analyzer = QueryAnalyzer(ModelGateway(client, Scheduler()))
+    queries = ["Build a todo app", "build a  TODO app", "A poster", "A logo", "A banner"]
+
+    results = asyncio.run(analyzer.analyze_many(queries))
+
+    # Identical queries share one batch entry but keep their own wording
+    assert [r.raw_query for r in results[:2]] == queries[:2]
+    assert results[0].intent == results[1].intent == "build_todo_app"
+    # The mangled entry was retried on its own and succeeded
+    assert isinstance(results[2], StructuredQuery) and results[2].intent == "fake_intent"
+    # The missing entry was retried and failed: only its slot holds the error
+    assert isinstance(results[3], ValidationError)
+    assert results[4].intent == "create_banner"
+    # One batched request, then one retry each for the poster and the logo
+    assert client.calls["/v1/chat/completions"] == 3
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from services.scheduler import ModelLimits, Priority, Scheduler, SchedulerOverloaded, TokenBucket
+
+
+async def hold(release: asyncio.Event) -> None:
+    await release.wait()
+
+
+async def until_running(scheduler: Scheduler, calls: int = 1) -> None:
+    while scheduler.stats()["in_flight"] < calls:
+        await asyncio.sleep(0)
+
+
+def test_priority_holds_across_models():
+    async def scenario() -> list[str]:
+        scheduler = Scheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def record(name: str) -> None:
+            order.append(name)
+
+        busy = asyncio.create_task(scheduler.submit("gpt-image-1", lambda: hold(release), priority=Priority.BUILDER))
+        await until_running(scheduler)
+        queued = [
+            ("analyzer", "gpt-4o-mini", Priority.ANALYZER),
+            ("builder-1", "gpt-image-1", Priority.BUILDER),
+            ("judge", "gpt-4o", Priority.JUDGE),
+            ("builder-2", "gpt-4o-mini", Priority.BUILDER),
+        ]
+        tasks = [
+            asyncio.create_task(scheduler.submit(model, lambda n=name: record(n), priority=priority))
+            for name, model, priority in queued
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 4
+        release.set()
+        await asyncio.gather(busy, *tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["judge", "builder-1", "builder-2", "analyzer"]
+
+
+def test_full_queue_rejects_fast():
+    async def scenario() -> Scheduler:
+        scheduler = Scheduler(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(scheduler.submit("m", lambda: hold(release), priority=Priority.BUILDER))
+        await until_running(scheduler)
+        waiting = asyncio.create_task(scheduler.submit("m", lambda: hold(release), priority=Priority.BUILDER))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerOverloaded) as overloaded:
+            scheduler.admit()
+        assert overloaded.value.retry_after >= 1
+        with pytest.raises(SchedulerOverloaded):
+            await scheduler.submit("m", lambda: hold(release), priority=Priority.JUDGE)
+        release.set()
+        await asyncio.gather(running, waiting)
+        scheduler.admit()
+        return scheduler
+
+    stats = asyncio.run(scenario()).stats()
+    assert stats["rejected"] == 2
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == stats["queued"] == 0
+
+
+def test_rate_limited_model_does_not_block_others():
+    async def scenario() -> tuple[list[str], float]:
+        # 600 rpm: one request every 0.1 s once the burst is spent
+        scheduler = Scheduler({"slow": ModelLimits(requests_per_minute=600)})
+        scheduler._lane("slow").requests.tokens = 0
+        order: list[str] = []
+
+        async def record(name: str) -> None:
+            order.append(name)
+
+        start = time.monotonic()
+        slow = asyncio.create_task(scheduler.submit("slow", lambda: record("slow"), priority=Priority.JUDGE))
+        fast = asyncio.create_task(scheduler.submit("fast", lambda: record("fast"), priority=Priority.ANALYZER))
+        await asyncio.gather(slow, fast)
+        return order, time.monotonic() - start
+
+    order, elapsed = asyncio.run(scenario())
+    assert order == ["fast", "slow"]
+    assert 0.05 < elapsed < 1.0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario() -> list[str]:
+        scheduler = Scheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order: list[str] = []
+
+        async def record(name: str) -> None:
+            order.append(name)
+
+        busy = asyncio.create_task(scheduler.submit("m", lambda: hold(release), priority=Priority.BUILDER))
+        await until_running(scheduler)
+        judge = asyncio.create_task(scheduler.submit("m", lambda: record("judge"), priority=Priority.JUDGE))
+        builder = asyncio.create_task(scheduler.submit("m", lambda: record("builder"), priority=Priority.BUILDER))
+        await asyncio.sleep(0)
+        judge.cancel()
+        release.set()
+        await asyncio.gather(busy, builder)
+        assert scheduler.stats()["in_flight"] == 0
+        return order
+
+    assert asyncio.run(scenario()) == ["builder"]
+
+
+def test_token_bucket_reconciles_estimates():
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    bucket.adjust(-30)  # the call used 30 fewer tokens than estimated
+    assert bucket.wait_time(1) == 0
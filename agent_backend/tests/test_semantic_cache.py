@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+
+from query_analyzer import QueryAnalyzer
+from services.fake_openai import FakeOpenAI
+from services.gateway import ModelGateway
+from services.semantic_cache import HashingEmbedder, SemanticCache
+
+from conftest import fast_settings
+
+
+def similarity(a: str, b: str) -> float:
+    vectors = HashingEmbedder().embed([a, b])
+    return float(vectors[0] @ vectors[1])
+
+
+def lookup(cache: SemanticCache, stored: str, asked: str, stored_scope: str = "", asked_scope: str = "") -> str | None:
+    async def scenario() -> str | None:
+        await cache.set(stored, '"value"', stored_scope)
+        return await cache.get(asked, asked_scope)
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def cache() -> SemanticCache:
+    return SemanticCache("test", HashingEmbedder(), threshold=0.92, capacity=8)
+
+
+def test_reworded_requests_hit(cache):
+    assert lookup(cache, "landing page for a coffee shop", "Coffee shop landing page") == '"value"'
+
+
+@pytest.mark.parametrize(
+    "stored, asked",
+    [
+        ("todo app", "todo app in react"),  # extra requirement
+        ("a todo app in react", "a todo app in vue"),  # different framework
+        ("Build a todo app", "Build a todo app for a coffee shop"),
+    ],
+)
+def test_different_requests_miss(cache, stored, asked):
+    assert lookup(cache, stored, asked) is None
+
+
+def test_threshold_boundary():
+    stored, asked = "Build a todo app", "build a todo list app"
+    score = similarity(stored, asked)
+    assert 0.85 < score < 0.92
+    just_below = SemanticCache("below", HashingEmbedder(), threshold=score + 0.005, capacity=8)
+    just_above = SemanticCache("above", HashingEmbedder(), threshold=score - 0.005, capacity=8)
+    assert lookup(just_below, stored, asked) is None
+    assert lookup(just_above, stored, asked) == '"value"'
+
+
+def test_scopes_never_share_entries(cache):
+    assert lookup(cache, "coffee shop landing page", "coffee shop landing page", "code", "image") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_entry_is_evicted_when_full():
+    cache = SemanticCache("small", HashingEmbedder(), capacity=2)
+
+    async def scenario() -> list[str | None]:
+        await cache.set("poster for a jazz night", "1")
+        await cache.set("todo app in react", "2")
+        await cache.get("poster for a jazz night")
+        await cache.set("weather dashboard", "3")
+        return [await cache.get(t) for t in ("poster for a jazz night", "todo app in react", "weather dashboard")]
+
+    assert asyncio.run(scenario()) == ["1", None, "3"]
+
+
+def test_entries_survive_a_restart(tmp_path):
+    first = SemanticCache("persist", HashingEmbedder(), capacity=8, directory=str(tmp_path))
+    asyncio.run(first.set("coffee shop landing page", '"saved"', "code"))
+    second = SemanticCache("persist", HashingEmbedder(), capacity=8, directory=str(tmp_path))
+    assert asyncio.run(second.get("landing page for a coffee shop", "code")) == '"saved"'
+
+
+def test_embedding_and_search_run_off_the_event_loop(cache):
+    threads = []
+
+    class RecordingEmbedder(HashingEmbedder):
+        def embed(self, texts):
+            threads.append(threading.current_thread())
+            return super().embed(texts)
+
+    cache.embedder = RecordingEmbedder()
+    lookup(cache, "todo app", "todo app")
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_analyzer_reuses_paraphrases_of_the_same_task_type():
+    client = FakeOpenAI(fast_settings())
+    # A low threshold, so only the task type scope tells the last request apart
+    semantic = SemanticCache("analyzer", HashingEmbedder(), threshold=0.6)
+    analyzer = QueryAnalyzer(ModelGateway(client), semantic=semantic)
+    poster = "coffee shop landing page poster"
+    assert similarity("landing page for a coffee shop", poster) > 0.6
+
+    async def scenario():
+        first = await analyzer.analyze("landing page for a coffee shop")
+        paraphrase = await analyzer.analyze("Coffee shop landing page")
+        other = await analyzer.analyze(poster)
+        return first, paraphrase, other
+
+    first, paraphrase, other = asyncio.run(scenario())
+    assert first.task_type == paraphrase.task_type == "code"
+    assert paraphrase.raw_query == "Coffee shop landing page"
+    # Predicted to be an image request: analyzed afresh despite the similar wording
+    assert client.calls["/v1/chat/completions"] == 2
+    assert other.raw_query == poster
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+class Work:
+    """A computation that counts its runs and finishes when released."""
+
+    def __init__(self, result: object = "done"):
+        self.result = result
+        self.runs = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> object:
+        self.runs += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight("test")
+        work = Work({"n": 1})
+        callers = [asyncio.create_task(flight.do("k", work, share=dict)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.stats() == {"leaders": 1, "followers": 2, "in_flight": 1}
+        work.release.set()
+        results = await asyncio.gather(*callers)
+        return flight, work, results
+
+    flight, work, results = asyncio.run(scenario())
+    assert work.runs == 1
+    assert results == [{"n": 1}] * 3
+    # The leader gets the original object, followers get share() copies
+    assert results[0] is work.result
+    assert results[1] is not work.result and results[2] is not results[1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_key_is_forgotten_after_completion():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight()
+        work = Work()
+        work.release.set()
+        await flight.do("k", work)
+        await flight.do("k", work)
+        return flight, work
+
+    flight, work = asyncio.run(scenario())
+    assert work.runs == 2
+    assert flight.stats() == {"leaders": 2, "followers": 0, "in_flight": 0}
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight()
+        work = Work(ValueError("boom"))
+        callers = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+
+
+def test_cancelling_the_only_caller_cancels_the_computation():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight()
+        work = Work()
+        caller = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return flight, work
+
+    flight, work = asyncio.run(scenario())
+    assert work.cancelled
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelling_one_of_two_callers_keeps_the_computation():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight()
+        work = Work()
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert not work.cancelled
+        work.release.set()
+        return await follower, leader.cancelled(), work
+
+    result, leader_cancelled, work = asyncio.run(scenario())
+    assert result == "done"
+    assert leader_cancelled
+    assert work.runs == 1 and not work.cancelled
+
+
+def test_new_caller_after_abandonment_starts_afresh():
+    async def scenario():
+        flight: SingleFlight[object] = SingleFlight()
+        abandoned, fresh = Work(), Work("fresh")
+        caller = asyncio.create_task(flight.do("k", abandoned))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        fresh.release.set()
+        return await flight.do("k", fresh)
+
+    assert asyncio.run(scenario()) == "fresh"
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from services.telemetry import Histogram, span
+
+
+def outcomes(histogram: Histogram) -> dict[str, int]:
+    counts = {}
+    for (_, outcome), (buckets, _) in histogram._series.items():
+        counts[outcome] = counts.get(outcome, 0) + sum(buckets)
+    return counts
+
+
+def test_span_labels_outcomes():
+    histogram = Histogram("test_seconds", "Test spans.", ("stage", "outcome"))
+
+    async def scenario() -> None:
+        with span("ok", histogram, stage="a"):
+            pass
+        with pytest.raises(ValueError):
+            with span("error", histogram, stage="a"):
+                raise ValueError("boom")
+
+        async def cancelled() -> None:
+            with span("cancelled", histogram, stage="a"):
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert outcomes(histogram) == {"ok": 1, "error": 1, "cancelled": 1}
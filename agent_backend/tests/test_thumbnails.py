@@ -0,0 +1,66 @@
+import asyncio
+import base64
+import io
+
+from PIL import Image
+
+from agents.judge_agent import JudgeAgent
+from models.agent_output import AgentOutput
+from services.cache import MemoryCache, ResponseCache
+from services.fake_openai import FakeOpenAI, fake_png_base64
+from services.gateway import ModelGateway
+from services.scheduler import Scheduler
+from services.thumbnails import JudgeImagePreparer
+
+from conftest import fast_settings
+
+
+def decode(data_uri: str) -> Image.Image:
+    b64 = data_uri.split(",", 1)[1]
+    return Image.open(io.BytesIO(base64.b64decode(b64)))
+
+
+def test_thumbnails_are_downscaled_reencoded_and_cached():
+    source = base64.b64decode(fake_png_base64(256, 0.5, 0))
+    loads = []
+
+    def load() -> bytes:
+        loads.append(1)
+        return source
+
+    preparer = JudgeImagePreparer(max_size=64, fmt="webp", quality=60)
+
+    async def scenario() -> list[str]:
+        return [await preparer.prepare("artifact-1", load), await preparer.prepare("artifact-1", load)]
+
+    first, second = asyncio.run(scenario())
+
+    assert first.startswith("data:image/webp;base64,")
+    with decode(first) as img:
+        assert img.format == "WEBP" and img.size == (64, 64)
+    assert second == first and len(loads) == 1
+
+
+def test_undecodable_images_pass_through():
+    preparer = JudgeImagePreparer(max_size=64)
+    data_uri = asyncio.run(preparer.prepare("broken", lambda: b"not an image"))
+    assert data_uri == "data:image/png;base64," + base64.b64encode(b"not an image").decode()
+
+
+def test_judge_image_settings_are_part_of_the_judge_cache_key():
+    client = FakeOpenAI(fast_settings())
+    cache = ResponseCache(MemoryCache())
+    output = AgentOutput(image=fake_png_base64(128, 0.5, 0), agent_name="a", persona="a style")
+
+    def judge(**settings) -> JudgeAgent:
+        return JudgeAgent(ModelGateway(client, Scheduler()), cache, thumbnails=JudgeImagePreparer(**settings))
+
+    async def scenario() -> None:
+        await judge(max_size=64).judge_one(output, "A poster")
+        await judge(max_size=64).judge_one(output, "A poster")
+        await judge(max_size=32).judge_one(output, "A poster")
+        await judge(max_size=64, detail="high").judge_one(output, "A poster")
+
+    asyncio.run(scenario())
+    # The repeat was a cache hit; a different size or detail level is a new judgment
+    assert client.calls["/v1/chat/completions"] == 3
@@ -3,6 +3,18 @@ import { firstValueFrom } from 'rxjs';
 import { HttpService } from '@nestjs/axios';
 import { QueryResponse } from './types/agent-output.types';
 
+/**
+ * Absolute image URL. Data URIs and absolute URLs pass through; a bare
+ * `/artifacts/...` path (an agent backend without ARTIFACT_BASE_URL) is
+ * resolved against the agent backend URL.
+ */
+export function resolveImageUrl(image: string, agentUrl: string): string {
+  if (!image.startsWith('/')) {
+    return image;
+  }
+  return new URL(image, agentUrl).toString();
+}
+
 @Injectable()
 export class AppService {
   constructor(private httpService: HttpService) {}
@@ -20,7 +32,13 @@ export class AppService {
           query: prompt,
         }),
       );
-      return data;
+      return {
+        ...data,
+        items: data.items.map((item) => ({
+          ...item,
+          image: resolveImageUrl(item.image, agentUrl),
+        })),
+      };
     } catch (err: unknown) {
       const msg = err && typeof err === 'object' && 'response' in err
         ? (err as { response?: { data?: unknown; status?: number } }).response?.data
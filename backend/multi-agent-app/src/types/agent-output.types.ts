@@ -6,23 +6,35 @@
 /** Request body for POST /orchestrate (QueryRequest) */
 export interface QueryRequest {
   query: string;
+  /** Number of competing personas (defaults to all registered personas) */
+  builders?: number | null;
 }
 
 /** Response from POST /orchestrate (OrchestratorOutput) */
 export interface QueryResponse {
   items: AgentOutputItem[];
   judgments: AgentJudgment[];
+  /** "partial" when some builders or judgments missed their deadline or failed */
+  status?: 'complete' | 'partial';
 }
 
 /** Single agent output (AgentOutput) */
 export interface AgentOutputItem {
+  /**
+   * `/artifacts/{id}` URL from the agent backend's artifact store (the default;
+   * absolute when ARTIFACT_BASE_URL is set, resolved by resolveImageUrl otherwise),
+   * or a base64 data URI with ARTIFACT_STORE=inline.
+   */
   image: string;
+  artifact_id?: string | null;
   agent_name: string;
   persona: string;
   created_at?: string;
   prompt_or_job?: string | null;
   style_notes?: string | null;
   score?: number | null;
+  status?: 'ok' | 'timeout' | 'error';
+  error?: string | null;
   extra?: Record<string, unknown>;
 }
 
@@ -33,6 +45,8 @@ export interface AgentJudgment {
   criteria_ratings: Array<{ criterion: string; score: number; rationale: string }>;
   overall_score: number;
   summary: string;
+  status?: 'ok' | 'timeout' | 'error' | 'skipped';
+  tier?: 'full' | 'quick' | 'local';
 }
 
 /** Metadata for agent-generated output (AgentOutputMetadata) */